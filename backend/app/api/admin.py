@@ -0,0 +1,57 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from typing import Optional
+import logging
+
+from app.models import MemoryReport
+from app.services.geometry_store import get_store_path
+from app.services.memory import (
+    estimate_model_memory,
+    get_process_rss,
+    get_process_peak_rss,
+    get_tracemalloc_usage
+)
+from app.api.ifc import ifc_storage, GEOMETRY_STORE_DIR
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/admin", tags=["Admin"])
+
+
+@router.get("/memory", response_model=MemoryReport)
+async def get_memory_usage(model_id: Optional[str] = None):
+    """
+    プロセスのメモリ使用量と、モデルごとの推定使用量の内訳を取得
+    
+    モデルの使用量はオブジェクト構造からの推定値です（大きなリストは一部の要素から推定）。
+    ジオメトリストアはmmapでワーカー間共有されるため、内訳とは別にファイルサイズを示します
+    
+    Args:
+        model_id: 指定した場合はそのモデルのみ計測する
+    """
+    if model_id is not None and model_id not in ifc_storage:
+        raise HTTPException(status_code=404, detail="モデルが見つかりません")
+    
+    targets = [model_id] if model_id is not None else list(ifc_storage)
+    
+    def measure():
+        usages = []
+        for target in targets:
+            data = ifc_storage.get(target)
+            if data is None:
+                # 計測中に削除された場合
+                continue
+            usages.append(estimate_model_memory(target, data, get_store_path(GEOMETRY_STORE_DIR, target)))
+        return usages
+    
+    usages = await run_in_threadpool(measure)
+    usages.sort(key=lambda u: u.totalBytes, reverse=True)
+    
+    return MemoryReport(
+        processRssBytes=get_process_rss(),
+        processPeakRssBytes=get_process_peak_rss(),
+        tracemallocBytes=get_tracemalloc_usage(),
+        modelCount=len(usages),
+        totalModelBytes=sum(u.totalBytes for u in usages),
+        models=usages
+    )
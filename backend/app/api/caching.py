@@ -0,0 +1,100 @@
+"""
+HTTPキャッシュ
+解析済みモデルのレスポンスにETagを付与し、シリアライズ済み・圧縮済みの本文を再利用する
+"""
+from typing import Any, Callable, Dict
+import gzip
+
+from fastapi import Request
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from app.config import get_settings
+from app.services.metrics import span
+
+# これより小さい本文は圧縮しない
+GZIP_MIN_SIZE = 1024
+GZIP_LEVEL = 6
+
+
+def _accepts_gzip(request: Request) -> bool:
+    accept_encoding = request.headers.get("accept-encoding", "")
+    return any(
+        part.split(";")[0].strip().lower() == "gzip"
+        for part in accept_encoding.split(",")
+    )
+
+
+def _etag_matches(request: Request, etags: set) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return bool(candidates & etags)
+
+
+def invalidate_response_cache(model_data: Dict[str, Any]) -> None:
+    """モデルの内容が変わった場合にキャッシュを破棄し、ETagを更新する"""
+    model_data["revision"] = model_data.get("revision", 0) + 1
+    model_data["response_cache"] = {}
+
+
+def cached_json_response(
+    request: Request,
+    model_data: Dict[str, Any],
+    resource_key: str,
+    build: Callable[[], BaseModel]
+) -> Response:
+    """
+    モデルのリソースをキャッシュ付きのJSONレスポンスとして返す
+
+    ETagはファイル内容のハッシュ・パーサーのバージョン・プロパティ抽出プロファイル・モデルの更新回数・リソースから作る。
+    If-None-Matchが一致すれば304を返し、それ以外はキャッシュ済みの本文を返す
+
+    Args:
+        request: リクエスト
+        model_data: ストレージ上のモデルデータ
+        resource_key: モデル内でリソースを識別するキー
+        build: 本文となるモデルを作成する関数（キャッシュがない場合のみ呼ばれる）
+    """
+    # 解析モジュール（ifcopenshell）は起動時に読み込まないため、使用時に参照する
+    from app.services.worker_pool import load_parser
+
+    settings = get_settings()
+    revision = model_data.get("revision", 0)
+    profile = model_data["property_profile"].digest
+    base_tag = f'{model_data["content_hash"][:20]}-{load_parser().PARSE_VERSION}-{profile}-{revision}-{resource_key}'
+    identity_etag = f'"{base_tag}"'
+    gzip_etag = f'"{base_tag}-gz"'
+
+    headers = {
+        "Cache-Control": f"private, max-age={settings.http_cache_max_age}",
+        "Vary": "Accept-Encoding",
+    }
+
+    use_gzip = _accepts_gzip(request)
+    if _etag_matches(request, {identity_etag, gzip_etag}):
+        headers["ETag"] = gzip_etag if use_gzip else identity_etag
+        return Response(status_code=304, headers=headers)
+
+    cache: Dict[Any, bytes] = model_data.setdefault("response_cache", {})
+    body = cache.get((resource_key, "identity"))
+    if body is None:
+        with span("response.serialize"):
+            body = build().model_dump_json().encode("utf-8")
+        cache[(resource_key, "identity")] = body
+
+    if use_gzip and len(body) >= GZIP_MIN_SIZE:
+        compressed = cache.get((resource_key, "gzip"))
+        if compressed is None:
+            with span("response.gzip"):
+                compressed = gzip.compress(body, compresslevel=GZIP_LEVEL)
+            cache[(resource_key, "gzip")] = compressed
+        headers["ETag"] = gzip_etag
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=compressed, media_type="application/json", headers=headers)
+
+    headers["ETag"] = identity_etag
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,13 +1,55 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse, Response
+from pydantic import ValidationError
+from typing import Any, Dict, Iterable, List, Iterator, Optional, Tuple
+import asyncio
+import json
 import logging
+import os
 
 from app.models import (
     VentilationCalculationInput,
     VentilationCalculationResult,
-    VentilationBatchResult
+    VentilationBatchResult,
+    GoverningVentilationResult,
+    GoverningBatchResult,
+    VentilationSweepRequest,
+    VentilationSweepResult,
+    VentilationColumnarInput,
+    VentilationColumnarResult,
+    VentilationMethod,
+    RoomUsageType,
+    DailySchedule,
+    AnnualSimulationRequest,
+    AnnualSimulationResult,
+    PortfolioRequest,
+    PortfolioModelSummary,
+    PortfolioResult
 )
 from app.calculators.ventilation import VentilationCalculator
+from app.calculators.sweep import run_ventilation_sweep
+from app.calculators.annual import run_annual_simulation, get_default_schedules
+from app.services.portfolio import strip_spaces, summarize_model_ventilation, build_portfolio_result
+from app.services.worker_pool import get_process_pool
+from app.services.metrics import run_with_metrics, merge_metrics
+from app.services.columnar import (
+    ARROW_MEDIA_TYPE,
+    COLUMNAR_FORMATS,
+    ArrowUnavailable,
+    parse_columnar_json,
+    parse_columnar_arrow,
+    iter_columnar_inputs,
+    build_columnar_result,
+    columnar_result_to_arrow
+)
+from app.services.export import (
+    RESULT_COLUMNS,
+    EXPORT_FORMATS,
+    MEDIA_TYPES,
+    iter_result_rows,
+    iter_export
+)
 
 logger = logging.getLogger(__name__)
 
@@ -50,6 +92,62 @@ async def calculate_ventilation(calc_input: VentilationCalculationInput, model_i
         raise HTTPException(status_code=500, detail=f"計算エラー: {str(e)}")
 
 
+# 列形式の入力のスキーマ（本文を直接読み込むため、OpenAPIには明示的に記載する）
+COLUMNAR_INPUT_SCHEMA = VentilationColumnarInput.model_json_schema(ref_template="#/components/schemas/{model}")
+COLUMNAR_INPUT_SCHEMA.pop("$defs", None)
+
+
+def _calculate_batch(
+    calc_inputs: Iterable[VentilationCalculationInput],
+    model_id: Optional[str]
+) -> Tuple[List[VentilationCalculationResult], Dict[str, Any]]:
+    """
+    複数スペースの換気計算を実行し、モデルの計算結果として保持
+    
+    Returns:
+        計算結果とサマリー情報
+    """
+    calculator = VentilationCalculator()
+    results = []
+    
+    # スペース情報の取得（モデルIDがある場合）
+    spaces_dict = {}
+    if model_id and model_id in ifc_storage:
+        spaces = ifc_storage[model_id]["spaces"]
+        spaces_dict = {s.id: s for s in spaces}
+    
+    # 各スペースの計算を実行
+    for calc_input in calc_inputs:
+        space = spaces_dict.get(calc_input.spaceId)
+        result = calculator.calculate(calc_input, space)
+        results.append(result)
+    
+    # モデルの計算結果として保持（エクスポートで使用）
+    if spaces_dict:
+        stored_results = ifc_storage[model_id]["results"]
+        for result in results:
+            if result.spaceId in spaces_dict:
+                stored_results[result.spaceId] = result
+        ifc_storage[model_id]["groups"].set_results(results)
+    
+    # サマリー情報の作成
+    total_ventilation = sum(r.requiredVentilation for r in results)
+    ok_count = sum(1 for r in results if r.complianceStatus == "OK")
+    ng_count = sum(1 for r in results if r.complianceStatus == "NG")
+    warning_count = sum(1 for r in results if r.complianceStatus == "WARNING")
+    
+    summary = {
+        "totalRequiredVentilation": total_ventilation,
+        "okCount": ok_count,
+        "ngCount": ng_count,
+        "warningCount": warning_count,
+        "complianceRate": ok_count / len(results) if results else 0
+    }
+    
+    logger.info(f"一括換気計算完了: {len(results)}スペース, 合計{total_ventilation}m³/h")
+    return results, summary
+
+
 @router.post("/ventilation/batch", response_model=VentilationBatchResult)
 async def calculate_ventilation_batch(
     calc_inputs: List[VentilationCalculationInput],
@@ -63,36 +161,7 @@ async def calculate_ventilation_batch(
         model_id: IFCモデルID
     """
     try:
-        calculator = VentilationCalculator()
-        results = []
-        
-        # スペース情報の取得（モデルIDがある場合）
-        spaces_dict = {}
-        if model_id and model_id in ifc_storage:
-            spaces = ifc_storage[model_id]["spaces"]
-            spaces_dict = {s.id: s for s in spaces}
-        
-        # 各スペースの計算を実行
-        for calc_input in calc_inputs:
-            space = spaces_dict.get(calc_input.spaceId)
-            result = calculator.calculate(calc_input, space)
-            results.append(result)
-        
-        # サマリー情報の作成
-        total_ventilation = sum(r.requiredVentilation for r in results)
-        ok_count = sum(1 for r in results if r.complianceStatus == "OK")
-        ng_count = sum(1 for r in results if r.complianceStatus == "NG")
-        warning_count = sum(1 for r in results if r.complianceStatus == "WARNING")
-        
-        summary = {
-            "totalRequiredVentilation": total_ventilation,
-            "okCount": ok_count,
-            "ngCount": ng_count,
-            "warningCount": warning_count,
-            "complianceRate": ok_count / len(results) if results else 0
-        }
-        
-        logger.info(f"一括換気計算完了: {len(results)}スペース, 合計{total_ventilation}m³/h")
+        results, summary = _calculate_batch(calc_inputs, model_id)
         
         return VentilationBatchResult(
             total=len(results),
@@ -105,6 +174,66 @@ async def calculate_ventilation_batch(
         raise HTTPException(status_code=500, detail=f"計算エラー: {str(e)}")
 
 
+@router.post(
+    "/ventilation/batch/columnar",
+    response_model=VentilationColumnarResult,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": COLUMNAR_INPUT_SCHEMA},
+                ARROW_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}},
+            },
+        }
+    },
+)
+async def calculate_ventilation_batch_columnar(
+    request: Request,
+    model_id: str = None,
+    format: str = Query("json", description="結果の形式（json, arrow）")
+):
+    """
+    列形式の入力で複数スペースの換気計算を一括実行
+    
+    入力は spaceId とパラメータを列ごとの配列にしたJSON、または同じ列を持つArrow IPCストリーム
+    （Content-Type: application/vnd.apache.arrow.stream）。列ごとにまとめて検証するため、
+    行ごとにモデルを検証する /ventilation/batch より大量の入力を速く処理できます
+    
+    Args:
+        model_id: IFCモデルID
+        format: 結果の形式（arrowの場合はサマリーをスキーマのメタデータに格納）
+    """
+    if format not in COLUMNAR_FORMATS:
+        raise HTTPException(status_code=400, detail=f"formatは {list(COLUMNAR_FORMATS)} のいずれかを指定してください")
+    
+    body = await request.body()
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    try:
+        if content_type == ARROW_MEDIA_TYPE:
+            columnar = parse_columnar_arrow(body)
+        else:
+            columnar = parse_columnar_json(body)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=json.loads(e.json(include_url=False, include_input=False)))
+    except ArrowUnavailable as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        results, summary = await run_in_threadpool(_calculate_batch, iter_columnar_inputs(columnar), model_id)
+        result = build_columnar_result(results, summary)
+        if format == "arrow":
+            return Response(content=columnar_result_to_arrow(result), media_type=ARROW_MEDIA_TYPE)
+        return result
+    
+    except ArrowUnavailable as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except Exception as e:
+        logger.error(f"一括換気計算エラー: {e}")
+        raise HTTPException(status_code=500, detail=f"計算エラー: {str(e)}")
+
+
 @router.post("/{model_id}/ventilation/all", response_model=VentilationBatchResult)
 async def calculate_all_spaces_ventilation(
     model_id: str,
@@ -124,7 +253,6 @@ async def calculate_all_spaces_ventilation(
         spaces = ifc_storage[model_id]["spaces"]
         
         # 各スペースの計算入力を作成
-        from app.models import VentilationMethod
         calc_inputs = [
             VentilationCalculationInput(
                 spaceId=space.id,
@@ -139,3 +267,238 @@ async def calculate_all_spaces_ventilation(
     except Exception as e:
         logger.error(f"全スペース換気計算エラー: {e}")
         raise HTTPException(status_code=500, detail=f"計算エラー: {str(e)}")
+
+
+def _parse_methods(methods: Optional[str]) -> List[VentilationMethod]:
+    """比較する計算方法の指定（カンマ区切り）を解釈。省略時はすべての方法"""
+    if not methods:
+        return list(VentilationMethod)
+    parsed = []
+    for name in methods.split(","):
+        name = name.strip()
+        if not name:
+            continue
+        try:
+            method = VentilationMethod(name)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"未対応の計算方法です: {name}")
+        if method not in parsed:
+            parsed.append(method)
+    if not parsed:
+        raise HTTPException(status_code=400, detail="計算方法を1つ以上指定してください")
+    return parsed
+
+
+@router.post("/ventilation/governing/batch", response_model=GoverningBatchResult)
+async def calculate_governing_ventilation_batch(
+    calc_inputs: List[VentilationCalculationInput],
+    model_id: str = None,
+    methods: Optional[str] = Query(None, description="比較する計算方法（カンマ区切り。省略時はすべて）")
+):
+    """
+    複数スペースについて全計算方法の必要換気量を1回で求め、スペースごとの最大値（支配的な要求）を返す
+    
+    Args:
+        calc_inputs: 計算入力パラメータのリスト（methodは使用しない）
+        model_id: IFCモデルID
+        methods: 比較する計算方法
+    """
+    method_list = _parse_methods(methods)
+    try:
+        calculator = VentilationCalculator()
+        
+        spaces_dict = {}
+        if model_id and model_id in ifc_storage:
+            spaces_dict = {s.id: s for s in ifc_storage[model_id]["spaces"]}
+        
+        results = [
+            calculator.calculate_governing(calc_input, spaces_dict.get(calc_input.spaceId), method_list)
+            for calc_input in calc_inputs
+        ]
+        
+        total_ventilation = sum(r.requiredVentilation for r in results)
+        summary = {
+            "totalRequiredVentilation": total_ventilation,
+            "governingCounts": {
+                method.value: sum(1 for r in results if r.governingMethod == method)
+                for method in method_list
+            },
+            "okCount": sum(1 for r in results if r.complianceStatus == "OK"),
+            "ngCount": sum(1 for r in results if r.complianceStatus == "NG"),
+            "warningCount": sum(1 for r in results if r.complianceStatus == "WARNING"),
+        }
+        
+        logger.info(f"支配的換気量の計算完了: {len(results)}スペース, 合計{total_ventilation}m³/h")
+        
+        return GoverningBatchResult(
+            total=len(results),
+            results=results,
+            summary=summary
+        )
+        
+    except Exception as e:
+        logger.error(f"支配的換気量の計算エラー: {e}")
+        raise HTTPException(status_code=500, detail=f"計算エラー: {str(e)}")
+
+
+@router.post("/{model_id}/ventilation/governing", response_model=GoverningBatchResult)
+async def calculate_all_spaces_governing_ventilation(
+    model_id: str,
+    methods: Optional[str] = Query(None, description="比較する計算方法（カンマ区切り。省略時はすべて）"),
+    air_change_rate: Optional[float] = Query(None, description="床面積ベース・カスタムで使用する換気回数 (回/h)"),
+    fresh_air_per_person: Optional[float] = Query(None, description="在室人数ベースで使用する一人当たり外気量 (m³/h)")
+):
+    """
+    モデル内の全スペースについて、全計算方法を1回で比較して支配的な必要換気量を求める
+    
+    計算方法ごとに /ventilation/all を呼んで比較する代わりに使用します
+    """
+    if model_id not in ifc_storage:
+        raise HTTPException(status_code=404, detail="モデルが見つかりません")
+    
+    calc_inputs = [
+        VentilationCalculationInput(
+            spaceId=space.id,
+            airChangeRate=air_change_rate,
+            freshAirPerPerson=fresh_air_per_person
+        )
+        for space in ifc_storage[model_id]["spaces"]
+    ]
+    return await calculate_governing_ventilation_batch(calc_inputs, model_id, methods)
+
+
+@router.post("/{model_id}/ventilation/sweep", response_model=VentilationSweepResult)
+async def sweep_ventilation(model_id: str, sweep: VentilationSweepRequest):
+    """
+    人員密度・換気回数・一人当たり外気量の候補の全組み合わせ（シナリオ）について換気計算を評価
+    
+    シナリオ × スペースを1回の配列計算で求め、シナリオごとの合計・適合状況の件数を返します。
+    includeSpaceMatrix を指定するとスペースごとの値の行列も返します
+    """
+    if model_id not in ifc_storage:
+        raise HTTPException(status_code=404, detail="モデルが見つかりません")
+    
+    spaces = ifc_storage[model_id]["spaces"]
+    try:
+        result = await run_in_threadpool(run_ventilation_sweep, model_id, spaces, sweep)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    logger.info(f"換気計算スイープ完了: {result.scenarioCount}シナリオ × {result.spaceCount}スペース")
+    return result
+
+
+@router.get("/ventilation/schedules", response_model=Dict[RoomUsageType, DailySchedule])
+async def get_occupancy_schedules():
+    """年間シミュレーションで使う用途ごとの既定の在室率スケジュールを取得"""
+    return get_default_schedules()
+
+
+@router.post("/{model_id}/ventilation/annual", response_model=AnnualSimulationResult)
+async def simulate_annual_ventilation(model_id: str, simulation: AnnualSimulationRequest):
+    """
+    用途ごとの在室率スケジュールから年間（8,760時間）の時刻別必要換気量を求める
+    
+    モデル全体・階・空調系統ごとの最大値・年間換気量・負荷持続曲線を返します
+    """
+    if model_id not in ifc_storage:
+        raise HTTPException(status_code=404, detail="モデルが見つかりません")
+    
+    data = ifc_storage[model_id]
+    try:
+        result = await run_in_threadpool(run_annual_simulation, model_id, data["spaces"], data.get("groups"), simulation)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    logger.info(f"年間換気シミュレーション完了: {result.spaceCount}スペース, 年間{result.total.annualVolume:.0f}m³")
+    return result
+
+
+@router.post("/portfolio/ventilation", response_model=PortfolioResult)
+async def calculate_portfolio_ventilation(portfolio: PortfolioRequest):
+    """
+    複数モデルの全スペースの換気計算を、モデルごとにワーカープロセスで並列実行
+    
+    モデルごとの概要（必要換気量の合計・適合件数など）とモデル間の統計を返します。
+    見つからないモデル・計算に失敗したモデルは status に記録し、残りのモデルの結果は返します
+    （計算結果はモデルに保存しません）
+    """
+    model_ids = list(dict.fromkeys(portfolio.modelIds))
+    loop = asyncio.get_running_loop()
+    # ワーカープロセスの起動はイベントループを止めないよう別スレッドで行う
+    pool = await run_in_threadpool(get_process_pool)
+    
+    pending = {}
+    summaries: Dict[str, PortfolioModelSummary] = {}
+    for model_id in model_ids:
+        data = ifc_storage.get(model_id)
+        if data is None:
+            summaries[model_id] = PortfolioModelSummary(modelId=model_id, status="missing", error="モデルが見つかりません")
+            continue
+        pending[model_id] = loop.run_in_executor(
+            pool, run_with_metrics, summarize_model_ventilation, strip_spaces(data["spaces"]), portfolio.method.value
+        )
+    
+    outcomes = await asyncio.gather(*pending.values(), return_exceptions=True)
+    for model_id, outcome in zip(pending, outcomes):
+        filename = ifc_storage[model_id]["filename"] if model_id in ifc_storage else None
+        if isinstance(outcome, BaseException):
+            logger.error(f"ポートフォリオ計算エラー: {model_id}: {outcome}")
+            summaries[model_id] = PortfolioModelSummary(
+                modelId=model_id, status="error", filename=filename, error=f"計算エラー: {outcome}"
+            )
+            continue
+        summary, snapshot = outcome
+        merge_metrics(snapshot)
+        summaries[model_id] = PortfolioModelSummary(modelId=model_id, status="success", filename=filename, **summary)
+    
+    result = build_portfolio_result(portfolio.method, [summaries[model_id] for model_id in model_ids])
+    logger.info(
+        f"ポートフォリオ換気計算完了: {result.succeededCount}/{result.modelCount}モデル, 合計{result.totalRequiredVentilation}m³/h"
+    )
+    return result
+
+
+@router.get("/{model_id}/ventilation/export")
+async def export_ventilation_results(
+    model_id: str,
+    method: str = Query("building_code", description="計算方法（保存済みの結果がないスペースに使用）"),
+    format: str = Query("csv", description="出力形式（csv, xlsx）")
+):
+    """
+    モデル内の全スペースの換気計算結果をCSV / XLSXとしてストリーミング出力
+    
+    指定した計算方法の保存済み結果があればそれを使用し、
+    ない場合はスペースごとに計算しながら1行ずつ送信します
+    """
+    if model_id not in ifc_storage:
+        raise HTTPException(status_code=404, detail="モデルが見つかりません")
+    
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"formatは {list(EXPORT_FORMATS)} のいずれかを指定してください")
+    
+    try:
+        calc_method = VentilationMethod(method)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"未対応の計算方法です: {method}")
+    
+    data = ifc_storage[model_id]
+    
+    def iter_results() -> Iterator[VentilationCalculationResult]:
+        calculator = VentilationCalculator()
+        stored_results = data["results"]
+        for space in data["spaces"]:
+            result = stored_results.get(space.id)
+            if result is None or result.method != calc_method:
+                result = calculator.calculate(
+                    VentilationCalculationInput(spaceId=space.id, method=calc_method),
+                    space
+                )
+            yield result
+    
+    filename = f"{os.path.splitext(data['filename'])[0]}_ventilation_{calc_method.value}.{format}"
+    return StreamingResponse(
+        iter_export(format, RESULT_COLUMNS, iter_result_rows(iter_results()), sheet_name="Ventilation"),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -0,0 +1,123 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+import logging
+
+from app.models import (
+    GroupKind,
+    SpaceGroup,
+    SpaceGroupList,
+    GroupCreate,
+    GroupUpdate,
+    GroupMembershipUpdate
+)
+from app.services.grouping import GroupIndex
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/ifc", tags=["Groups"])
+
+# IFCストレージへの参照（本来は依存性注入で渡すべき）
+from app.api.ifc import ifc_storage
+
+
+def _get_groups(model_id: str) -> GroupIndex:
+    if model_id not in ifc_storage:
+        raise HTTPException(status_code=404, detail="モデルが見つかりません")
+    return ifc_storage[model_id]["groups"]
+
+
+def _group_error(e: Exception) -> HTTPException:
+    """グループ操作のエラーをHTTPエラーに変換（KeyErrorは404、ValueErrorは400）"""
+    if isinstance(e, KeyError):
+        return HTTPException(status_code=404, detail=e.args[0])
+    return HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/{model_id}/groups", response_model=SpaceGroupList)
+async def list_groups(
+    model_id: str,
+    kind: Optional[GroupKind] = Query(None, description="グループの種類（storey, usage, zone, system）"),
+    include_spaces: bool = Query(False, description="所属スペースID一覧（spaceIds）を含める")
+):
+    """
+    グループ一覧と集計値を取得
+
+    集計値はスペース・計算結果・所属の変更時に差分で更新した値を返します（取得時に再集計しません）。
+    所属スペースID一覧は既定では含めず、`include_spaces=true` または各グループの取得で参照します
+    """
+    groups = _get_groups(model_id)
+    group_list = groups.list_groups(kind, include_spaces=include_spaces)
+    return SpaceGroupList(
+        total=len(group_list),
+        groups=group_list,
+        modelTotals=groups.get_model_totals()
+    )
+
+
+@router.post("/{model_id}/groups", response_model=SpaceGroup, status_code=201)
+async def create_group(model_id: str, group: GroupCreate):
+    """
+    ゾーン・空調系統を作成
+
+    親グループを指定すると、子グループの集計値が親グループにも加算されます
+    """
+    groups = _get_groups(model_id)
+    try:
+        created = groups.create_group(group.kind, group.name, group.parentId, group.spaceIds)
+    except (KeyError, ValueError) as e:
+        raise _group_error(e)
+    logger.info(f"グループを作成しました: {model_id}/{created.id} ({len(created.spaceIds)} スペース)")
+    return created
+
+
+@router.get("/{model_id}/groups/{group_id}", response_model=SpaceGroup)
+async def get_group(
+    model_id: str,
+    group_id: str,
+    include_spaces: bool = Query(True, description="所属スペースID一覧（spaceIds）を含める（falseで集計値のみ）")
+):
+    """グループの詳細と集計値を取得"""
+    group = _get_groups(model_id).get_group(group_id, include_spaces=include_spaces)
+    if group is None:
+        raise HTTPException(status_code=404, detail="グループが見つかりません")
+    return group
+
+
+@router.patch("/{model_id}/groups/{group_id}", response_model=SpaceGroup)
+async def update_group(model_id: str, group_id: str, update: GroupUpdate):
+    """グループ名・親グループを変更（parentIdにnullを指定すると親なし）"""
+    groups = _get_groups(model_id)
+    try:
+        return groups.update_group(
+            group_id,
+            name=update.name,
+            parent_id=update.parentId,
+            set_parent="parentId" in update.model_fields_set
+        )
+    except (KeyError, ValueError) as e:
+        raise _group_error(e)
+
+
+@router.post("/{model_id}/groups/{group_id}/spaces", response_model=SpaceGroup)
+async def update_group_members(model_id: str, group_id: str, update: GroupMembershipUpdate):
+    """
+    グループにスペースを追加・削除
+
+    追加したスペースが同じ種類の別のグループに所属している場合は、そちらから移動します
+    """
+    groups = _get_groups(model_id)
+    try:
+        return groups.update_members(group_id, add=update.add, remove=update.remove)
+    except (KeyError, ValueError) as e:
+        raise _group_error(e)
+
+
+@router.delete("/{model_id}/groups/{group_id}")
+async def delete_group(model_id: str, group_id: str):
+    """グループを削除（子グループは削除したグループの親に付け替えます）"""
+    groups = _get_groups(model_id)
+    try:
+        groups.delete_group(group_id)
+    except (KeyError, ValueError) as e:
+        raise _group_error(e)
+    return {"message": "グループを削除しました", "groupId": group_id}
@@ -1,12 +1,70 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, HTTPException, Request, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from datetime import datetime
+import asyncio
+import hashlib
+import json
 import uuid
 import os
 import logging
-from typing import Dict
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional, List, Any, Tuple
 
-from app.models import IFCUploadResponse, IFCModelInfo, SpaceList, Space
-from app.services.ifc_parser import IFCParserService
+from app.models import (
+    IFCUploadResponse,
+    IFCModelInfo,
+    SpaceList,
+    Space,
+    FloorPlan,
+    FloorPlanSummary,
+    FloorPlanList,
+    EquipmentList,
+    ParseStatus,
+    MeshSummary,
+    MeshInstance,
+    MeshInstanceList,
+    SpaceUpdate
+)
+from app.services.property_profile import PropertyProfile, resolve_property_profile
+from app.services.footprint import build_floor_plans, rebuild_floor_plans
+from app.services.grouping import GroupIndex
+from app.services.federation import merge_models
+from app.services.worker_pool import get_process_pool, load_parser
+from app.services.metrics import span, run_with_metrics, merge_metrics
+from app.services.gltf_export import export_glb, remove_glb_cache, SUPPORTED_LODS
+from app.services.geometry_store import (
+    get_store_path,
+    write_geometry_store,
+    open_geometry_store,
+    remove_geometry_store
+)
+from app.services.export import (
+    SPACE_COLUMNS,
+    EXPORT_FORMATS,
+    MEDIA_TYPES,
+    collect_property_keys,
+    iter_space_rows,
+    iter_export
+)
+from app.services.uploads import (
+    SUPPORTED_UPLOAD_SUFFIXES,
+    UploadTooLarge,
+    InvalidUpload,
+    save_upload_file,
+    is_supported_upload,
+    get_ifc_filename
+)
+from app.services.parse_jobs import ParseJob, parse_jobs
+from app.services.admission import (
+    AdmissionTicket,
+    AdmissionRejected,
+    estimate_parse_cost,
+    get_admission_controller
+)
+from app.api.responses import range_file_response, BufferResponse
+from app.api.caching import cached_json_response, invalidate_response_cache
 
 logger = logging.getLogger(__name__)
 
@@ -15,149 +73,905 @@ router = APIRouter(prefix="/api/ifc", tags=["IFC"])
 # 一時的なストレージ（実際の実装ではDBやファイルストレージを使用）
 ifc_storage: Dict[str, Dict] = {}
 UPLOAD_DIR = "/tmp/ifc_uploads"
+GLTF_CACHE_DIR = os.path.join(UPLOAD_DIR, "gltf")
+GEOMETRY_STORE_DIR = os.path.join(UPLOAD_DIR, "geometry")
+
+# スペース配信（SSE）で更新がない場合にkeep-aliveを送る間隔（秒）
+SSE_KEEPALIVE_SECONDS = 15.0
+
+# 階レベルが未設定のスペースをまとめた平面図のキー
+UNASSIGNED_FLOOR_KEY = "_unassigned"
+
+# 解析の開始を待っているバックグラウンドタスク（実行中に破棄されないよう参照を保持）
+_pending_parse_starts: set = set()
+
+# 平面図の部分更新を直列化するロック（同時のスペース変更で更新が失われないようにする）
+_floor_plan_lock = threading.Lock()
 
 # アップロードディレクトリを作成
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
+def _register_model(
+    model_id: str,
+    parsed: Dict[str, Any],
+    file_paths: List[str],
+    filename: str,
+    file_size: int,
+    content_hash: str,
+    sources: Optional[List[Dict[str, Any]]] = None,
+    property_profile: Optional[PropertyProfile] = None
+) -> Dict[str, Any]:
+    """
+    解析済みモデルから付随データを作成し、ストレージに登録
+    
+    Args:
+        parsed: IFCParserService.build_model() の戻り値（または統合したモデル）
+        file_paths: 保存したIFCファイルのパス
+        sources: 複数ファイルを統合したモデルの場合、元ファイルの情報
+        property_profile: 解析時に指定したプロパティ抽出プロファイル（省略時はすべて）
+    """
+    spaces = parsed["spaces"]
+    
+    # ジオメトリをワーカー間で共有するバイナリストアに書き出す
+    with span("model.geometry_store"):
+        write_geometry_store(spaces, get_store_path(GEOMETRY_STORE_DIR, model_id), parsed.get("meshes"))
+    
+    # 階ごとの平面図データ
+    with span("model.floor_plans"):
+        floor_plans = build_floor_plans(spaces)
+    
+    # 階・用途・ゾーン・空調系統ごとの集計
+    with span("model.groups"):
+        groups = GroupIndex(spaces)
+    
+    data = {
+        "file_paths": file_paths,
+        "filename": filename,
+        "file_size": file_size,
+        "content_hash": content_hash,
+        "property_profile": property_profile or PropertyProfile(include_all=True),
+        "revision": 0,
+        "response_cache": {},
+        "uploaded_at": datetime.now(),
+        "ifc_schema": parsed["ifc_schema"],
+        "project_info": parsed["project_info"],
+        "spaces": spaces,
+        "equipment": parsed["equipment"],
+        "floor_plans": floor_plans,
+        "meshes": parsed.get("meshes") or {},
+        "property_keys": collect_property_keys(spaces),
+        "results": {},
+        "groups": groups,
+        "stats": parsed["stats"],
+        "sources": sources or []
+    }
+    ifc_storage[model_id] = data
+    
+    logger.info(f"IFCファイル {filename} を解析完了: {len(spaces)} スペース, {len(data['equipment'])} 機器")
+    return data
+
+
+def _resolve_profile(properties: Optional[str]) -> PropertyProfile:
+    """アップロード時のプロパティ指定を解釈（省略時はサーバーの既定値）"""
+    try:
+        return resolve_property_profile(properties)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _discard_model_files(model_id: str, *file_paths: str) -> None:
+    """解析に失敗したモデルのファイルを削除"""
+    for file_path in file_paths:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+    remove_geometry_store(get_store_path(GEOMETRY_STORE_DIR, model_id))
+
+
+async def _save_upload(model_id: str, file: UploadFile, file_path: str) -> Tuple[int, str]:
+    """
+    アップロードファイルを保存（圧縮されたIFCは展開して保存）
+    
+    サイズの上限を超える場合は413、展開できない場合は400を返す
+    """
+    try:
+        return await save_upload_file(file, file_path)
+    except UploadTooLarge as e:
+        _discard_model_files(model_id, file_path)
+        raise HTTPException(status_code=413, detail=f"{e}: {file.filename}")
+    except InvalidUpload as e:
+        _discard_model_files(model_id, file_path)
+        raise HTTPException(status_code=400, detail=f"{e}: {file.filename}")
+
+
+def _check_upload_filename(file: UploadFile) -> None:
+    if not is_supported_upload(file.filename):
+        raise HTTPException(
+            status_code=400,
+            detail=f"IFCファイル（{', '.join(SUPPORTED_UPLOAD_SUFFIXES)}）のみアップロード可能です: {file.filename}"
+        )
+
+
+async def _admit_parse(model_id: str, file_paths: List[str], cpu_slots: int = 1) -> AdmissionTicket:
+    """
+    ファイルから解析コストを見積もって解析を受け付ける
+    
+    待ち行列が一杯の場合はファイルを削除し、503とRetry-Afterを返す
+    """
+    costs = await run_in_threadpool(lambda: [estimate_parse_cost(path) for path in file_paths])
+    cost = sum(costs[1:], costs[0])
+    try:
+        return get_admission_controller().submit(model_id, cost, cpu_slots)
+    except AdmissionRejected as e:
+        logger.warning(f"解析の受け付けを拒否しました: {model_id} (Retry-After: {e.retry_after}秒)")
+        _discard_model_files(model_id, *file_paths)
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+
+def _when_all_done(futures: List[Future], callback: Callable[[], None]) -> None:
+    """すべての Future が終了（取り消しを含む）した時点で callback を呼ぶ"""
+    remaining = [len(futures)]
+    lock = threading.Lock()
+    
+    def on_done(_: Future) -> None:
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        callback()
+    
+    for future in futures:
+        future.add_done_callback(on_done)
+
+
+def _finish_project_parse(model_id: str, file_paths: List[str], ticket: AdmissionTicket, cancelled: threading.Event) -> None:
+    """ワーカープロセスでの解析がすべて終わった時点で受付票を解放（取り消し・失敗時はファイルも削除）"""
+    get_admission_controller().release(ticket)
+    if cancelled.is_set():
+        _discard_model_files(model_id, *file_paths)
+
+
 @router.post("/upload", response_model=IFCUploadResponse)
-async def upload_ifc_file(file: UploadFile = File(...)):
+async def upload_ifc_file(
+    file: UploadFile = File(...),
+    properties: Optional[str] = Query(
+        None,
+        description="保持するプロパティ（カンマ区切り。Pset名 / Pset名.プロパティ名 / *.プロパティ名、* はすべて、none は保持しない）。省略時はサーバーの既定値"
+    )
+):
     """
     IFCファイルをアップロードして解析
     """
     # ファイル検証
-    if not file.filename.lower().endswith('.ifc'):
-        raise HTTPException(status_code=400, detail="IFCファイルのみアップロード可能です")
+    _check_upload_filename(file)
+    profile = _resolve_profile(properties)
     
     # ユニークなモデルIDを生成
     model_id = str(uuid.uuid4())
     file_path = os.path.join(UPLOAD_DIR, f"{model_id}.ifc")
+    filename = get_ifc_filename(file.filename)
+    
+    ticket: Optional[AdmissionTicket] = None
+    # 解析スレッドに受付票の解放・ファイルの削除を引き渡したか
+    handed_off = False
+    # リクエストが取り消された（解析スレッドは結果を登録しない）
+    cancelled = threading.Event()
     
     try:
-        # ファイル保存
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        # ファイル保存（圧縮ファイルは展開して保存。内容ハッシュはETagに使用）
+        file_size, content_hash = await _save_upload(model_id, file, file_path)
         
-        file_size = len(content)
+        # 解析コストを見積もり、メモリ予算・同時実行数に空きができるまで待つ
+        ticket = await _admit_parse(model_id, [file_path])
+        await ticket.wait()
         
-        # IFCファイルを解析
-        parser = IFCParserService(file_path)
+        def parse_and_register() -> Optional[Dict[str, Any]]:
+            parse_ifc_file = load_parser().parse_ifc_file
+            
+            # 受付票は解析が実際に終わった時点で解放する（リクエストが取り消されても解析中はメモリを使うため）
+            try:
+                # スペース・機器などの情報を取得してストレージに保存
+                parsed = parse_ifc_file(file_path, profile)
+                if cancelled.is_set():
+                    _discard_model_files(model_id, file_path)
+                    return None
+                return _register_model(
+                    model_id, parsed, [file_path], filename, file_size, content_hash, property_profile=profile
+                )
+            except Exception:
+                _discard_model_files(model_id, file_path)
+                raise
+            finally:
+                get_admission_controller().release(ticket)
         
-        # プロジェクト情報を取得
-        project_info = parser.get_project_info()
+        handed_off = True
+        try:
+            data = await run_in_threadpool(parse_and_register)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
         
-        # スペース情報を取得
-        spaces = parser.get_all_spaces()
-        
-        # 統計情報を取得
-        stats = parser.get_statistics()
+        return IFCUploadResponse(
+            modelId=model_id,
+            filename=filename,
+            fileSize=file_size,
+            uploadedAt=datetime.now(),
+            totalSpaces=len(data["spaces"]),
+            totalEquipment=len(data["equipment"]),
+            ifcSchema=data["ifc_schema"],
+            projectName=data["project_info"].get("name"),
+            parseStatus="success",
+            warnings=[]
+        )
         
-        # ストレージに保存
-        ifc_storage[model_id] = {
-            "file_path": file_path,
-            "filename": file.filename,
-            "file_size": file_size,
-            "uploaded_at": datetime.now(),
-            "project_info": project_info,
-            "spaces": spaces,
-            "stats": stats
+    except HTTPException:
+        raise
+    except BaseException as e:
+        # 解析の開始前に失敗・取り消された場合は受付票を解放してファイルを削除（開始後は解析スレッドが行う）
+        if not handed_off:
+            if ticket is not None:
+                get_admission_controller().release(ticket)
+            _discard_model_files(model_id, file_path)
+        if not isinstance(e, Exception):
+            logger.info(f"IFCファイルのアップロードが取り消されました: {model_id}")
+            raise
+        logger.error(f"IFCファイルのアップロードエラー: {e}")
+        raise HTTPException(status_code=500, detail=f"IFCファイルの解析に失敗しました: {str(e)}")
+
+
+@router.post("/upload/stream", response_model=IFCUploadResponse)
+async def upload_ifc_file_streaming(
+    file: UploadFile = File(...),
+    properties: Optional[str] = Query(
+        None,
+        description="保持するプロパティ（カンマ区切り。Pset名 / Pset名.プロパティ名 / *.プロパティ名、* はすべて、none は保持しない）。省略時はサーバーの既定値"
+    )
+):
+    """
+    IFCファイルをアップロードし、バックグラウンドで解析を開始
+    
+    解析の完了を待たずにモデルIDを返します。解析済みのスペースは
+    `GET /api/ifc/{model_id}/spaces/stream`（Server-Sent Events）で順次受信できます
+    """
+    _check_upload_filename(file)
+    profile = _resolve_profile(properties)
+    
+    model_id = str(uuid.uuid4())
+    file_path = os.path.join(UPLOAD_DIR, f"{model_id}.ifc")
+    filename = get_ifc_filename(file.filename)
+    
+    try:
+        file_size, content_hash = await _save_upload(model_id, file, file_path)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"IFCファイルの保存エラー: {e}")
+        _discard_model_files(model_id, file_path)
+        raise HTTPException(status_code=500, detail=f"IFCファイルの保存に失敗しました: {str(e)}")
+    
+    # 解析コストを見積もって受け付ける（待ち行列が一杯の場合は503）
+    ticket = await _admit_parse(model_id, [file_path])
+    
+    def parse(job: ParseJob) -> Dict[str, Any]:
+        try:
+            parser = load_parser().IFCParserService(file_path, profile)
+            for space in parser.iter_spaces():
+                job.add_space(space)
+            parsed = parser.build_model(job.spaces)
+            data = _register_model(
+                model_id, parsed, [file_path], filename, file_size, content_hash, property_profile=profile
+            )
+        except Exception:
+            _discard_model_files(model_id, file_path)
+            raise
+        finally:
+            get_admission_controller().release(ticket)
+        return {
+            "totalSpaces": len(data["spaces"]),
+            "totalEquipment": len(data["equipment"]),
+            "ifcSchema": data["ifc_schema"],
+            "projectName": data["project_info"].get("name"),
         }
+    
+    job = ParseJob(model_id, filename, asyncio.get_running_loop())
+    parse_jobs[model_id] = job
+    
+    # 予算に空きができた時点で解析スレッドを開始する（それまでの状態はqueued）
+    async def start_when_admitted() -> None:
+        await ticket.wait()
+        job.start(parse)
+    
+    task = asyncio.create_task(start_when_admitted())
+    _pending_parse_starts.add(task)
+    task.add_done_callback(_pending_parse_starts.discard)
+    
+    return IFCUploadResponse(
+        modelId=model_id,
+        filename=filename,
+        fileSize=file_size,
+        uploadedAt=datetime.now(),
+        totalSpaces=0,
+        parseStatus=job.status,
+        warnings=[]
+    )
+
+
+@router.post("/projects/upload", response_model=IFCUploadResponse)
+async def upload_ifc_project(
+    files: List[UploadFile] = File(...),
+    properties: Optional[str] = Query(
+        None,
+        description="保持するプロパティ（カンマ区切り。Pset名 / Pset名.プロパティ名 / *.プロパティ名、* はすべて、none は保持しない）。省略時はサーバーの既定値"
+    )
+):
+    """
+    複数のIFCファイル（意匠・機械・電気など）をアップロードし、1つのモデルとして統合
+    
+    各ファイルはワーカープロセスで並列に解析します。スペース・機器のIDは
+    「ファイル番号:エンティティID」となり、GlobalIdが重複する要素は先のファイルを優先します
+    """
+    if not files:
+        raise HTTPException(status_code=400, detail="IFCファイルを指定してください")
+    for file in files:
+        _check_upload_filename(file)
+    profile = _resolve_profile(properties)
+    
+    model_id = str(uuid.uuid4())
+    file_paths = [os.path.join(UPLOAD_DIR, f"{model_id}_{i}.ifc") for i in range(len(files))]
+    
+    ticket: Optional[AdmissionTicket] = None
+    # ワーカープロセスでの解析（受付票の解放・取り消し時のファイル削除は全解析の終了時に行う）
+    jobs: List[Future] = []
+    cancelled = threading.Event()
+    
+    try:
+        saved = []
+        for file, path in zip(files, file_paths):
+            saved.append(await _save_upload(model_id, file, path))
+        
+        # 全ファイルの解析コストを合わせて受け付ける（並列に解析するファイル数だけCPUを使う）
+        ticket = await _admit_parse(model_id, file_paths, cpu_slots=len(file_paths))
+        await ticket.wait()
         
-        # IFCスキーマバージョンの取得
-        ifc_schema = parser.ifc_file.wrapped_data.schema
+        # 解析モジュールの読み込み・ワーカープロセスの起動はイベントループを止めないよう別スレッドで行う
+        parse_ifc_file = (await run_in_threadpool(load_parser)).parse_ifc_file
         
-        logger.info(f"IFCファイル {file.filename} を解析完了: {len(spaces)} スペース")
+        # ファイルごとに別プロセスで並列に解析
+        pool = await run_in_threadpool(get_process_pool)
+        jobs = [pool.submit(run_with_metrics, parse_ifc_file, path, profile) for path in file_paths]
+        _when_all_done(jobs, lambda: _finish_project_parse(model_id, file_paths, ticket, cancelled))
+        outcomes = await asyncio.gather(*(asyncio.wrap_future(job) for job in jobs))
+        # ワーカープロセスで計測した処理時間を集計に反映
+        parsed_models = []
+        for parsed, snapshot in outcomes:
+            merge_metrics(snapshot)
+            parsed_models.append(parsed)
+        
+        merged, warnings = merge_models(parsed_models)
+        sources = [
+            {
+                "filename": get_ifc_filename(file.filename),
+                "fileSize": size,
+                "contentHash": content_hash,
+                "ifcSchema": parsed["ifc_schema"],
+                "unitScale": parsed["unit_scale"],
+                "spaceCount": len(parsed["spaces"]),
+                "equipmentCount": len(parsed["equipment"]),
+            }
+            for file, (size, content_hash), parsed in zip(files, saved, parsed_models)
+        ]
+        
+        # 統合モデルの内容ハッシュは各ファイルのハッシュから作る
+        content_hash = hashlib.sha256("".join(h for _, h in saved).encode("ascii")).hexdigest()
+        filename = " + ".join(get_ifc_filename(file.filename) for file in files)
+        total_size = sum(size for size, _ in saved)
+        data = _register_model(
+            model_id, merged, file_paths, filename, total_size, content_hash,
+            sources=sources, property_profile=profile
+        )
         
         return IFCUploadResponse(
             modelId=model_id,
-            filename=file.filename,
-            fileSize=file_size,
+            filename=filename,
+            fileSize=total_size,
             uploadedAt=datetime.now(),
-            totalSpaces=len(spaces),
-            totalEquipment=0,  # Phase 1では機器情報は未対応
-            ifcSchema=ifc_schema,
-            projectName=project_info.get("name"),
+            totalSpaces=len(data["spaces"]),
+            totalEquipment=len(data["equipment"]),
+            ifcSchema=data["ifc_schema"],
+            projectName=data["project_info"].get("name"),
             parseStatus="success",
-            warnings=[]
+            warnings=warnings
         )
         
-    except Exception as e:
-        logger.error(f"IFCファイルのアップロードエラー: {e}")
-        # エラー時はファイルを削除
-        if os.path.exists(file_path):
-            os.remove(file_path)
+    except HTTPException:
+        _discard_model_files(model_id, *file_paths)
+        raise
+    except BaseException as e:
+        if jobs:
+            # 解析中のファイルは全解析の終了時に削除する（終了済みの場合はここで削除）
+            cancelled.set()
+            if all(job.done() for job in jobs):
+                _discard_model_files(model_id, *file_paths)
+        else:
+            # 解析の開始前に失敗・取り消された場合
+            if ticket is not None:
+                get_admission_controller().release(ticket)
+            _discard_model_files(model_id, *file_paths)
+        if not isinstance(e, Exception):
+            logger.info(f"IFCプロジェクトのアップロードが取り消されました: {model_id}")
+            raise
+        logger.error(f"IFCプロジェクトのアップロードエラー: {e}")
         raise HTTPException(status_code=500, detail=f"IFCファイルの解析に失敗しました: {str(e)}")
 
 
+@router.get("/{model_id}/status", response_model=ParseStatus)
+async def get_parse_status(model_id: str):
+    """
+    モデルの解析状況を取得
+    """
+    position = get_admission_controller().get_position(model_id)
+    queue_position = position or None
+    
+    job = parse_jobs.get(model_id)
+    if job is not None:
+        return ParseStatus(
+            modelId=model_id,
+            parseStatus=job.status,
+            parsedSpaces=len(job.spaces),
+            queuePosition=queue_position,
+            error=job.error
+        )
+    
+    if model_id in ifc_storage:
+        return ParseStatus(
+            modelId=model_id,
+            parseStatus="success",
+            parsedSpaces=len(ifc_storage[model_id]["spaces"])
+        )
+    
+    if position is not None:
+        # 同期アップロードで解析待ち・解析中のモデル
+        return ParseStatus(
+            modelId=model_id,
+            parseStatus=ParseJob.STATUS_QUEUED if position else ParseJob.STATUS_PARSING,
+            queuePosition=queue_position
+        )
+    
+    raise HTTPException(status_code=404, detail="モデルが見つかりません")
+
+
+def _sse_event(event: str, data: str, event_id: Optional[int] = None) -> str:
+    """Server-Sent Eventsの1イベントを整形"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {data}")
+    return "\n".join(lines) + "\n\n"
+
+
+@router.get("/{model_id}/spaces/stream")
+async def stream_spaces(
+    request: Request,
+    model_id: str,
+    after: Optional[int] = Query(None, description="このイベントID（スペースの順番）より後から受信する")
+):
+    """
+    解析済みのスペースをServer-Sent Eventsで順次配信
+    
+    各スペース（ジオメトリを含む）を `space` イベントとして送信し、解析完了時に
+    `complete`、失敗時に `error` イベントを送信します。イベントIDはスペースの順番で、
+    再接続時は Last-Event-ID ヘッダーまたは `after` で続きから受信できます。
+    送信はクライアントの受信に合わせて1件ずつ行います
+    """
+    job = parse_jobs.get(model_id)
+    if job is None and model_id not in ifc_storage:
+        raise HTTPException(status_code=404, detail="モデルが見つかりません")
+    
+    last_event_id = request.headers.get("last-event-id")
+    if after is None and last_event_id is not None:
+        try:
+            after = int(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Last-Event-IDが不正です")
+    start = 0 if after is None else after + 1
+    
+    async def iter_events():
+        index = start
+        while True:
+            source = job.spaces if job is not None else ifc_storage[model_id]["spaces"]
+            # 1件ずつ送信し、送信が詰まっている間は次を生成しない
+            while index < len(source):
+                yield _sse_event("space", source[index].model_dump_json(), index)
+                index += 1
+            
+            if job is None or job.done:
+                break
+            if not await job.wait_for_update(index, SSE_KEEPALIVE_SECONDS):
+                yield ": keep-alive\n\n"
+        
+        if job is not None and job.status == ParseJob.STATUS_ERROR:
+            yield _sse_event("error", json.dumps({"detail": job.error}, ensure_ascii=False))
+        else:
+            summary = job.result if job is not None else {"totalSpaces": len(ifc_storage[model_id]["spaces"])}
+            yield _sse_event("complete", json.dumps(summary, ensure_ascii=False))
+    
+    return StreamingResponse(
+        iter_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/{model_id}/info", response_model=IFCModelInfo)
-async def get_ifc_model_info(model_id: str):
+async def get_ifc_model_info(request: Request, model_id: str):
     """
     IFCモデルの情報を取得
+    
+    ETag / If-None-Match に対応し、シリアライズ済みの本文を再利用します
     """
     if model_id not in ifc_storage:
         raise HTTPException(status_code=404, detail="モデルが見つかりません")
     
     data = ifc_storage[model_id]
     
-    return IFCModelInfo(
+    return cached_json_response(request, data, "info", lambda: IFCModelInfo(
         modelId=model_id,
         filename=data["filename"],
         uploadedAt=data["uploaded_at"],
         spaceCount=len(data["spaces"]),
-        equipmentCount=0,
+        equipmentCount=len(data["equipment"]),
         buildingElementCount=data["stats"].get("elements", 0),
         projectInfo=data["project_info"],
-        metadata=data["stats"]
-    )
+        propertyProfile=data["property_profile"].key,
+        metadata={**data["stats"], "sources": data["sources"]} if data["sources"] else data["stats"]
+    ))
 
 
 @router.get("/{model_id}/spaces", response_model=SpaceList)
-async def get_spaces(model_id: str):
+async def get_spaces(request: Request, model_id: str):
     """
     モデルのスペース一覧を取得
+    
+    ETag / If-None-Match に対応し、シリアライズ済み・圧縮済みの本文を再利用します
     """
     if model_id not in ifc_storage:
         raise HTTPException(status_code=404, detail="モデルが見つかりません")
     
-    spaces = ifc_storage[model_id]["spaces"]
+    data = ifc_storage[model_id]
+    spaces = data["spaces"]
     
-    return SpaceList(
+    return cached_json_response(request, data, "spaces", lambda: SpaceList(
         total=len(spaces),
         spaces=spaces
+    ))
+
+
+@router.get("/{model_id}/equipment", response_model=EquipmentList)
+async def get_equipment(model_id: str, space_id: Optional[str] = None):
+    """
+    モデルの設備機器一覧を取得
+    
+    Args:
+        model_id: IFCモデルID
+        space_id: 指定した場合はそのスペースに属する機器のみ返す
+    """
+    if model_id not in ifc_storage:
+        raise HTTPException(status_code=404, detail="モデルが見つかりません")
+    
+    equipment = ifc_storage[model_id]["equipment"]
+    if space_id is not None:
+        equipment = [e for e in equipment if e.spaceId == space_id]
+    
+    return EquipmentList(
+        total=len(equipment),
+        equipment=equipment
     )
 
 
 @router.get("/{model_id}/spaces/{space_id}", response_model=Space)
-async def get_space_detail(model_id: str, space_id: str):
+async def get_space_detail(request: Request, model_id: str, space_id: str):
     """
     特定のスペースの詳細情報を取得
     """
     if model_id not in ifc_storage:
         raise HTTPException(status_code=404, detail="モデルが見つかりません")
     
-    spaces = ifc_storage[model_id]["spaces"]
+    data = ifc_storage[model_id]
     
     # スペースを検索
-    for space in spaces:
+    for space in data["spaces"]:
         if space.id == space_id:
-            return space
+            return cached_json_response(request, data, f"space:{space_id}", lambda: space)
     
     raise HTTPException(status_code=404, detail="スペースが見つかりません")
 
 
+def _refresh_floor_plans(data: Dict[str, Any], floor_levels: set) -> None:
+    """変更前後の階の平面図だけを現在のスペースから作り直す"""
+    with _floor_plan_lock:
+        data["floor_plans"] = rebuild_floor_plans(data["floor_plans"], data["spaces"], floor_levels)
+
+
+@router.patch("/{model_id}/spaces/{space_id}", response_model=Space)
+async def update_space(model_id: str, space_id: str, update: SpaceUpdate):
+    """
+    スペースの入力値（面積・階・用途・在室人数など）を変更
+
+    保存済みの計算結果は入力値と合わなくなるため破棄し、グループの集計値は差分だけ更新します
+    """
+    if model_id not in ifc_storage:
+        raise HTTPException(status_code=404, detail="モデルが見つかりません")
+
+    data = ifc_storage[model_id]
+    spaces = data["spaces"]
+    index = next((i for i, s in enumerate(spaces) if s.id == space_id), None)
+    if index is None:
+        raise HTTPException(status_code=404, detail="スペースが見つかりません")
+
+    changes = update.model_dump(exclude_unset=True)
+    if "name" in changes and changes["name"] is None:
+        raise HTTPException(status_code=400, detail="室名は空にできません")
+    previous = spaces[index]
+    space = previous.model_copy(update=changes)
+    spaces[index] = space
+    data["results"].pop(space_id, None)
+    data["groups"].update_space(space, None)
+
+    # 平面図・GLBは階レベル・室名を含むため作り直す（GLBは次回の取得時に再出力）
+    if "floorLevel" in changes or "name" in changes:
+        remove_glb_cache(GLTF_CACHE_DIR, model_id)
+        await run_in_threadpool(_refresh_floor_plans, data, {previous.floorLevel, space.floorLevel})
+    invalidate_response_cache(data)
+
+    logger.info(f"スペースを更新しました: {model_id}/{space_id} ({', '.join(changes) or '変更なし'})")
+    return space
+
+
+@router.get("/{model_id}/geometry.bin")
+async def get_geometry_store(request: Request, model_id: str):
+    """
+    モデル全体のジオメトリストア（バイナリ）を取得
+    
+    頂点プール・インデックスプール・スペースごとのオフセット表を含むファイルを
+    そのまま配信します（Rangeリクエスト対応）
+    """
+    path = get_store_path(GEOMETRY_STORE_DIR, model_id)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="モデルが見つかりません")
+    
+    return range_file_response(request, path, "application/octet-stream")
+
+
+@router.get("/{model_id}/spaces/{space_id}/geometry")
+async def get_space_geometry(model_id: str, space_id: str):
+    """
+    特定スペースのジオメトリをバイナリで取得
+    
+    本文はワールド座標の頂点（float32 × 3）に続いてインデックス（uint32）が並びます。
+    件数は X-Vertex-Count / X-Index-Count ヘッダーで、共有メッシュのIDは X-Mesh-Id ヘッダーで返します
+    """
+    # ストアファイルはワーカー間で共有されるため、メモリ上のモデル有無に関係なく参照する
+    store = open_geometry_store(get_store_path(GEOMETRY_STORE_DIR, model_id))
+    if store is None:
+        raise HTTPException(status_code=404, detail="モデルが見つかりません")
+    
+    buffers = store.get_space_buffers(space_id)
+    if buffers is None:
+        raise HTTPException(status_code=404, detail="スペースが見つかりません")
+    
+    vertex_bytes, index_bytes = buffers
+    mesh_id, _ = store.get_instance(space_id)
+    headers = {
+        "X-Vertex-Count": str(len(vertex_bytes) // 12),
+        "X-Index-Count": str(len(index_bytes) // 4),
+    }
+    if mesh_id is not None:
+        headers["X-Mesh-Id"] = mesh_id
+    
+    # 共有メッシュでなければmmapのスライスをコピーせずにそのまま送信する
+    return BufferResponse([vertex_bytes, index_bytes], media_type="application/octet-stream", headers=headers)
+
+
+@router.get("/{model_id}/meshes", response_model=MeshInstanceList)
+async def get_meshes(request: Request, model_id: str):
+    """
+    メッシュとスペースごとのインスタンス（変換行列）の一覧を取得
+    
+    同じ形状のスペースは1つのメッシュを共有します。ビューアーは各メッシュを
+    `GET /api/ifc/{model_id}/meshes/{mesh_id}` で1回だけ取得し、変換行列で配置できます
+    """
+    if model_id not in ifc_storage:
+        raise HTTPException(status_code=404, detail="モデルが見つかりません")
+    
+    store = open_geometry_store(get_store_path(GEOMETRY_STORE_DIR, model_id))
+    if store is None:
+        raise HTTPException(status_code=404, detail="モデルが見つかりません")
+    
+    def build() -> MeshInstanceList:
+        instance_counts = store.count_instances()
+        meshes = []
+        for mesh_id in store.mesh_ids:
+            _, vertex_count, _, index_count = store.get_mesh_entry(mesh_id)
+            meshes.append(MeshSummary(
+                meshId=mesh_id,
+                vertexCount=vertex_count,
+                indexCount=index_count,
+                instanceCount=instance_counts.get(mesh_id, 0)
+            ))
+        instances = [
+            MeshInstance(spaceId=space_id, meshId=mesh_id, transform=transform.ravel().tolist())
+            for space_id, mesh_id, transform in store.iter_instances()
+            if mesh_id is not None
+        ]
+        return MeshInstanceList(
+            totalMeshes=len(meshes),
+            totalInstances=len(instances),
+            meshes=meshes,
+            instances=instances
+        )
+    
+    return cached_json_response(request, ifc_storage[model_id], "meshes", build)
+
+
+@router.get("/{model_id}/meshes/{mesh_id}")
+async def get_mesh(model_id: str, mesh_id: str):
+    """
+    共有メッシュをバイナリで取得
+    
+    本文はメッシュ座標の頂点（float32 × 3）に続いてインデックス（uint32）が並びます。
+    件数は X-Vertex-Count / X-Index-Count ヘッダーで返します
+    """
+    store = open_geometry_store(get_store_path(GEOMETRY_STORE_DIR, model_id))
+    if store is None:
+        raise HTTPException(status_code=404, detail="モデルが見つかりません")
+    
+    buffers = store.get_mesh_buffers(mesh_id)
+    if buffers is None:
+        raise HTTPException(status_code=404, detail="メッシュが見つかりません")
+    
+    vertex_bytes, index_bytes = buffers
+    return BufferResponse(
+        [vertex_bytes, index_bytes],
+        media_type="application/octet-stream",
+        headers={
+            "X-Vertex-Count": str(len(vertex_bytes) // 12),
+            "X-Index-Count": str(len(index_bytes) // 4),
+        }
+    )
+
+
+@router.get("/{model_id}/plans", response_model=FloorPlanList)
+async def get_floor_plans(model_id: str):
+    """
+    平面図データのある階の一覧を取得
+    """
+    if model_id not in ifc_storage:
+        raise HTTPException(status_code=404, detail="モデルが見つかりません")
+    
+    floor_plans = ifc_storage[model_id]["floor_plans"]
+    
+    return FloorPlanList(
+        total=len(floor_plans),
+        floors=[
+            FloorPlanSummary(
+                floorLevel=plan.floorLevel,
+                elevation=plan.elevation,
+                spaceCount=plan.spaceCount,
+                totalArea=plan.totalArea
+            )
+            for plan in floor_plans
+        ]
+    )
+
+
+@router.get("/{model_id}/plans/{floor_level}", response_model=FloorPlan)
+async def get_floor_plan(model_id: str, floor_level: str):
+    """
+    指定した階の平面図データ（スペースのフットプリント）を取得
+    
+    階レベルが未設定のスペースは `_unassigned` で取得できます
+    """
+    if model_id not in ifc_storage:
+        raise HTTPException(status_code=404, detail="モデルが見つかりません")
+    
+    target = None if floor_level == UNASSIGNED_FLOOR_KEY else floor_level
+    for plan in ifc_storage[model_id]["floor_plans"]:
+        if plan.floorLevel == target:
+            return plan
+    
+    raise HTTPException(status_code=404, detail="階が見つかりません")
+
+
+@router.get("/{model_id}/export/spaces")
+async def export_spaces(
+    model_id: str,
+    format: str = Query("csv", description="出力形式（csv, xlsx）")
+):
+    """
+    スペース一覧をCSV / XLSXとしてストリーミング出力
+    
+    アップロード時に集計したプロパティキーの和集合を列として、1行ずつ生成して送信します
+    """
+    if model_id not in ifc_storage:
+        raise HTTPException(status_code=404, detail="モデルが見つかりません")
+    
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"formatは {list(EXPORT_FORMATS)} のいずれかを指定してください")
+    
+    data = ifc_storage[model_id]
+    property_keys = data["property_keys"]
+    header = SPACE_COLUMNS + property_keys
+    rows = iter_space_rows(data["spaces"], property_keys)
+    
+    filename = f"{os.path.splitext(data['filename'])[0]}_spaces.{format}"
+    return StreamingResponse(
+        iter_export(format, header, rows, sheet_name="Spaces"),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/{model_id}/gltf")
+async def export_gltf(
+    request: Request,
+    model_id: str,
+    lod: int = Query(0, description="詳細度（0: メッシュ, 1: バウンディングボックス）")
+):
+    """
+    モデルのスペースをGLB（glTFバイナリ）ファイルとして取得
+    
+    ファイルは初回のみ作成してディスクにキャッシュし、Rangeリクエストに対応して配信します
+    """
+    if model_id not in ifc_storage:
+        raise HTTPException(status_code=404, detail="モデルが見つかりません")
+    
+    if lod not in SUPPORTED_LODS:
+        raise HTTPException(status_code=400, detail=f"lodは {list(SUPPORTED_LODS)} のいずれかを指定してください")
+    
+    try:
+        spaces = ifc_storage[model_id]["spaces"]
+        meshes = ifc_storage[model_id]["meshes"]
+        path = await run_in_threadpool(export_glb, spaces, GLTF_CACHE_DIR, model_id, lod, meshes)
+    except Exception as e:
+        logger.error(f"GLBエクスポートエラー: {e}")
+        raise HTTPException(status_code=500, detail=f"GLBファイルの作成に失敗しました: {str(e)}")
+    
+    # 作成中にモデルが削除された場合は作成したファイルを残さない
+    if model_id not in ifc_storage:
+        remove_glb_cache(GLTF_CACHE_DIR, model_id, forget=True)
+        raise HTTPException(status_code=404, detail="モデルが見つかりません")
+    
+    filename = f"{os.path.splitext(ifc_storage[model_id]['filename'])[0]}_lod{lod}.glb"
+    return range_file_response(request, path, "model/gltf-binary", filename)
+
+
 @router.delete("/{model_id}")
 async def delete_ifc_model(model_id: str):
     """
     IFCモデルを削除
     """
     if model_id not in ifc_storage:
-        raise HTTPException(status_code=404, detail="モデルが見つかりません")
+        # 解析に失敗したストリーミング解析のジョブのみ残っている場合
+        job = parse_jobs.get(model_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail="モデルが見つかりません")
+        if job.status != ParseJob.STATUS_ERROR:
+            raise HTTPException(status_code=409, detail="解析中のモデルは削除できません")
+        del parse_jobs[model_id]
+        return {"message": "モデルを削除しました", "modelId": model_id}
     
     # ファイルを削除
-    file_path = ifc_storage[model_id]["file_path"]
-    if os.path.exists(file_path):
-        os.remove(file_path)
+    for file_path in ifc_storage[model_id]["file_paths"]:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+    remove_glb_cache(GLTF_CACHE_DIR, model_id, forget=True)
+    remove_geometry_store(get_store_path(GEOMETRY_STORE_DIR, model_id))
+    parse_jobs.pop(model_id, None)
     
     # ストレージから削除
     del ifc_storage[model_id]
@@ -0,0 +1,137 @@
+"""
+ファイル配信用のレスポンスユーティリティ
+HTTP Rangeリクエスト（部分取得）とmemoryviewのゼロコピー送信に対応する
+"""
+from typing import Optional, Tuple, Sequence, Mapping
+import os
+
+import aiofiles
+from fastapi import Request, HTTPException
+from fastapi.responses import FileResponse, StreamingResponse, Response
+from starlette.types import Scope, Receive, Send
+
+# 1回の読み込みサイズ
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_range_header(range_header: str, file_size: int) -> Optional[Tuple[int, int]]:
+    """
+    Rangeヘッダーを解析して (開始, 終了) バイト位置を返す
+
+    単一範囲のみ対応。複数範囲や解釈できない指定の場合はNoneを返す
+    """
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+
+    start_str, _, end_str = ranges.strip().partition("-")
+    try:
+        if start_str == "":
+            # 末尾からのバイト数指定（bytes=-500）
+            suffix = int(end_str)
+            if suffix <= 0:
+                raise HTTPException(
+                    status_code=416,
+                    detail="範囲指定が不正です",
+                    headers={"Content-Range": f"bytes */{file_size}"}
+                )
+            start = max(file_size - suffix, 0)
+            end = file_size - 1
+        else:
+            start = int(start_str)
+            end = int(end_str) if end_str else file_size - 1
+    except ValueError:
+        return None
+
+    if start >= file_size or start > end:
+        raise HTTPException(
+            status_code=416,
+            detail="範囲指定が不正です",
+            headers={"Content-Range": f"bytes */{file_size}"}
+        )
+    return start, min(end, file_size - 1)
+
+
+async def _iter_file_range(path: str, start: int, end: int):
+    """ファイルの指定範囲を少しずつ読み出す"""
+    async with aiofiles.open(path, "rb") as f:
+        await f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def range_file_response(
+    request: Request,
+    path: str,
+    media_type: str,
+    filename: Optional[str] = None
+) -> Response:
+    """
+    Rangeリクエストに対応したファイルレスポンスを作成
+
+    Rangeヘッダーがない場合はファイル全体を返し、
+    ある場合は206 Partial Contentで指定範囲のみを返す
+    """
+    file_size = os.path.getsize(path)
+    headers = {"Accept-Ranges": "bytes"}
+    if filename:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+
+    range_header = request.headers.get("range")
+    byte_range = parse_range_header(range_header, file_size) if range_header else None
+    if byte_range is None:
+        return FileResponse(path, media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        _iter_file_range(path, start, end),
+        status_code=206,
+        media_type=media_type,
+        headers=headers
+    )
+
+
+class BufferResponse(Response):
+    """
+    memoryviewなどのバッファをコピーせずにそのまま送信するレスポンス
+
+    mmapのスライスを連結せずに順番に送信するために使用する
+    """
+
+    def __init__(
+        self,
+        buffers: Sequence[memoryview],
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        media_type: Optional[str] = None
+    ):
+        self.buffers = list(buffers)
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = None
+        self.init_headers(headers)
+        self.raw_headers = [
+            (k, v) for k, v in self.raw_headers if k != b"content-length"
+        ] + [(b"content-length", str(sum(len(b) for b in self.buffers)).encode("latin-1"))]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers,
+        })
+        for i, buffer in enumerate(self.buffers):
+            await send({
+                "type": "http.response.body",
+                "body": buffer,
+                "more_body": i < len(self.buffers) - 1,
+            })
+        if not self.buffers:
+            await send({"type": "http.response.body", "body": b""})
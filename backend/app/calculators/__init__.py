@@ -1,3 +1,4 @@
 from app.calculators.ventilation import VentilationCalculator
+from app.calculators.usage_classifier import UsageClassifier, get_usage_classifier
 
-__all__ = ["VentilationCalculator"]
+__all__ = ["VentilationCalculator", "UsageClassifier", "get_usage_classifier"]
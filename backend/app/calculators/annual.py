@@ -0,0 +1,207 @@
+"""
+年間（8,760時間）の換気量シミュレーション
+用途ごとの在室率スケジュールから時刻別の必要換気量をスペースごとに求め、階・空調系統などのグループごとに集計する
+
+時刻別の必要換気量 = max(建築基準法の換気量 × 運転中, 在室人数 × 一人当たり外気量 × 在室率)
+（運転中 = 在室率が0より大きい時刻）
+
+スペース × 時刻の配列計算で求め、メモリ使用量を抑えるためスペースを分割して計算する
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+import datetime
+
+import numpy as np
+
+from app.models import (
+    Space,
+    RoomUsageType,
+    GroupKind,
+    DailySchedule,
+    AnnualSimulationRequest,
+    AnnualSimulationResult,
+    LoadSummary,
+    GroupLoadSummary,
+    SpaceLoadSummary
+)
+from app.calculators.sweep import SpaceColumns
+from app.services.grouping import GroupIndex
+from app.services.metrics import span
+
+DAYS_PER_YEAR = 365
+HOURS_PER_DAY = 24
+HOURS_PER_YEAR = DAYS_PER_YEAR * HOURS_PER_DAY
+# 一度に計算するスペース × 時刻の要素数
+CHUNK_CELLS = 2_000_000
+
+_OFFICE_WEEKDAY = [0.0] * 8 + [0.5, 0.9, 1.0, 1.0, 0.6, 1.0, 1.0, 1.0, 1.0, 0.8, 0.4, 0.2, 0.1] + [0.0] * 3
+_CLOSED = [0.0] * 24
+
+# 用途ごとの既定の在室率スケジュール（平日, 土日）
+DEFAULT_SCHEDULES: Dict[RoomUsageType, Tuple[List[float], List[float]]] = {
+    RoomUsageType.OFFICE: (_OFFICE_WEEKDAY, _CLOSED),
+    RoomUsageType.MEETING_ROOM: (
+        [0.0] * 9 + [0.5, 0.8, 0.6, 0.2, 0.6, 0.8, 0.8, 0.5, 0.3] + [0.0] * 6,
+        _CLOSED
+    ),
+    RoomUsageType.RESIDENCE: (
+        [1.0] * 7 + [0.7, 0.4] + [0.2] * 8 + [0.5, 0.8] + [1.0] * 5,
+        [1.0] * 8 + [0.7] * 4 + [0.5] * 6 + [0.8] + [1.0] * 5
+    ),
+    RoomUsageType.KITCHEN: (
+        [0.0] * 7 + [0.2, 0.3, 0.3, 0.5, 0.8, 1.0, 0.8, 0.4, 0.3, 0.3, 0.4, 0.6, 0.5, 0.2] + [0.0] * 3,
+        _CLOSED
+    ),
+    # 共用部は建物の運用時間（事務所と同じ）
+    RoomUsageType.CORRIDOR: (_OFFICE_WEEKDAY, _CLOSED),
+    RoomUsageType.TOILET: (_OFFICE_WEEKDAY, _CLOSED),
+    RoomUsageType.STORAGE: (_OFFICE_WEEKDAY, _CLOSED),
+    RoomUsageType.OTHER: (_OFFICE_WEEKDAY, _CLOSED),
+}
+
+
+def get_default_schedules() -> Dict[RoomUsageType, DailySchedule]:
+    """既定の在室率スケジュール"""
+    return {
+        usage: DailySchedule(weekday=weekday, weekend=weekend)
+        for usage, (weekday, weekend) in DEFAULT_SCHEDULES.items()
+    }
+
+
+def build_hourly_profiles(year: int, schedules: Dict[RoomUsageType, DailySchedule]) -> np.ndarray:
+    """
+    用途ごとの時刻別在室率（用途 × 8,760時間、RoomUsageTypeの定義順）
+
+    Raises:
+        ValueError: 在室率が0〜1の範囲外の場合
+    """
+    # 土日（1月1日の曜日から365日分）
+    first_weekday = datetime.date(year, 1, 1).weekday()
+    weekend = ((np.arange(DAYS_PER_YEAR) + first_weekday) % 7) >= 5
+
+    profiles = np.empty((len(RoomUsageType), HOURS_PER_YEAR))
+    for i, usage in enumerate(RoomUsageType):
+        schedule = schedules.get(usage)
+        if schedule is not None:
+            weekday_values, weekend_values = schedule.weekday, schedule.weekend
+        else:
+            weekday_values, weekend_values = DEFAULT_SCHEDULES[usage]
+        weekday_values = np.asarray(weekday_values, dtype=float)
+        weekend_values = np.asarray(weekend_values, dtype=float)
+        if ((weekday_values < 0) | (weekday_values > 1) | (weekend_values < 0) | (weekend_values > 1)).any():
+            raise ValueError(f"在室率は0〜1の範囲で指定してください: {usage.value}")
+        profiles[i] = np.where(weekend[:, None], weekend_values[None, :], weekday_values[None, :]).ravel()
+    return profiles
+
+
+def _duration_ranks(points: int) -> np.ndarray:
+    return np.round(np.linspace(0, HOURS_PER_YEAR - 1, points)).astype(int)
+
+
+def _summarize(profile: np.ndarray, ranks: np.ndarray) -> Dict[str, object]:
+    """時刻別の値から最大値・年間量・負荷持続曲線を求める"""
+    ordered = np.sort(profile)[::-1]
+    return {
+        "peak": float(ordered[0]),
+        "peakHour": int(np.argmax(profile)),
+        "annualVolume": float(profile.sum()),
+        "operatingHours": int(np.count_nonzero(profile > 0)),
+        "loadDuration": ordered[ranks].tolist(),
+    }
+
+
+@span("ventilation.annual")
+def run_annual_simulation(
+    model_id: str,
+    spaces: Sequence[Space],
+    groups: Optional[GroupIndex],
+    request: AnnualSimulationRequest
+) -> AnnualSimulationResult:
+    """
+    年間の時刻別必要換気量を求め、モデル全体・グループ・スペースごとに集計
+
+    在室人数はスペースの想定在室人数、未設定の場合は 床面積 × 人員密度（指定がある場合）
+
+    Raises:
+        ValueError: スケジュールの指定が正しくない場合
+    """
+    profiles = build_hourly_profiles(request.year, request.schedules)
+    usage_order = {usage: i for i, usage in enumerate(RoomUsageType)}
+
+    columns = SpaceColumns(spaces)
+    n = len(columns)
+    usage_index = np.array([usage_order[usage] for usage in columns.usage], dtype=int)
+
+    occupancy = columns.occupancy
+    if request.occupancyDensity is not None:
+        occupancy = np.where(np.isnan(occupancy), columns.area * request.occupancyDensity, occupancy)
+    fresh_air = columns.default_fresh_air if request.freshAirPerPerson is None else request.freshAirPerPerson
+    # スペースごとの最大値（建築基準法の換気量 / 全員在室時の外気量）。計算できない場合は0
+    base_ventilation = np.nan_to_num(columns.volume * columns.standard_rate)
+    peak_fresh_air = np.nan_to_num(np.maximum(occupancy, 0) * fresh_air)
+
+    # 集計するグループとスペースの対応（グループ × スペース）
+    group_list = []
+    if groups is not None:
+        for kind in dict.fromkeys(request.groupKinds):
+            group_list.extend(groups.list_groups(kind))
+    group_rows = {group.id: i for i, group in enumerate(group_list)}
+    covering = [
+        [group_rows[gid] for gid in groups.get_covering_group_ids(space_id) if gid in group_rows]
+        for space_id in columns.space_ids
+    ] if group_rows else [[] for _ in range(n)]
+
+    total = np.zeros(HOURS_PER_YEAR)
+    group_profiles = np.zeros((len(group_list), HOURS_PER_YEAR))
+    space_summaries: List[SpaceLoadSummary] = []
+    chunk = max(1, CHUNK_CELLS // HOURS_PER_YEAR)
+
+    for start in range(0, n, chunk):
+        stop = min(start + chunk, n)
+        occupied = profiles[usage_index[start:stop]]
+        hourly = np.maximum(
+            base_ventilation[start:stop, None] * (occupied > 0),
+            peak_fresh_air[start:stop, None] * occupied
+        )
+        total += hourly.sum(axis=0)
+
+        if group_list:
+            membership = np.zeros((len(group_list), stop - start))
+            for j, rows in enumerate(covering[start:stop]):
+                membership[rows, j] = 1.0
+            group_profiles += membership @ hourly
+
+        if request.includeSpaces:
+            peaks = hourly.max(axis=1)
+            peak_hours = hourly.argmax(axis=1)
+            annual = hourly.sum(axis=1)
+            operating = np.count_nonzero(hourly > 0, axis=1)
+            for j in range(stop - start):
+                space_summaries.append(SpaceLoadSummary(
+                    spaceId=columns.space_ids[start + j],
+                    usage=columns.usage[start + j],
+                    peak=float(peaks[j]),
+                    peakHour=int(peak_hours[j]),
+                    annualVolume=float(annual[j]),
+                    operatingHours=int(operating[j])
+                ))
+
+    ranks = _duration_ranks(request.durationPoints)
+    return AnnualSimulationResult(
+        modelId=model_id,
+        year=request.year,
+        hours=HOURS_PER_YEAR,
+        spaceCount=n,
+        durationHours=ranks.tolist(),
+        total=LoadSummary(**_summarize(total, ranks)),
+        groups=[
+            GroupLoadSummary(
+                groupId=group.id,
+                kind=group.kind,
+                name=group.name,
+                spaceCount=group.totals.spaceCount,
+                **_summarize(group_profiles[i], ranks)
+            )
+            for i, group in enumerate(group_list)
+        ],
+        spaces=space_summaries if request.includeSpaces else None
+    )
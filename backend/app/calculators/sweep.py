@@ -0,0 +1,179 @@
+"""
+換気計算のパラメータスイープ（what-if）
+人員密度・換気回数・一人当たり外気量の候補の全組み合わせを、
+モデルのスペースを列にした配列計算（シナリオ × スペース）でまとめて評価する
+
+各計算方法の式と既定値は VentilationCalculator と同じ
+"""
+from typing import List, Optional, Sequence
+import itertools
+
+import numpy as np
+
+from app.models import (
+    Space,
+    RoomUsageType,
+    VentilationCalculationInput,
+    VentilationMethod,
+    VentilationSweepRequest,
+    VentilationSweepScenario,
+    VentilationSweepResult
+)
+from app.calculators.ventilation import VentilationCalculator
+from app.services.metrics import span
+
+# シナリオ数の上限
+MAX_SCENARIOS = 10000
+# 一度に計算するシナリオ × スペースの要素数（メモリ使用量を抑えるためシナリオを分割する）
+CHUNK_CELLS = 1_000_000
+# レスポンスに含める行列の要素数の上限
+MAX_MATRIX_CELLS = 1_000_000
+
+
+class SpaceColumns:
+    """スペースの値（シナリオ・時刻によらない部分）を列にしたもの（スイープ・年間シミュレーションで使用）"""
+
+    def __init__(self, spaces: Sequence[Space], calculator: Optional[VentilationCalculator] = None):
+        calculator = calculator or VentilationCalculator()
+        n = len(spaces)
+        self.space_ids = [space.id for space in spaces]
+        self.area = np.full(n, np.nan)
+        self.volume = np.full(n, np.nan)
+        self.height = np.full(n, np.nan)
+        self.standard_rate = np.empty(n)
+        self.default_fresh_air = np.empty(n)
+        self.occupancy = np.full(n, np.nan)
+        self.usage: List[RoomUsageType] = []
+
+        for i, space in enumerate(spaces):
+            # 入力の補完は単独の計算と同じ
+            area, volume, height, usage, _ = calculator._resolve_inputs(
+                VentilationCalculationInput(spaceId=space.id), space
+            )
+            if area is not None:
+                self.area[i] = area
+            if volume is not None:
+                self.volume[i] = volume
+            if height is not None:
+                self.height[i] = height
+            if space.occupancy is not None:
+                self.occupancy[i] = space.occupancy
+            usage = usage or RoomUsageType.OTHER
+            self.usage.append(usage)
+            self.standard_rate[i] = calculator.STANDARD_AIR_CHANGE_RATES.get(usage, 1.0)
+            self.default_fresh_air[i] = calculator.FRESH_AIR_PER_PERSON.get(usage, 30.0)
+
+        self.height_missing = np.isnan(self.height)
+        self.effective_height = np.where(self.height_missing, calculator.ASSUMED_HEIGHT, self.height)
+
+    def __len__(self) -> int:
+        return len(self.space_ids)
+
+
+def _column(values: Sequence[Optional[float]]) -> np.ndarray:
+    """シナリオごとの値を (シナリオ数, 1) の配列に（未指定はNaN）"""
+    return np.array([np.nan if v is None else v for v in values], dtype=float)[:, None]
+
+
+def _evaluate_method(
+    method: VentilationMethod,
+    columns: SpaceColumns,
+    density: np.ndarray,
+    air_change_rate: np.ndarray,
+    fresh_air: np.ndarray
+) -> np.ndarray:
+    """計算方法1つの必要換気量（シナリオ × スペース、計算できない場合はNaN）"""
+    shape = (density.shape[0], len(columns))
+    with np.errstate(invalid="ignore"):
+        if method == VentilationMethod.BUILDING_CODE:
+            return np.broadcast_to(columns.volume * columns.standard_rate, shape)
+        if method == VentilationMethod.OCCUPANCY_BASED:
+            occupancy = columns.area * density
+            fresh = np.where(np.isnan(fresh_air), columns.default_fresh_air, fresh_air)
+            return np.where(occupancy > 0, occupancy * fresh, np.nan)
+        if method == VentilationMethod.AREA_BASED:
+            rate = np.where(np.isnan(air_change_rate), 1.0, air_change_rate)
+            volume = columns.area * columns.effective_height
+            return np.broadcast_to(np.where(columns.area > 0, volume, np.nan) * rate, shape)
+        return np.broadcast_to(columns.volume * air_change_rate, shape)
+
+
+@span("ventilation.sweep")
+def run_ventilation_sweep(model_id: str, spaces: Sequence[Space], request: VentilationSweepRequest) -> VentilationSweepResult:
+    """
+    パラメータの全組み合わせについて換気計算を評価
+
+    複数の計算方法を指定した場合は、スペースごとに最大値（同じ値なら先の方法）を支配的な要求とする
+
+    Raises:
+        ValueError: シナリオ数・行列の大きさが上限を超える場合
+    """
+    methods = list(dict.fromkeys(request.methods))
+    scenarios = list(itertools.product(request.occupancyDensity, request.airChangeRate, request.freshAirPerPerson))
+    if len(scenarios) > MAX_SCENARIOS:
+        raise ValueError(f"シナリオ数が上限を超えています: {len(scenarios)} > {MAX_SCENARIOS}")
+    columns = SpaceColumns(spaces)
+    n = len(columns)
+    if request.includeSpaceMatrix and len(scenarios) * n > MAX_MATRIX_CELLS:
+        raise ValueError(
+            f"行列の要素数が上限を超えています: {len(scenarios)} シナリオ × {n} スペース > {MAX_MATRIX_CELLS}"
+        )
+
+    area_index = methods.index(VentilationMethod.AREA_BASED) if VentilationMethod.AREA_BASED in methods else -1
+    chunk = max(1, CHUNK_CELLS // max(n * len(methods), 1))
+    results: List[VentilationSweepScenario] = []
+    required_rows: List[list] = []
+    governing_rows: List[list] = []
+
+    for start in range(0, len(scenarios), chunk):
+        part = scenarios[start:start + chunk]
+        density = _column([s[0] for s in part])
+        air_change_rate = _column([s[1] for s in part])
+        fresh_air = _column([s[2] for s in part])
+
+        # (方法, シナリオ, スペース)
+        values = np.stack([
+            _evaluate_method(method, columns, density, air_change_rate, fresh_air) for method in methods
+        ])
+        missing = np.isnan(values)
+        governing = np.argmax(np.where(missing, -np.inf, values), axis=0)
+        none_valid = missing.all(axis=0)
+        governing[none_valid] = -1
+        required = np.take_along_axis(values, np.maximum(governing, 0)[None], axis=0)[0]
+        required = np.where(none_valid, 0.0, required)
+
+        warning = (governing == area_index) & columns.height_missing if area_index >= 0 else np.zeros_like(none_valid)
+        ng_counts = none_valid.sum(axis=1)
+        warning_counts = warning.sum(axis=1)
+        totals = required.sum(axis=1)
+        governing_counts = [(governing == i).sum(axis=1) for i in range(len(methods))]
+
+        for j, (density_value, rate_value, fresh_value) in enumerate(part):
+            results.append(VentilationSweepScenario(
+                index=start + j,
+                occupancyDensity=density_value,
+                airChangeRate=rate_value,
+                freshAirPerPerson=fresh_value,
+                totalRequiredVentilation=float(totals[j]),
+                okCount=int(n - ng_counts[j] - warning_counts[j]),
+                ngCount=int(ng_counts[j]),
+                warningCount=int(warning_counts[j]),
+                governingCounts={method: int(counts[j]) for method, counts in zip(methods, governing_counts)}
+            ))
+
+        if request.includeSpaceMatrix:
+            required_rows.extend(
+                np.where(none_valid, None, required.astype(object)).tolist()
+            )
+            governing_rows.extend(governing.tolist())
+
+    return VentilationSweepResult(
+        modelId=model_id,
+        spaceCount=n,
+        scenarioCount=len(scenarios),
+        methods=methods,
+        scenarios=results,
+        spaceIds=columns.space_ids if request.includeSpaceMatrix else None,
+        requiredVentilation=required_rows if request.includeSpaceMatrix else None,
+        governingMethods=governing_rows if request.includeSpaceMatrix else None
+    )
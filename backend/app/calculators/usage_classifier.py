@@ -0,0 +1,186 @@
+"""
+室用途の分類
+スペースの用途（必要に応じて室名・詳細名称）の文字列からキーワードで RoomUsageType を判定する
+
+キーワード表は1つの正規表現にまとめてコンパイルし、判定結果は文字列ごとに保持する
+（モデル全体を分類しても、照合は異なる用途名の数だけで済む）
+
+分類ルールは USAGE_RULES_FILE で JSON ファイルを指定して置き換えられる。
+形式は用途区分 → キーワード一覧で、先に書いた用途ほど優先される:
+    {"toilet": ["toilet", "wc", "トイレ"], "office": ["office", "事務"]}
+"""
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from functools import lru_cache
+import hashlib
+import json
+import logging
+import re
+
+from app.config import get_settings
+from app.models import RoomUsageType, Space
+
+logger = logging.getLogger(__name__)
+
+# 既定の分類ルール（先の用途ほど優先。キーワードは部分一致・大文字小文字を区別しない）
+DEFAULT_USAGE_RULES: Dict[RoomUsageType, Tuple[str, ...]] = {
+    RoomUsageType.OFFICE: ("office", "事務", "執務", "オフィス", "büro", "buro", "bureau", "oficina", "办公"),
+    RoomUsageType.MEETING_ROOM: (
+        "meeting", "conference", "会議", "ミーティング", "打合", "besprechung", "réunion", "reunion", "sala de reuniones"
+    ),
+    RoomUsageType.TOILET: ("toilet", "wc", "lavatory", "restroom", "トイレ", "便所", "化粧室", "厕所", "卫生间"),
+    RoomUsageType.KITCHEN: ("kitchen", "厨房", "台所", "キッチン", "給湯", "küche", "kuche", "cuisine", "cocina"),
+    RoomUsageType.CORRIDOR: ("corridor", "hall", "廊下", "通路", "ホール", "flur", "couloir", "pasillo", "走廊"),
+    RoomUsageType.STORAGE: ("storage", "store room", "倉庫", "収納", "物置", "lager", "stockage", "almacén", "almacen", "仓库"),
+    RoomUsageType.RESIDENCE: ("residence", "living", "住宅", "住戸", "wohn", "logement", "vivienda"),
+}
+
+# 照合に使えるスペースの項目
+MATCH_FIELDS = ("usage", "name", "longName")
+
+# 判定結果を保持する文字列数の上限（超えた場合は破棄して作り直す）
+CACHE_LIMIT = 65536
+
+
+class UsageClassifier:
+    """キーワード表による室用途の分類（判定結果を文字列ごとに保持）"""
+
+    def __init__(
+        self,
+        rules: Optional[Dict[RoomUsageType, Sequence[str]]] = None,
+        match_fields: Sequence[str] = ("usage",)
+    ):
+        """
+        Args:
+            rules: 用途区分 → キーワード一覧（先の用途ほど優先）。省略時は既定のルール
+            match_fields: 照合するスペースの項目（先の項目で一致した用途を使う）
+
+        Raises:
+            ValueError: 照合項目の指定が正しくない場合
+        """
+        unknown = [field for field in match_fields if field not in MATCH_FIELDS]
+        if unknown or not match_fields:
+            raise ValueError(f"照合項目は {list(MATCH_FIELDS)} から指定してください: {unknown}")
+        self.match_fields = tuple(match_fields)
+        self.rules = dict(rules if rules is not None else DEFAULT_USAGE_RULES)
+        self._pattern, self._keyword_usage = self._compile(self.rules)
+        self._cache: Dict[str, Optional[RoomUsageType]] = {}
+
+    @staticmethod
+    def _compile(rules: Dict[RoomUsageType, Sequence[str]]) -> Tuple[Optional[re.Pattern], Dict[str, Tuple[int, RoomUsageType]]]:
+        """
+        キーワード表を1つの正規表現にまとめる
+
+        先読みで各位置から最長のキーワードを拾うため、重なり合うキーワードも取りこぼさない。
+        あるキーワードが別のキーワードの先頭部分になっている場合、長い方の一致は短い方の一致も意味するので、
+        長い方には両者のうち優先度の高い用途を割り当てる（部分一致を順に調べる場合と同じ結果になる）
+        """
+        keyword_usage: Dict[str, Tuple[int, RoomUsageType]] = {}
+        for priority, (usage, keywords) in enumerate(rules.items()):
+            for keyword in keywords:
+                keyword = keyword.casefold()
+                if keyword and keyword not in keyword_usage:
+                    keyword_usage[keyword] = (priority, usage)
+        if not keyword_usage:
+            return None, keyword_usage
+
+        for keyword in keyword_usage:
+            for prefix_end in range(1, len(keyword)):
+                prefix = keyword_usage.get(keyword[:prefix_end])
+                if prefix is not None and prefix[0] < keyword_usage[keyword][0]:
+                    keyword_usage[keyword] = prefix
+
+        alternatives = "|".join(re.escape(k) for k in sorted(keyword_usage, key=len, reverse=True))
+        return re.compile(f"(?=({alternatives}))"), keyword_usage
+
+    def classify_text(self, text: str) -> Optional[RoomUsageType]:
+        """文字列に含まれるキーワードから用途を判定（一致しない場合はNone）"""
+        try:
+            return self._cache[text]
+        except KeyError:
+            pass
+
+        usage = None
+        if self._pattern is not None:
+            best = None
+            for match in self._pattern.finditer(text.casefold()):
+                candidate = self._keyword_usage[match.group(1)]
+                if best is None or candidate[0] < best[0]:
+                    best = candidate
+                    if best[0] == 0:
+                        break
+            usage = best[1] if best is not None else None
+
+        if len(self._cache) >= CACHE_LIMIT:
+            self._cache.clear()
+        self._cache[text] = usage
+        return usage
+
+    def classify(self, space: Optional[Space]) -> Optional[RoomUsageType]:
+        """
+        スペースの用途を判定
+
+        照合項目を順に調べて最初に一致した用途を返す。
+        どれにも一致しない場合、用途が設定されていればOTHER、なければNone
+        """
+        if space is None:
+            return None
+        for field in self.match_fields:
+            value = getattr(space, field, None)
+            if value:
+                usage = self.classify_text(value)
+                if usage is not None:
+                    return usage
+        return RoomUsageType.OTHER if space.usage else None
+
+    @property
+    def digest(self) -> str:
+        """分類ルール・照合項目を表す短い識別子（ルールが変わると値も変わる）"""
+        key = json.dumps(
+            [list(self.match_fields), [[usage.value, list(keywords)] for usage, keywords in self.rules.items()]],
+            ensure_ascii=False
+        )
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()[:8]
+
+    @property
+    def cache_size(self) -> int:
+        """判定結果を保持している文字列数"""
+        return len(self._cache)
+
+
+def load_usage_rules(path: str) -> Dict[RoomUsageType, List[str]]:
+    """
+    JSONファイルから分類ルールを読み込む
+
+    Raises:
+        ValueError: 形式が正しくない場合
+    """
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    if not isinstance(raw, dict):
+        raise ValueError("分類ルールは用途区分 → キーワード一覧のオブジェクトで指定してください")
+
+    rules: Dict[RoomUsageType, List[str]] = {}
+    for key, keywords in raw.items():
+        try:
+            usage = RoomUsageType(key)
+        except ValueError:
+            raise ValueError(f"未対応の用途区分です: {key}")
+        if isinstance(keywords, str) or not isinstance(keywords, list):
+            raise ValueError(f"キーワードは文字列の配列で指定してください: {key}")
+        rules[usage] = [str(k) for k in keywords]
+    return rules
+
+
+def _parse_fields(spec: str) -> Iterable[str]:
+    return [field.strip() for field in spec.split(",") if field.strip()]
+
+
+@lru_cache()
+def get_usage_classifier() -> UsageClassifier:
+    """設定に基づく分類器を取得（判定結果をリクエスト間で共有するためシングルトン）"""
+    settings = get_settings()
+    rules = None
+    if settings.usage_rules_file:
+        rules = load_usage_rules(settings.usage_rules_file)
+        logger.info(f"室用途の分類ルールを読み込みました: {settings.usage_rules_file} ({len(rules)} 用途)")
+    return UsageClassifier(rules, _parse_fields(settings.usage_match_fields))
@@ -1,12 +1,15 @@
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Sequence, Tuple
 from app.models import (
     VentilationCalculationInput,
     VentilationCalculationResult,
+    GoverningVentilationResult,
     VentilationMethod,
     RoomUsageType,
     Space
 )
+from app.calculators.usage_classifier import UsageClassifier, get_usage_classifier
+from app.services.metrics import span
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +37,16 @@ class VentilationCalculator:
         RoomUsageType.OTHER: 30.0,
     }
     
+    # 床面積ベースで天井高が不明な場合に仮定する高さ（m）
+    ASSUMED_HEIGHT = 2.5
+    
+    def __init__(self, usage_classifier: Optional[UsageClassifier] = None):
+        """
+        Args:
+            usage_classifier: 室用途の分類器（省略時は設定に基づく共有の分類器）
+        """
+        self.usage_classifier = usage_classifier or get_usage_classifier()
+    
     def calculate(
         self,
         calculation_input: VentilationCalculationInput,
@@ -49,16 +62,7 @@ class VentilationCalculator:
         Returns:
             計算結果
         """
-        # スペース情報から不足データを補完
-        area = calculation_input.area or (space.area if space else None)
-        volume = calculation_input.volume or (space.volume if space else None)
-        height = calculation_input.height or (space.height if space else None)
-        usage = calculation_input.usage or self._infer_usage(space)
-        occupancy = calculation_input.occupancy
-        
-        # 容積の計算（面積と高さから）
-        if volume is None and area is not None and height is not None:
-            volume = area * height
+        area, volume, height, usage, occupancy = self._resolve_inputs(calculation_input, space)
         
         # 計算方法に応じた処理
         if calculation_input.method == VentilationMethod.BUILDING_CODE:
@@ -102,6 +106,91 @@ class VentilationCalculator:
         
         return result
     
+    def _resolve_inputs(
+        self,
+        calculation_input: VentilationCalculationInput,
+        space: Optional[Space]
+    ) -> Tuple[Optional[float], Optional[float], Optional[float], Optional[RoomUsageType], Optional[int]]:
+        """入力パラメータの不足をスペース情報から補完（面積・容積・天井高・用途・在室人数）"""
+        area = calculation_input.area or (space.area if space else None)
+        volume = calculation_input.volume or (space.volume if space else None)
+        height = calculation_input.height or (space.height if space else None)
+        usage = calculation_input.usage or self._infer_usage(space)
+        occupancy = calculation_input.occupancy
+        
+        # 容積の計算（面積と高さから）
+        if volume is None and area is not None and height is not None:
+            volume = area * height
+        
+        return area, volume, height, usage, occupancy
+    
+    @span("ventilation.governing")
+    def calculate_governing(
+        self,
+        calculation_input: VentilationCalculationInput,
+        space: Optional[Space] = None,
+        methods: Sequence[VentilationMethod] = tuple(VentilationMethod)
+    ) -> GoverningVentilationResult:
+        """
+        全計算方法の必要換気量を1回で求め、最大値（支配的な要求）を返す
+        
+        入力の補完は calculate() と同じで、各方法の値も calculate() と一致する。
+        計算詳細は作らず値だけを求めるため、方法ごとに calculate() を呼ぶより軽い
+        
+        Args:
+            calculation_input: 計算入力パラメータ（methodは使用しない）
+            space: スペース情報
+            methods: 比較する計算方法（同じ値の場合は先の方法を支配的とする）
+        """
+        area, volume, height, usage, occupancy = self._resolve_inputs(calculation_input, space)
+        air_change_rate = calculation_input.airChangeRate
+        
+        values: Dict[VentilationMethod, Optional[float]] = {}
+        governing: Optional[VentilationMethod] = None
+        for method in methods:
+            value = None
+            if method == VentilationMethod.BUILDING_CODE:
+                if volume is not None:
+                    value = volume * self.STANDARD_AIR_CHANGE_RATES.get(usage or RoomUsageType.OTHER, 1.0)
+            elif method == VentilationMethod.OCCUPANCY_BASED:
+                if occupancy is not None and occupancy > 0:
+                    fresh_air_per_person = calculation_input.freshAirPerPerson
+                    if fresh_air_per_person is None:
+                        fresh_air_per_person = self.FRESH_AIR_PER_PERSON.get(usage or RoomUsageType.OTHER, 30.0)
+                    value = occupancy * fresh_air_per_person
+            elif method == VentilationMethod.AREA_BASED:
+                if area is not None and area > 0:
+                    rate = air_change_rate if air_change_rate is not None else 1.0
+                    value = area * (height if height is not None else self.ASSUMED_HEIGHT) * rate
+            elif volume is not None and air_change_rate is not None:
+                value = volume * air_change_rate
+            
+            values[method] = value
+            if value is not None and (governing is None or value > values[governing]):
+                governing = method
+        
+        if governing is None:
+            status, notes = "NG", "計算に必要なパラメータが不足しているため、いずれの方法でも計算できません"
+        elif governing == VentilationMethod.AREA_BASED and height is None:
+            status, notes = "WARNING", f"天井高が不明のため標準値{self.ASSUMED_HEIGHT}mを使用"
+        else:
+            status, notes = "OK", None
+        
+        return GoverningVentilationResult(
+            spaceId=calculation_input.spaceId,
+            spaceName=space.name if space else "Unknown",
+            requiredVentilation=values[governing] if governing is not None else 0,
+            governingMethod=governing,
+            methodValues=values,
+            usedArea=area,
+            usedVolume=volume,
+            usedOccupancy=occupancy,
+            usedUsage=usage,
+            complianceStatus=status,
+            complianceNotes=notes
+        )
+    
+    @span("ventilation.building_code")
     def _calculate_by_building_code(
         self,
         space_id: str,
@@ -148,6 +237,7 @@ class VentilationCalculator:
             }
         )
     
+    @span("ventilation.occupancy_based")
     def _calculate_by_occupancy(
         self,
         space_id: str,
@@ -195,6 +285,7 @@ class VentilationCalculator:
             }
         )
     
+    @span("ventilation.area_based")
     def _calculate_by_area(
         self,
         space_id: str,
@@ -224,8 +315,8 @@ class VentilationCalculator:
             volume = area * height
             required_ventilation = volume * air_change_rate
         else:
-            # 高さ不明の場合は標準高さ（2.5m）を仮定
-            assumed_height = 2.5
+            # 高さ不明の場合は標準高さを仮定
+            assumed_height = self.ASSUMED_HEIGHT
             volume = area * assumed_height
             required_ventilation = volume * air_change_rate
         
@@ -236,7 +327,7 @@ class VentilationCalculator:
             airChangeRate=air_change_rate,
             method=VentilationMethod.AREA_BASED,
             complianceStatus="OK" if height is not None else "WARNING",
-            complianceNotes=None if height is not None else "天井高が不明のため標準値2.5mを使用",
+            complianceNotes=None if height is not None else f"天井高が不明のため標準値{self.ASSUMED_HEIGHT}mを使用",
             calculationDetails={
                 "area": area,
                 "height": height or assumed_height,
@@ -246,6 +337,7 @@ class VentilationCalculator:
             }
         )
     
+    @span("ventilation.custom")
     def _calculate_custom(
         self,
         space_id: str,
@@ -284,26 +376,5 @@ class VentilationCalculator:
         )
     
     def _infer_usage(self, space: Optional[Space]) -> Optional[RoomUsageType]:
-        """スペース情報から用途を推測"""
-        if space is None or space.usage is None:
-            return None
-        
-        usage_lower = space.usage.lower()
-        
-        # 簡易的なマッピング
-        if "office" in usage_lower or "事務" in usage_lower:
-            return RoomUsageType.OFFICE
-        elif "meeting" in usage_lower or "会議" in usage_lower:
-            return RoomUsageType.MEETING_ROOM
-        elif "toilet" in usage_lower or "wc" in usage_lower or "トイレ" in usage_lower:
-            return RoomUsageType.TOILET
-        elif "kitchen" in usage_lower or "厨房" in usage_lower:
-            return RoomUsageType.KITCHEN
-        elif "corridor" in usage_lower or "廊下" in usage_lower or "hall" in usage_lower:
-            return RoomUsageType.CORRIDOR
-        elif "storage" in usage_lower or "倉庫" in usage_lower:
-            return RoomUsageType.STORAGE
-        elif "residence" in usage_lower or "住宅" in usage_lower or "living" in usage_lower:
-            return RoomUsageType.RESIDENCE
-        
-        return RoomUsageType.OTHER
+        """スペース情報から用途を推測（判定結果は用途名ごとに分類器が保持）"""
+        return self.usage_classifier.classify(space)
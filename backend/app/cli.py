@@ -0,0 +1,296 @@
+"""
+ヘッドレス一括処理CLI
+ディレクトリまたはglobで指定したIFCファイルを並列に解析し、換気計算結果をファイルへ書き出す
+
+使用例:
+    python -m app.cli models/ --method building_code --output results/
+    python -m app.cli "models/**/*.ifc" --format parquet --workers 8
+
+出力先ディレクトリには内容ハッシュ・計算条件ごとに結果ファイル（<sha256>.<method>.p<パーサーのバージョン>.u<分類ルール>.jsonl / .parquet）を作成する。
+同じ内容のファイルを同じ条件で処理した結果が既にある場合は解析をスキップするため、中断した実行はそのまま再開できる
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional, Iterable
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+
+from app.models import VentilationCalculationInput, VentilationMethod
+from app.calculators.ventilation import VentilationCalculator
+from app.calculators.usage_classifier import get_usage_classifier
+from app.services.ifc_parser import PARSE_VERSION, parse_ifc_file
+from app.services.property_profile import PropertyProfile
+from app.services.worker_pool import get_worker_count
+
+logger = logging.getLogger("app.cli")
+
+OUTPUT_FORMATS = ("jsonl", "parquet")
+IFC_EXTENSIONS = (".ifc",)
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# 実行ごとの処理結果を追記するファイル
+MANIFEST_FILENAME = "manifest.jsonl"
+
+
+def find_ifc_files(targets: Iterable[str]) -> List[str]:
+    """
+    ディレクトリ・glob・ファイルパスからIFCファイルを列挙
+
+    ディレクトリは再帰的に探索する。重複は除き、パス順に並べる
+    """
+    found: Dict[str, None] = {}
+    for target in targets:
+        if os.path.isdir(target):
+            for root, _, names in os.walk(target):
+                for name in names:
+                    if name.lower().endswith(IFC_EXTENSIONS):
+                        found.setdefault(os.path.abspath(os.path.join(root, name)), None)
+        elif os.path.isfile(target):
+            found.setdefault(os.path.abspath(target), None)
+        else:
+            for path in glob.glob(target, recursive=True):
+                if os.path.isfile(path) and path.lower().endswith(IFC_EXTENSIONS):
+                    found.setdefault(os.path.abspath(path), None)
+    return sorted(found)
+
+
+def hash_file(path: str) -> str:
+    """ファイル内容のSHA-256ハッシュ16進文字列"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_output_path(output_dir: str, content_hash: str, method: str, output_format: str) -> str:
+    """
+    内容ハッシュ・計算条件に対応する結果ファイルのパス
+
+    処理済みの判定に使うため、結果に影響する条件（計算方法・パーサーのバージョン・室用途の分類ルール）を
+    ファイル名に含める。プロパティは出力しないため（読み込みの指定は固定）含めない
+    """
+    conditions = f"{method}.p{PARSE_VERSION}.u{get_usage_classifier().digest}"
+    return os.path.join(output_dir, f"{content_hash}.{conditions}.{output_format}")
+
+
+def _build_records(path: str, content_hash: str, method: VentilationMethod) -> List[Dict[str, Any]]:
+    """IFCファイルを解析し、スペースごとの換気計算結果レコードを作成"""
+    # 出力レコードにプロパティは含まないため読み込まない
+    model = parse_ifc_file(path, PropertyProfile.parse("none"))
+    calculator = VentilationCalculator()
+    filename = os.path.basename(path)
+
+    records = []
+    for space in model["spaces"]:
+        result = calculator.calculate(
+            VentilationCalculationInput(spaceId=space.id, method=method),
+            space
+        )
+        record = {
+            "sourceFile": filename,
+            "contentHash": content_hash,
+            "globalId": space.globalId,
+            "floorLevel": space.floorLevel,
+        }
+        record.update(result.model_dump(mode="json"))
+        records.append(record)
+    return records
+
+
+def _write_jsonl(records: List[Dict[str, Any]], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False))
+            f.write("\n")
+
+
+def _write_parquet(records: List[Dict[str, Any]], path: str) -> None:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # 入れ子の計算詳細は列にできないためJSON文字列として保存する
+    rows = [
+        {**record, "calculationDetails": json.dumps(record.get("calculationDetails") or {}, ensure_ascii=False)}
+        for record in records
+    ]
+    pq.write_table(pa.Table.from_pylist(rows), path)
+
+
+def process_file(path: str, content_hash: str, method: str, output_path: str, output_format: str) -> Dict[str, Any]:
+    """
+    1ファイルを処理して結果を書き出す（ワーカープロセスで実行）
+
+    結果は一時ファイルに書いてから置き換えるため、中断しても不完全な結果ファイルは残らない
+
+    Returns:
+        処理結果の概要
+    """
+    started = time.perf_counter()
+    records = _build_records(path, content_hash, VentilationMethod(method))
+
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        if output_format == "parquet":
+            _write_parquet(records, tmp_path)
+        else:
+            _write_jsonl(records, tmp_path)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return {
+        "spaces": len(records),
+        "totalRequiredVentilation": sum(r["requiredVentilation"] for r in records),
+        "ngCount": sum(1 for r in records if r["complianceStatus"] == "NG"),
+        "elapsedSeconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def _append_manifest(output_dir: str, entry: Dict[str, Any]) -> None:
+    with open(os.path.join(output_dir, MANIFEST_FILENAME), "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False))
+        f.write("\n")
+
+
+def _check_output_format(output_format: str) -> Optional[str]:
+    """出力形式が使用可能か確認し、使用できない場合はエラーメッセージを返す"""
+    if output_format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return "Parquet出力には pyarrow が必要です（pip install pyarrow）"
+    return None
+
+
+def run_batch(
+    targets: List[str],
+    output_dir: str,
+    method: str = VentilationMethod.BUILDING_CODE.value,
+    output_format: str = "jsonl",
+    workers: Optional[int] = None,
+    force: bool = False
+) -> Dict[str, int]:
+    """
+    IFCファイルを一括処理
+
+    Args:
+        targets: ディレクトリ・glob・ファイルパスのリスト
+        output_dir: 結果の出力先ディレクトリ
+        method: 換気計算方法
+        output_format: 出力形式（jsonl / parquet）
+        workers: ワーカープロセス数（Noneの場合はPARSER_WORKERSまたはCPU数）
+        force: 処理済みのファイルも再処理する
+
+    Returns:
+        処理・スキップ・失敗したファイル数
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    files = find_ifc_files(targets)
+    counts = {"processed": 0, "skipped": 0, "failed": 0}
+    logger.info(f"{len(files)} 件のIFCファイルが見つかりました")
+
+    # 内容ハッシュで処理済み・重複のファイルを除外
+    pending: Dict[str, str] = {}
+    for path in files:
+        content_hash = hash_file(path)
+        output_path = get_output_path(output_dir, content_hash, method, output_format)
+        if content_hash in pending or (not force and os.path.exists(output_path)):
+            logger.info(f"スキップ（処理済み）: {path}")
+            counts["skipped"] += 1
+            continue
+        pending[content_hash] = path
+
+    if not pending:
+        return counts
+
+    max_workers = min(workers or get_worker_count(), len(pending))
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(
+                process_file,
+                path,
+                content_hash,
+                method,
+                get_output_path(output_dir, content_hash, method, output_format),
+                output_format
+            ): (path, content_hash)
+            for content_hash, path in pending.items()
+        }
+        for future in as_completed(futures):
+            path, content_hash = futures[future]
+            entry = {"file": path, "contentHash": content_hash, "method": method}
+            try:
+                entry.update(future.result())
+                entry["status"] = "success"
+                counts["processed"] += 1
+                logger.info(f"完了: {path} ({entry['spaces']} スペース, {entry['elapsedSeconds']}秒)")
+            except Exception as e:
+                entry.update({"status": "error", "error": str(e)})
+                counts["failed"] += 1
+                logger.error(f"処理エラー: {path}: {e}")
+            _append_manifest(output_dir, entry)
+
+    return counts
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.cli",
+        description="IFCファイルを一括解析して換気計算結果を出力します"
+    )
+    parser.add_argument("targets", nargs="+", help="IFCファイル・ディレクトリ・globパターン")
+    parser.add_argument("-o", "--output", default="results", help="出力先ディレクトリ（既定: results）")
+    parser.add_argument(
+        "-m", "--method",
+        default=VentilationMethod.BUILDING_CODE.value,
+        choices=[m.value for m in VentilationMethod if m != VentilationMethod.CUSTOM],
+        help="換気計算方法（既定: building_code）"
+    )
+    parser.add_argument("-f", "--format", default="jsonl", choices=OUTPUT_FORMATS, help="出力形式（既定: jsonl）")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="ワーカープロセス数（既定: CPU数）")
+    parser.add_argument("--force", action="store_true", help="処理済みのファイルも再処理する")
+    parser.add_argument("-q", "--quiet", action="store_true", help="進捗ログを表示しない")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    logging.basicConfig(
+        level=logging.WARNING if args.quiet else logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+    # 解析中のスペースごとのログは抑制する
+    logging.getLogger("app.services").setLevel(logging.WARNING)
+
+    error = _check_output_format(args.format)
+    if error:
+        print(error, file=sys.stderr)
+        return 2
+
+    counts = run_batch(
+        args.targets,
+        args.output,
+        method=args.method,
+        output_format=args.format,
+        workers=args.workers,
+        force=args.force
+    )
+    print(
+        f"処理: {counts['processed']} 件, スキップ: {counts['skipped']} 件, 失敗: {counts['failed']} 件",
+        file=sys.stderr
+    )
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -35,6 +35,33 @@ class Settings(BaseSettings):
     upload_dir: str = Field(default="/tmp/ifc_uploads", validation_alias="UPLOAD_DIR")
     max_upload_size_mb: int = Field(default=100, validation_alias="MAX_UPLOAD_SIZE_MB")
 
+    # 解析ワーカープロセス数（0の場合はCPU数）
+    parser_workers: int = Field(default=0, validation_alias="PARSER_WORKERS")
+    # 起動時に解析モジュール（ifcopenshell）を読み込んでおく（ワーカープロセスは作成時に読み込む）
+    parser_prewarm: bool = Field(default=True, validation_alias="PARSER_PREWARM")
+    # 起動時の読み込みに続けてワーカープロセスも起動しておく（プロセス数分のメモリを常に使う）
+    parser_prewarm_workers: bool = Field(default=False, validation_alias="PARSER_PREWARM_WORKERS")
+
+    # 解析のアドミッション制御
+    # 同時に解析するファイルの見積もりメモリの上限 (MB)
+    parse_memory_budget_mb: int = Field(default=2048, validation_alias="PARSE_MEMORY_BUDGET_MB")
+    # 同時に解析する数の上限（0の場合はワーカープロセス数）
+    parse_max_concurrent: int = Field(default=0, validation_alias="PARSE_MAX_CONCURRENT")
+    # 解析待ちの上限（超えた場合は503を返す）
+    parse_queue_limit: int = Field(default=16, validation_alias="PARSE_QUEUE_LIMIT")
+
+    # 保持するプロパティの既定値（カンマ区切り。* はすべて、none は保持しない）
+    # 例: Pset_SpaceCommon,*.Occupancy,Pset_SpaceThermalRequirements.SpaceTemperatureSummer
+    property_profile: str = Field(default="*", validation_alias="PROPERTY_PROFILE")
+
+    # 室用途の分類ルール（JSONファイルのパス。空の場合は既定のルール）
+    usage_rules_file: str = Field(default="", validation_alias="USAGE_RULES_FILE")
+    # 用途の判定に照合するスペースの項目（カンマ区切り。usage, name, longName。先の項目を優先）
+    usage_match_fields: str = Field(default="usage", validation_alias="USAGE_MATCH_FIELDS")
+
+    # HTTPキャッシュ設定（モデルのレスポンスのCache-Control max-age 秒）
+    http_cache_max_age: int = Field(default=60, validation_alias="HTTP_CACHE_MAX_AGE")
+
     @property
     def cors_origins_list(self) -> list[str]:
         """CORS許可オリジンをリストとして取得"""
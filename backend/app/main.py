@@ -1,10 +1,15 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+import asyncio
 import logging
 import os
 
-from app.api import ifc, calculations
+from app.api import ifc, calculations, groups, admin
 from app.config import get_settings
+from app.services.worker_pool import prewarm_parsers, is_parser_ready, shutdown_process_pool
+from app.services.metrics import MetricsMiddleware, registry as metrics_registry
 
 # 設定を取得
 settings = get_settings()
@@ -17,11 +22,27 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """起動・終了時の処理"""
+    # ifcopenshell の読み込みは完了を待たずにバックグラウンドで行い、すぐに受け付けを開始する
+    prewarm = (
+        asyncio.create_task(prewarm_parsers(settings.parser_prewarm_workers)) if settings.parser_prewarm else None
+    )
+    yield
+    if prewarm is not None:
+        prewarm.cancel()
+    # 解析用ワーカープロセスを終了
+    shutdown_process_pool()
+
+
 # FastAPIアプリケーション作成
 app = FastAPI(
     title="IFC MEP Design Tool API",
     description="建築設備設計のためのIFC活用WebアプリケーションAPI",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS設定（環境変数から読み込み）
@@ -34,9 +55,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 処理時間の計測（Server-Timingヘッダー・/metrics）
+app.add_middleware(MetricsMiddleware)
+
 # ルーターを登録
 app.include_router(ifc.router)
 app.include_router(calculations.router)
+app.include_router(groups.router)
+app.include_router(admin.router)
 
 
 @app.get("/")
@@ -54,8 +80,17 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """ヘルスチェックエンドポイント"""
-    return {"status": "healthy"}
+    """ヘルスチェックエンドポイント（parserReady: 起動時の解析モジュールの読み込みが完了したか）"""
+    return {"status": "healthy", "parserReady": is_parser_ready()}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus形式のメトリクス（段階ごとの処理時間・リクエスト処理時間・警告件数）"""
+    return PlainTextResponse(
+        metrics_registry.render_prometheus(),
+        media_type="text/plain; version=0.0.4"
+    )
 
 
 if __name__ == "__main__":
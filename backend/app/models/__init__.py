@@ -1,12 +1,56 @@
-from app.models.space import Space, SpaceList, SpaceSummary, Point3D, BoundingBox, Geometry3D
+from app.models.space import (
+    Space,
+    SpaceList,
+    SpaceSummary,
+    Point3D,
+    BoundingBox,
+    Geometry3D,
+    MeshSummary,
+    MeshInstance,
+    MeshInstanceList
+)
 from app.models.calculation import (
     VentilationCalculationInput,
     VentilationCalculationResult,
     VentilationBatchResult,
+    GoverningVentilationResult,
+    GoverningBatchResult,
+    VentilationSweepRequest,
+    VentilationSweepScenario,
+    VentilationSweepResult,
+    VentilationColumnarInput,
+    VentilationColumnarResult,
     VentilationMethod,
     RoomUsageType
 )
-from app.models.ifc import IFCUploadResponse, IFCModelInfo
+from app.models.ifc import IFCUploadResponse, IFCModelInfo, ParseStatus
+from app.models.equipment import Equipment, EquipmentList
+from app.models.plan import SpaceFootprint, FloorPlan, FloorPlanSummary, FloorPlanList
+from app.models.memory import ModelMemoryUsage, MemoryReport
+from app.models.group import (
+    GroupKind,
+    GroupTotals,
+    SpaceGroup,
+    SpaceGroupList,
+    GroupCreate,
+    GroupUpdate,
+    GroupMembershipUpdate,
+    SpaceUpdate
+)
+from app.models.simulation import (
+    DailySchedule,
+    AnnualSimulationRequest,
+    LoadSummary,
+    GroupLoadSummary,
+    SpaceLoadSummary,
+    AnnualSimulationResult
+)
+from app.models.portfolio import (
+    PortfolioRequest,
+    PortfolioModelSummary,
+    PortfolioStatistic,
+    PortfolioResult
+)
 
 __all__ = [
     "Space",
@@ -15,11 +59,48 @@ __all__ = [
     "Point3D",
     "BoundingBox",
     "Geometry3D",
+    "MeshSummary",
+    "MeshInstance",
+    "MeshInstanceList",
     "VentilationCalculationInput",
     "VentilationCalculationResult",
     "VentilationBatchResult",
+    "GoverningVentilationResult",
+    "GoverningBatchResult",
+    "VentilationSweepRequest",
+    "VentilationSweepScenario",
+    "VentilationSweepResult",
+    "VentilationColumnarInput",
+    "VentilationColumnarResult",
     "VentilationMethod",
     "RoomUsageType",
     "IFCUploadResponse",
     "IFCModelInfo",
+    "ParseStatus",
+    "Equipment",
+    "EquipmentList",
+    "SpaceFootprint",
+    "FloorPlan",
+    "FloorPlanSummary",
+    "FloorPlanList",
+    "ModelMemoryUsage",
+    "MemoryReport",
+    "GroupKind",
+    "GroupTotals",
+    "SpaceGroup",
+    "SpaceGroupList",
+    "GroupCreate",
+    "GroupUpdate",
+    "GroupMembershipUpdate",
+    "SpaceUpdate",
+    "DailySchedule",
+    "AnnualSimulationRequest",
+    "LoadSummary",
+    "GroupLoadSummary",
+    "SpaceLoadSummary",
+    "AnnualSimulationResult",
+    "PortfolioRequest",
+    "PortfolioModelSummary",
+    "PortfolioStatistic",
+    "PortfolioResult",
 ]
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import Optional, Dict, Any, Literal
 from enum import Enum
 
@@ -83,3 +83,141 @@ class VentilationBatchResult(BaseModel):
     total: int
     results: list[VentilationCalculationResult]
     summary: Dict[str, Any] = Field(default_factory=dict)
+
+
+class GoverningVentilationResult(BaseModel):
+    """全計算方法を比較した支配的な必要換気量（最大値）"""
+    spaceId: str = Field(..., description="対象スペースID")
+    spaceName: str = Field(..., description="室名")
+    
+    requiredVentilation: float = Field(..., description="支配的な必要換気量 (m³/h)")
+    governingMethod: Optional[VentilationMethod] = Field(None, description="最大値となった計算方法（計算できた方法がない場合はnull）")
+    methodValues: Dict[VentilationMethod, Optional[float]] = Field(
+        default_factory=dict,
+        description="計算方法ごとの必要換気量 (m³/h)。入力不足で計算できない方法はnull"
+    )
+    
+    # 計算条件
+    usedArea: Optional[float] = Field(None, description="使用した床面積 (m²)")
+    usedVolume: Optional[float] = Field(None, description="使用した容積 (m³)")
+    usedOccupancy: Optional[int] = Field(None, description="使用した在室人数")
+    usedUsage: Optional[RoomUsageType] = Field(None, description="使用した用途区分")
+    
+    # 適合性（支配的な計算方法のもの）
+    complianceStatus: Literal["OK", "NG", "WARNING"] = Field(..., description="基準適合状況")
+    complianceNotes: Optional[str] = Field(None, description="適合性に関する注記")
+
+
+class GoverningBatchResult(BaseModel):
+    """複数スペースの支配的な必要換気量"""
+    total: int
+    results: list[GoverningVentilationResult]
+    summary: Dict[str, Any] = Field(default_factory=dict)
+
+
+class VentilationSweepRequest(BaseModel):
+    """
+    パラメータを変えた換気計算の一括比較（what-if）
+
+    各パラメータの候補の全組み合わせをシナリオとして評価する。省略したパラメータは各方法の既定値を使用
+    """
+    methods: list[VentilationMethod] = Field(
+        default_factory=lambda: list(VentilationMethod),
+        min_length=1,
+        description="比較する計算方法（複数指定した場合はスペースごとの最大値）"
+    )
+    occupancyDensity: list[Optional[float]] = Field(
+        default_factory=lambda: [None],
+        min_length=1,
+        description="人員密度の候補 (人/m²)。在室人数 = 床面積 × 人員密度（端数も含めて計算）"
+    )
+    airChangeRate: list[Optional[float]] = Field(
+        default_factory=lambda: [None],
+        min_length=1,
+        description="換気回数の候補 (回/h、床面積ベース・カスタムで使用)"
+    )
+    freshAirPerPerson: list[Optional[float]] = Field(
+        default_factory=lambda: [None],
+        min_length=1,
+        description="一人当たり外気量の候補 (m³/h、在室人数ベースで使用)"
+    )
+    includeSpaceMatrix: bool = Field(False, description="シナリオ × スペースの必要換気量・支配的な方法を含める")
+
+
+class VentilationSweepScenario(BaseModel):
+    """シナリオ1件の集計"""
+    index: int
+    occupancyDensity: Optional[float] = None
+    airChangeRate: Optional[float] = None
+    freshAirPerPerson: Optional[float] = None
+    totalRequiredVentilation: float = Field(..., description="必要換気量の合計 (m³/h)")
+    okCount: int
+    ngCount: int
+    warningCount: int
+    governingCounts: Dict[VentilationMethod, int] = Field(default_factory=dict, description="支配的な計算方法ごとのスペース数")
+
+
+class VentilationSweepResult(BaseModel):
+    """パラメータを変えた換気計算の結果"""
+    modelId: str
+    spaceCount: int
+    scenarioCount: int
+    methods: list[VentilationMethod]
+    scenarios: list[VentilationSweepScenario]
+    spaceIds: Optional[list[str]] = Field(None, description="行列の列に対応するスペースID")
+    requiredVentilation: Optional[list[list[Optional[float]]]] = Field(
+        None, description="シナリオ × スペースの必要換気量 (m³/h)。計算できない場合はnull"
+    )
+    governingMethods: Optional[list[list[int]]] = Field(
+        None, description="シナリオ × スペースの支配的な計算方法（methodsの添字。計算できない場合は-1）"
+    )
+
+
+class VentilationColumnarInput(BaseModel):
+    """
+    列形式の一括計算入力（VentilationCalculationInput を列ごとの配列にしたもの）
+
+    spaceId 以外の列は省略可能で、指定する場合は spaceId と同じ長さにする（値がない行はnull）
+    """
+    spaceId: list[str] = Field(..., description="対象スペースID")
+    method: Optional[list[VentilationMethod]] = Field(None, description="計算方法（省略時は building_code）")
+    area: Optional[list[Optional[float]]] = Field(None, description="床面積 (m²)")
+    volume: Optional[list[Optional[float]]] = Field(None, description="容積 (m³)")
+    height: Optional[list[Optional[float]]] = Field(None, description="天井高 (m)")
+    usage: Optional[list[Optional[RoomUsageType]]] = Field(None, description="用途区分")
+    occupancy: Optional[list[Optional[int]]] = Field(None, description="在室人数")
+    airChangeRate: Optional[list[Optional[float]]] = Field(None, description="換気回数 (回/h)")
+    freshAirPerPerson: Optional[list[Optional[float]]] = Field(None, description="一人当たり外気量 (m³/h)")
+
+    @model_validator(mode="after")
+    def _check_lengths(self) -> "VentilationColumnarInput":
+        expected = len(self.spaceId)
+        for name in COLUMNAR_INPUT_COLUMNS:
+            column = getattr(self, name)
+            if column is not None and len(column) != expected:
+                raise ValueError(f"列 {name} の長さ ({len(column)}) が spaceId の長さ ({expected}) と一致しません")
+        return self
+
+
+# spaceId 以外の入力列
+COLUMNAR_INPUT_COLUMNS = (
+    "method", "area", "volume", "height", "usage", "occupancy", "airChangeRate", "freshAirPerPerson"
+)
+
+
+class VentilationColumnarResult(BaseModel):
+    """列形式の一括計算結果（計算詳細は含まない）"""
+    total: int
+    spaceId: list[str]
+    spaceName: list[str]
+    method: list[VentilationMethod]
+    requiredVentilation: list[float]
+    airChangeRate: list[float]
+    usedArea: list[Optional[float]]
+    usedVolume: list[Optional[float]]
+    usedOccupancy: list[Optional[int]]
+    usedUsage: list[Optional[RoomUsageType]]
+    complianceStatus: list[Literal["OK", "NG", "WARNING"]]
+    complianceNotes: list[Optional[str]]
+    appliedStandard: list[Optional[str]]
+    summary: Dict[str, Any] = Field(default_factory=dict)
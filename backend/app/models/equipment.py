@@ -0,0 +1,32 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict, Any, Literal
+
+from app.models.space import Point3D
+
+
+class Equipment(BaseModel):
+    """設備機器・器具情報"""
+    id: str = Field(..., description="IFCエンティティID")
+    globalId: Optional[str] = Field(None, description="グローバルユニークID")
+    name: Optional[str] = Field(None, description="機器名")
+    ifcClass: str = Field(..., description="IFCクラス名")
+    objectType: Optional[str] = Field(None, description="オブジェクトタイプ")
+    
+    # 位置情報
+    floorLevel: Optional[str] = Field(None, description="階レベル")
+    location: Optional[Point3D] = Field(None, description="設置位置（ワールド座標, m）")
+    
+    # 所属スペース
+    spaceId: Optional[str] = Field(None, description="所属スペースID")
+    spaceAssignment: Optional[Literal["containment", "bounding_box"]] = Field(
+        None,
+        description="スペースの割り当て方法（空間構造への包含 / バウンディングボックス判定）"
+    )
+    
+    properties: Dict[str, Any] = Field(default_factory=dict, description="その他プロパティ")
+
+
+class EquipmentList(BaseModel):
+    """機器一覧レスポンス"""
+    total: int
+    equipment: List[Equipment]
@@ -0,0 +1,70 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+from enum import Enum
+
+
+class GroupKind(str, Enum):
+    """グループの種類"""
+    STOREY = "storey"  # 階（スペースの階レベルから自動作成）
+    USAGE = "usage"  # 用途（スペースの用途から自動作成）
+    ZONE = "zone"  # ゾーン（ユーザー定義）
+    SYSTEM = "system"  # 空調系統（ユーザー定義）
+
+
+class GroupTotals(BaseModel):
+    """グループの集計値"""
+    spaceCount: int = Field(0, description="スペース数")
+    area: float = Field(0.0, description="床面積の合計 (m²)")
+    volume: float = Field(0.0, description="容積の合計 (m³)")
+    occupancy: int = Field(0, description="在室人数の合計")
+    requiredVentilation: float = Field(0.0, description="必要換気量の合計 (m³/h、計算済みのスペースのみ)")
+    calculatedSpaceCount: int = Field(0, description="換気計算済みのスペース数")
+
+
+class SpaceGroup(BaseModel):
+    """スペースのグループ（階・用途・ゾーン・空調系統）"""
+    id: str = Field(..., description="グループID")
+    kind: GroupKind = Field(..., description="グループの種類")
+    name: str = Field(..., description="グループ名")
+    parentId: Optional[str] = Field(None, description="親グループID")
+    childIds: List[str] = Field(default_factory=list, description="子グループID一覧")
+    spaceIds: Optional[List[str]] = Field(None, description="直接所属するスペースID一覧（追加順。一覧の取得では include_spaces=true の場合のみ）")
+    totals: GroupTotals = Field(default_factory=GroupTotals, description="子グループを含む集計値")
+
+
+class SpaceGroupList(BaseModel):
+    """グループ一覧レスポンス"""
+    total: int
+    groups: List[SpaceGroup]
+    modelTotals: GroupTotals = Field(default_factory=GroupTotals, description="モデル全体の集計値")
+
+
+class GroupCreate(BaseModel):
+    """グループの作成（ゾーン・空調系統）"""
+    kind: GroupKind = Field(..., description="グループの種類（zone, system）")
+    name: str = Field(..., min_length=1, description="グループ名")
+    parentId: Optional[str] = Field(None, description="親グループID（ゾーンを空調系統の下に置く場合など）")
+    spaceIds: List[str] = Field(default_factory=list, description="所属させるスペースID")
+
+
+class GroupUpdate(BaseModel):
+    """グループの変更（指定した項目のみ変更）"""
+    name: Optional[str] = Field(None, min_length=1, description="グループ名")
+    parentId: Optional[str] = Field(None, description="親グループID（nullで親なし）")
+
+
+class GroupMembershipUpdate(BaseModel):
+    """グループへのスペースの追加・削除"""
+    add: List[str] = Field(default_factory=list, description="追加するスペースID")
+    remove: List[str] = Field(default_factory=list, description="外すスペースID")
+
+
+class SpaceUpdate(BaseModel):
+    """スペースの入力値の変更（指定した項目のみ変更）"""
+    name: Optional[str] = Field(None, min_length=1, description="室名")
+    area: Optional[float] = Field(None, ge=0, description="床面積 (m²)")
+    volume: Optional[float] = Field(None, ge=0, description="容積 (m³)")
+    height: Optional[float] = Field(None, ge=0, description="天井高 (m)")
+    floorLevel: Optional[str] = Field(None, description="階レベル")
+    usage: Optional[str] = Field(None, description="用途区分")
+    occupancy: Optional[int] = Field(None, ge=0, description="想定在室人数")
@@ -37,5 +37,17 @@ class IFCModelInfo(BaseModel):
     # プロジェクト情報
     projectInfo: Dict[str, Any] = Field(default_factory=dict)
     
+    # 保持しているプロパティの指定
+    propertyProfile: str = Field("*", description="アップロード時に指定したプロパティ抽出プロファイル")
+    
     # メタデータ
     metadata: Dict[str, Any] = Field(default_factory=dict)
+
+
+class ParseStatus(BaseModel):
+    """IFCファイルの解析状況"""
+    modelId: str
+    parseStatus: str = Field(..., description="解析状態（queued, parsing, success, error）")
+    parsedSpaces: int = Field(0, description="解析済みスペース数")
+    queuePosition: Optional[int] = Field(None, description="解析待ちの順番（1始まり、待ち行列にある場合のみ）")
+    error: Optional[str] = Field(None, description="エラーメッセージ")
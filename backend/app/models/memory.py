@@ -0,0 +1,30 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+
+
+class ModelMemoryUsage(BaseModel):
+    """モデルごとのメモリ使用量（推定値, bytes）"""
+    modelId: str
+    filename: str
+    spaceCount: int = 0
+
+    # 内訳
+    geometryBytes: int = Field(0, description="スペース形状・平面図データ")
+    propertyBytes: int = Field(0, description="スペース・機器のプロパティ")
+    resultBytes: int = Field(0, description="保持している計算結果")
+    responseCacheBytes: int = Field(0, description="シリアライズ済み・圧縮済みレスポンスのキャッシュ")
+    otherBytes: int = Field(0, description="その他（スペース・機器の基本情報など）")
+    totalBytes: int = Field(0, description="内訳の合計")
+
+    # プロセス外（ページキャッシュで共有）
+    geometryStoreFileBytes: int = Field(0, description="ジオメトリストアのファイルサイズ（mmapで共有）")
+
+
+class MemoryReport(BaseModel):
+    """プロセスのメモリ使用状況"""
+    processRssBytes: Optional[int] = Field(None, description="プロセスの常駐メモリ")
+    processPeakRssBytes: Optional[int] = Field(None, description="プロセスの最大常駐メモリ")
+    tracemallocBytes: Optional[int] = Field(None, description="tracemallocで追跡中のメモリ（有効な場合のみ）")
+    modelCount: int = 0
+    totalModelBytes: int = Field(0, description="全モデルの推定メモリ使用量の合計")
+    models: List[ModelMemoryUsage] = Field(default_factory=list, description="推定使用量の多い順")
@@ -0,0 +1,34 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List
+
+
+class SpaceFootprint(BaseModel):
+    """スペースの平面外形"""
+    spaceId: str = Field(..., description="スペースID")
+    name: str = Field(..., description="室名")
+    polygon: List[List[float]] = Field(..., description="外形ポリゴン [[x, y], ...] (m, 反時計回り)")
+    area: float = Field(..., description="外形から求めた面積 (m²)")
+    elevation: Optional[float] = Field(None, description="床面高さ (m)")
+
+
+class FloorPlan(BaseModel):
+    """階ごとの平面図データ"""
+    floorLevel: Optional[str] = Field(None, description="階レベル")
+    elevation: Optional[float] = Field(None, description="階の床面高さ (m)")
+    spaceCount: int = Field(0, description="スペース数")
+    totalArea: float = Field(0.0, description="外形面積の合計 (m²)")
+    footprints: List[SpaceFootprint] = Field(default_factory=list)
+
+
+class FloorPlanSummary(BaseModel):
+    """平面図の概要（階一覧用）"""
+    floorLevel: Optional[str] = None
+    elevation: Optional[float] = None
+    spaceCount: int = 0
+    totalArea: float = 0.0
+
+
+class FloorPlanList(BaseModel):
+    """階一覧レスポンス"""
+    total: int
+    floors: List[FloorPlanSummary]
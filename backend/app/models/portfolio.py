@@ -0,0 +1,50 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List, Literal
+
+from app.models.calculation import VentilationMethod
+
+
+class PortfolioRequest(BaseModel):
+    """複数モデルの換気計算の条件"""
+    modelIds: List[str] = Field(..., min_length=1, description="対象のモデルID")
+    method: VentilationMethod = Field(VentilationMethod.BUILDING_CODE, description="計算方法")
+
+
+class PortfolioModelSummary(BaseModel):
+    """モデルごとの計算結果の概要"""
+    modelId: str
+    status: Literal["success", "missing", "error"] = Field(..., description="計算結果（missing: モデルが見つからない）")
+    error: Optional[str] = None
+    filename: Optional[str] = None
+    spaceCount: int = 0
+    totalArea: float = Field(0.0, description="床面積の合計 (m²)")
+    totalRequiredVentilation: float = Field(0.0, description="必要換気量の合計 (m³/h)")
+    maxRequiredVentilation: float = Field(0.0, description="スペースごとの必要換気量の最大値 (m³/h)")
+    ventilationPerArea: Optional[float] = Field(None, description="床面積あたりの必要換気量 (m³/h/m²)")
+    okCount: int = 0
+    ngCount: int = 0
+    warningCount: int = 0
+    complianceRate: float = 0.0
+    elapsedSeconds: float = 0.0
+
+
+class PortfolioStatistic(BaseModel):
+    """モデル間の統計量"""
+    mean: float
+    median: float
+    min: float
+    max: float
+
+
+class PortfolioResult(BaseModel):
+    """複数モデルの換気計算結果"""
+    method: VentilationMethod
+    modelCount: int
+    succeededCount: int
+    failedCount: int = Field(..., description="見つからない・計算に失敗したモデル数")
+    totalSpaces: int
+    totalRequiredVentilation: float = Field(..., description="計算できたモデルの必要換気量の合計 (m³/h)")
+    complianceRate: float = Field(..., description="計算できたモデル全体の適合率")
+    requiredVentilationStats: Optional[PortfolioStatistic] = Field(None, description="モデルごとの必要換気量の合計の統計")
+    ventilationPerAreaStats: Optional[PortfolioStatistic] = Field(None, description="モデルごとの床面積あたり必要換気量の統計")
+    models: List[PortfolioModelSummary]
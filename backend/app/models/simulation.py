@@ -0,0 +1,69 @@
+from pydantic import BaseModel, Field
+from typing import Optional, List, Dict
+
+from app.models.calculation import RoomUsageType
+from app.models.group import GroupKind
+
+
+class DailySchedule(BaseModel):
+    """1日の在室率スケジュール（0時〜23時の24値、0〜1）"""
+    weekday: List[float] = Field(..., min_length=24, max_length=24, description="平日の時刻別在室率")
+    weekend: List[float] = Field(..., min_length=24, max_length=24, description="土日の時刻別在室率")
+
+
+class AnnualSimulationRequest(BaseModel):
+    """年間（8,760時間）の換気量シミュレーションの条件"""
+    year: int = Field(2025, ge=1900, le=2100, description="曜日の割り当てに使う年（365日で計算）")
+    schedules: Dict[RoomUsageType, DailySchedule] = Field(
+        default_factory=dict,
+        description="用途ごとの在室率スケジュール（指定しない用途は既定のスケジュール）"
+    )
+    occupancyDensity: Optional[float] = Field(
+        None, ge=0, description="在室人数が未設定のスペースに使う人員密度 (人/m²)。在室人数 = 床面積 × 人員密度"
+    )
+    freshAirPerPerson: Optional[float] = Field(None, ge=0, description="一人当たり外気量 (m³/h)。省略時は用途ごとの既定値")
+    groupKinds: List[GroupKind] = Field(
+        default_factory=lambda: [GroupKind.STOREY, GroupKind.SYSTEM],
+        description="集計するグループの種類"
+    )
+    durationPoints: int = Field(25, ge=2, le=8760, description="負荷持続曲線の点数")
+    includeSpaces: bool = Field(False, description="スペースごとの集計を含める")
+
+
+class LoadSummary(BaseModel):
+    """時刻別必要換気量の集計"""
+    peak: float = Field(..., description="最大必要換気量 (m³/h)")
+    peakHour: int = Field(..., description="最大となる時刻（1月1日0時からの時間）")
+    annualVolume: float = Field(..., description="年間換気量 (m³)")
+    operatingHours: int = Field(..., description="換気が必要な時間数")
+    loadDuration: List[float] = Field(default_factory=list, description="負荷持続曲線（durationHoursの順位の必要換気量 m³/h）")
+
+
+class GroupLoadSummary(LoadSummary):
+    """グループごとの集計"""
+    groupId: str
+    kind: GroupKind
+    name: str
+    spaceCount: int
+
+
+class SpaceLoadSummary(BaseModel):
+    """スペースごとの集計"""
+    spaceId: str
+    usage: RoomUsageType
+    peak: float = Field(..., description="最大必要換気量 (m³/h)")
+    peakHour: int
+    annualVolume: float = Field(..., description="年間換気量 (m³)")
+    operatingHours: int
+
+
+class AnnualSimulationResult(BaseModel):
+    """年間換気量シミュレーションの結果"""
+    modelId: str
+    year: int
+    hours: int = Field(..., description="計算した時間数")
+    spaceCount: int
+    durationHours: List[int] = Field(..., description="負荷持続曲線の各点の順位（大きい方から数えた時間、0始まり）")
+    total: LoadSummary = Field(..., description="モデル全体の集計")
+    groups: List[GroupLoadSummary] = Field(default_factory=list)
+    spaces: Optional[List[SpaceLoadSummary]] = None
@@ -17,9 +17,13 @@ class BoundingBox(BaseModel):
 
 class Geometry3D(BaseModel):
     """3Dジオメトリ情報（簡易版）"""
-    vertices: List[List[float]]  # [[x,y,z], [x,y,z], ...]
+    vertices: List[List[float]]  # [[x,y,z], [x,y,z], ...]（ワールド座標）
     indices: Optional[List[int]] = None
     boundingBox: Optional[BoundingBox] = None
+    
+    # インスタンス化（同じ形状のスペースでメッシュを共有）
+    meshId: Optional[str] = Field(None, description="共有メッシュのID")
+    transform: Optional[List[float]] = Field(None, description="共有メッシュからワールド座標への変換行列（4×4、行優先）")
 
 
 class Space(BaseModel):
@@ -64,3 +68,26 @@ class SpaceSummary(BaseModel):
     area: Optional[float] = None
     floorLevel: Optional[str] = None
     usage: Optional[str] = None
+
+
+class MeshSummary(BaseModel):
+    """共有メッシュの概要"""
+    meshId: str
+    vertexCount: int
+    indexCount: int
+    instanceCount: int = Field(0, description="このメッシュを参照するスペース数")
+
+
+class MeshInstance(BaseModel):
+    """スペースが参照するメッシュと配置"""
+    spaceId: str
+    meshId: str
+    transform: List[float] = Field(..., description="メッシュからワールド座標への変換行列（4×4、行優先）")
+
+
+class MeshInstanceList(BaseModel):
+    """メッシュとインスタンスの一覧レスポンス"""
+    totalMeshes: int
+    totalInstances: int
+    meshes: List[MeshSummary]
+    instances: List[MeshInstance]
@@ -1,3 +1,13 @@
-from app.services.ifc_parser import IFCParserService
+"""
+サービス
 
+IFC解析モジュールは ifcopenshell を読み込むため、参照されるまで読み込まない（起動時間の短縮）
+"""
 __all__ = ["IFCParserService"]
+
+
+def __getattr__(name: str):
+    if name == "IFCParserService":
+        from app.services.ifc_parser import IFCParserService
+        return IFCParserService
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,226 @@
+"""
+解析のアドミッション制御
+ファイルサイズとエンティティ数から解析に必要なメモリ・時間を見積もり、
+メモリ予算と同時実行数の範囲内で解析を開始する。超える分は到着順に待たせ、
+待ち行列が一杯の場合は受け付けない
+"""
+from typing import Dict, List, Optional
+import asyncio
+import itertools
+import logging
+import math
+import threading
+import time
+
+from app.config import get_settings
+from app.services.worker_pool import get_worker_count
+
+logger = logging.getLogger(__name__)
+
+# 見積もり係数（合成モデルでの計測値に余裕を持たせた値）
+# ifcopenshellが保持するエンティティ1件あたりのメモリ
+BYTES_PER_ENTITY = 1536
+# 解析済みスペース1件あたりのメモリ（形状・プロパティ・レスポンスキャッシュを含む）
+BYTES_PER_SPACE = 16 * 1024
+# 解析時間
+SECONDS_PER_ENTITY = 2e-6
+SECONDS_PER_SPACE = 0.005
+
+# エンティティ数を数えるときの読み込みサイズ
+SCAN_CHUNK_SIZE = 4 * 1024 * 1024
+_ENTITY_MARKER = b"\n#"
+_SPACE_MARKER = b"IFCSPACE("
+
+# Retry-Afterの範囲 (秒)
+MIN_RETRY_AFTER = 5
+MAX_RETRY_AFTER = 600
+
+
+class ParseCost:
+    """解析1件の見積もり"""
+
+    def __init__(self, file_size: int, entity_count: int, space_count: int):
+        self.file_size = file_size
+        self.entity_count = entity_count
+        self.space_count = space_count
+        self.memory_bytes = entity_count * BYTES_PER_ENTITY + space_count * BYTES_PER_SPACE
+        self.seconds = entity_count * SECONDS_PER_ENTITY + space_count * SECONDS_PER_SPACE
+
+    def __add__(self, other: "ParseCost") -> "ParseCost":
+        return ParseCost(
+            self.file_size + other.file_size,
+            self.entity_count + other.entity_count,
+            self.space_count + other.space_count
+        )
+
+
+def estimate_parse_cost(file_path: str) -> ParseCost:
+    """
+    IFCファイルを走査して解析コストを見積もる
+
+    STEP形式のインスタンス行（#で始まる行）とIfcSpaceの数を数える（ファイルは解析しない）
+    """
+    entity_count = 0
+    space_count = 0
+    file_size = 0
+    overlap = max(len(_ENTITY_MARKER), len(_SPACE_MARKER)) - 1
+    tail = b""
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = f.read(SCAN_CHUNK_SIZE)
+            if not chunk:
+                break
+            file_size += len(chunk)
+            # チャンクの境界をまたぐ一致を数えるため、前のチャンクの末尾をつなげる
+            data = tail + chunk
+            entity_count += data.count(_ENTITY_MARKER)
+            space_count += data.count(_SPACE_MARKER)
+            tail = data[-overlap:]
+            entity_count -= tail.count(_ENTITY_MARKER)
+            space_count -= tail.count(_SPACE_MARKER)
+        entity_count += tail.count(_ENTITY_MARKER)
+        space_count += tail.count(_SPACE_MARKER)
+    return ParseCost(file_size, entity_count, space_count)
+
+
+class AdmissionRejected(Exception):
+    """待ち行列が一杯で受け付けられない"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"解析の待ち行列が一杯です（{retry_after}秒後に再試行してください）")
+        self.retry_after = retry_after
+
+
+class AdmissionTicket:
+    """解析1件の受付票"""
+
+    def __init__(self, ticket_id: int, model_id: str, cost: ParseCost, cpu_slots: int, loop: asyncio.AbstractEventLoop):
+        self.ticket_id = ticket_id
+        self.model_id = model_id
+        self.cost = cost
+        self.cpu_slots = cpu_slots
+        self.enqueued_at = time.monotonic()
+        self.started_at: Optional[float] = None
+        self._loop = loop
+        self._admitted = asyncio.Event()
+
+    @property
+    def admitted(self) -> bool:
+        return self.started_at is not None
+
+    def _admit(self) -> None:
+        self.started_at = time.monotonic()
+        try:
+            self._loop.call_soon_threadsafe(self._admitted.set)
+        except RuntimeError:
+            # イベントループが終了している場合
+            pass
+
+    async def wait(self) -> None:
+        """解析を開始できるまで待つ"""
+        await self._admitted.wait()
+
+
+class AdmissionController:
+    """
+    メモリ予算と同時実行数に基づいて解析の開始を制御する
+
+    待ち行列は到着順で、先頭の解析が予算に収まるまで後続も開始しない（大きなファイルが後回しにされ続けないため）。
+    予算より大きい解析は、実行中の解析がなくなった時点で単独で開始する
+    """
+
+    def __init__(self, memory_budget_bytes: int, max_concurrent: int, queue_limit: int):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.max_concurrent = max(1, max_concurrent)
+        self.queue_limit = queue_limit
+        self._running: Dict[int, AdmissionTicket] = {}
+        self._queue: List[AdmissionTicket] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _fits(self, ticket: AdmissionTicket) -> bool:
+        if not self._running:
+            return True
+        memory = sum(t.cost.memory_bytes for t in self._running.values())
+        slots = sum(t.cpu_slots for t in self._running.values())
+        return (
+            memory + ticket.cost.memory_bytes <= self.memory_budget_bytes
+            and slots + ticket.cpu_slots <= self.max_concurrent
+        )
+
+    def _admit_waiting(self) -> None:
+        while self._queue and self._fits(self._queue[0]):
+            ticket = self._queue.pop(0)
+            self._running[ticket.ticket_id] = ticket
+            ticket._admit()
+
+    def _estimate_wait_seconds(self) -> float:
+        """待ち行列がすべて開始されるまでのおおよその時間"""
+        now = time.monotonic()
+        running = sum(max(t.cost.seconds - (now - t.started_at), 0.0) for t in self._running.values())
+        queued = sum(t.cost.seconds for t in self._queue)
+        return (running + queued) / self.max_concurrent
+
+    def submit(self, model_id: str, cost: ParseCost, cpu_slots: int = 1) -> AdmissionTicket:
+        """
+        解析を受け付ける
+
+        予算に空きがあればすぐに開始可能になり、なければ待ち行列に入る
+
+        Raises:
+            AdmissionRejected: 待ち行列が一杯の場合
+        """
+        ticket = AdmissionTicket(
+            next(self._ids), model_id, cost, min(max(cpu_slots, 1), self.max_concurrent),
+            asyncio.get_running_loop()
+        )
+        with self._lock:
+            if not self._queue and self._fits(ticket):
+                self._running[ticket.ticket_id] = ticket
+                ticket._admit()
+                return ticket
+            if len(self._queue) >= self.queue_limit:
+                retry_after = int(math.ceil(self._estimate_wait_seconds()))
+                raise AdmissionRejected(min(max(retry_after, MIN_RETRY_AFTER), MAX_RETRY_AFTER))
+            self._queue.append(ticket)
+            logger.info(
+                f"解析を待ち行列に追加しました: {model_id} "
+                f"(見積もり {cost.memory_bytes / 1024 / 1024:.0f} MB, 待ち {len(self._queue)} 件)"
+            )
+        return ticket
+
+    def release(self, ticket: AdmissionTicket) -> None:
+        """解析の終了（または取り消し）を通知し、待っている解析を開始する（任意のスレッドから呼べる）"""
+        with self._lock:
+            if self._running.pop(ticket.ticket_id, None) is None and ticket in self._queue:
+                self._queue.remove(ticket)
+            self._admit_waiting()
+
+    def get_position(self, model_id: str) -> Optional[int]:
+        """待ち行列での順番（1始まり）。実行中は0、受付がない場合はNone"""
+        with self._lock:
+            for ticket in self._running.values():
+                if ticket.model_id == model_id:
+                    return 0
+            for position, ticket in enumerate(self._queue, start=1):
+                if ticket.model_id == model_id:
+                    return position
+        return None
+
+
+_controller: Optional[AdmissionController] = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    """設定に基づくアドミッション制御を取得（初回呼び出し時に作成）"""
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            settings = get_settings()
+            _controller = AdmissionController(
+                memory_budget_bytes=settings.parse_memory_budget_mb * 1024 * 1024,
+                max_concurrent=settings.parse_max_concurrent or get_worker_count(),
+                queue_limit=settings.parse_queue_limit
+            )
+        return _controller
@@ -0,0 +1,112 @@
+"""
+列形式の一括計算入出力
+スペースIDとパラメータを列ごとの配列で受け取り（JSON または Arrow IPC ストリーム）、
+行ごとのモデル検証をせずに計算へ渡す。結果も列形式で返す
+
+Arrow形式には pyarrow が必要（未インストールの場合はJSONのみ使用可能）
+"""
+from typing import Any, Dict, Iterator, List
+import json
+
+from app.models import (
+    VentilationCalculationInput,
+    VentilationCalculationResult,
+    VentilationColumnarInput,
+    VentilationColumnarResult,
+    VentilationMethod
+)
+from app.models.calculation import COLUMNAR_INPUT_COLUMNS
+from app.services.export import RESULT_COLUMNS
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+COLUMNAR_FORMATS = ("json", "arrow")
+
+
+class ArrowUnavailable(Exception):
+    """pyarrow がインストールされていない"""
+
+    def __init__(self):
+        super().__init__("Arrow形式には pyarrow が必要です（pip install pyarrow）")
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc  # noqa: F401
+    except ImportError:
+        raise ArrowUnavailable()
+    return pa
+
+
+def parse_columnar_json(body: bytes) -> VentilationColumnarInput:
+    """
+    列形式のJSONを解釈（列ごとにまとめて検証する）
+
+    Raises:
+        pydantic.ValidationError: 形式が正しくない場合
+    """
+    return VentilationColumnarInput.model_validate_json(body)
+
+
+def parse_columnar_arrow(body: bytes) -> VentilationColumnarInput:
+    """
+    Arrow IPCストリームを解釈（入力と同名の列のみ使用）
+
+    Raises:
+        ArrowUnavailable: pyarrow がインストールされていない場合
+        ValueError: Arrowストリームとして読めない場合
+        pydantic.ValidationError: 列の型・長さが正しくない場合
+    """
+    pa = _import_pyarrow()
+    try:
+        table = pa.ipc.open_stream(body).read_all()
+    except (pa.ArrowInvalid, OSError) as e:
+        raise ValueError(f"Arrowストリームを読み込めません: {e}")
+    names = {"spaceId", *COLUMNAR_INPUT_COLUMNS}
+    columns = {name: table.column(name).to_pylist() for name in table.column_names if name in names}
+    return VentilationColumnarInput.model_validate(columns)
+
+
+def iter_columnar_inputs(columnar: VentilationColumnarInput) -> Iterator[VentilationCalculationInput]:
+    """列から行ごとの計算入力を作成（列は検証済みのため、行ごとのモデル検証はしない）"""
+    columns = {
+        name: getattr(columnar, name)
+        for name in COLUMNAR_INPUT_COLUMNS
+        if getattr(columnar, name) is not None
+    }
+    for i, space_id in enumerate(columnar.spaceId):
+        values: Dict[str, Any] = {name: column[i] for name, column in columns.items()}
+        if values.get("method") is None:
+            values["method"] = VentilationMethod.BUILDING_CODE
+        yield VentilationCalculationInput.model_construct(spaceId=space_id, **values)
+
+
+def build_columnar_result(results: List[VentilationCalculationResult], summary: Dict[str, Any]) -> VentilationColumnarResult:
+    """計算結果を列形式にまとめる（結果は検証済みのため再検証しない）"""
+    columns = {name: [getattr(result, name) for result in results] for name in RESULT_COLUMNS}
+    return VentilationColumnarResult.model_construct(total=len(results), summary=summary, **columns)
+
+
+def columnar_result_to_arrow(result: VentilationColumnarResult) -> bytes:
+    """
+    列形式の結果をArrow IPCストリームに変換（集計値はスキーマのメタデータに格納）
+
+    Raises:
+        ArrowUnavailable: pyarrow がインストールされていない場合
+    """
+    pa = _import_pyarrow()
+    arrays = {}
+    for name in RESULT_COLUMNS:
+        values = getattr(result, name)
+        if name in ("method", "usedUsage"):
+            values = [v.value if v is not None else None for v in values]
+        arrays[name] = values
+    table = pa.table(arrays)
+    table = table.replace_schema_metadata({
+        "total": str(result.total),
+        "summary": json.dumps(result.summary, ensure_ascii=False),
+    })
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,249 @@
+"""
+スペース・計算結果のストリーミングエクスポート
+CSV / XLSX を1行ずつ生成し、全体をメモリに載せずに送信する
+"""
+from typing import List, Dict, Any, Iterable, Iterator, Sequence
+import csv
+import io
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from app.models import Space, VentilationCalculationResult
+
+# スペースの基本列
+SPACE_COLUMNS = ["id", "name", "area", "volume", "height", "floorLevel", "usage", "occupancy"]
+
+# 換気計算結果の列
+RESULT_COLUMNS = [
+    "spaceId",
+    "spaceName",
+    "method",
+    "requiredVentilation",
+    "airChangeRate",
+    "usedArea",
+    "usedVolume",
+    "usedOccupancy",
+    "usedUsage",
+    "complianceStatus",
+    "complianceNotes",
+    "appliedStandard",
+]
+
+EXPORT_FORMATS = ("csv", "xlsx")
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# CSVをまとめて送信する行数
+CSV_FLUSH_ROWS = 200
+
+# XMLで使用できない制御文字
+_ILLEGAL_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def collect_property_keys(spaces: Iterable[Space]) -> List[str]:
+    """全スペースのプロパティキーの和集合（出現順）を求める"""
+    keys: Dict[str, None] = {}
+    for space in spaces:
+        for key in space.properties:
+            keys.setdefault(key, None)
+    return list(keys)
+
+
+def iter_space_rows(spaces: Iterable[Space], property_keys: Sequence[str]) -> Iterator[List[Any]]:
+    """スペースを1行ずつの値リストに変換"""
+    for space in spaces:
+        row: List[Any] = [
+            space.id,
+            space.name,
+            space.area,
+            space.volume,
+            space.height,
+            space.floorLevel,
+            space.usage,
+            space.occupancy,
+        ]
+        properties = space.properties
+        row.extend(properties.get(key) for key in property_keys)
+        yield row
+
+
+def iter_result_rows(results: Iterable[VentilationCalculationResult]) -> Iterator[List[Any]]:
+    """換気計算結果を1行ずつの値リストに変換"""
+    for result in results:
+        yield [
+            result.spaceId,
+            result.spaceName,
+            result.method.value,
+            result.requiredVentilation,
+            result.airChangeRate,
+            result.usedArea,
+            result.usedVolume,
+            result.usedOccupancy,
+            result.usedUsage.value if result.usedUsage else None,
+            result.complianceStatus,
+            result.complianceNotes,
+            result.appliedStandard,
+        ]
+
+
+def _cell_text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    return str(value)
+
+
+def iter_csv(header: Sequence[str], rows: Iterable[Sequence[Any]]) -> Iterator[bytes]:
+    """
+    CSVを少しずつ生成する
+
+    Excelで文字化けしないよう先頭にBOMを付ける
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(header)
+    yield ("\ufeff" + buffer.getvalue()).encode("utf-8")
+    buffer.seek(0)
+    buffer.truncate()
+
+    pending = 0
+    for row in rows:
+        writer.writerow([_cell_text(v) for v in row])
+        pending += 1
+        if pending >= CSV_FLUSH_ROWS:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+
+    if pending:
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _StreamBuffer:
+    """zipfileの書き込み先。書き込まれたバイト列を取り出せるシーク不可のバッファ"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+
+def _workbook_xml(sheet_name: str) -> str:
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{escape(sheet_name)}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    )
+
+
+def _xlsx_cell(value: Any) -> str:
+    if value is None:
+        return "<c/>"
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        if value != value or value in (float("inf"), float("-inf")):
+            return "<c/>"
+        return f"<c><v>{value}</v></c>"
+    text = _ILLEGAL_XML_CHARS.sub("", str(value))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+
+def _xlsx_row(values: Sequence[Any]) -> str:
+    return "<row>" + "".join(_xlsx_cell(v) for v in values) + "</row>"
+
+
+def iter_xlsx(
+    header: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    sheet_name: str = "Sheet1"
+) -> Iterator[bytes]:
+    """
+    XLSXを少しずつ生成する
+
+    ワークシートXMLを1行ずつ圧縮しながらZIPに書き込み、
+    圧縮済みのバイト列ができた時点で順次返す
+    """
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        archive.writestr("_rels/.rels", _ROOT_RELS)
+        archive.writestr("xl/workbook.xml", _workbook_xml(sheet_name))
+        archive.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+        yield buffer.drain()
+
+        with archive.open("xl/worksheets/sheet1.xml", mode="w", force_zip64=True) as sheet:
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                '<sheetData>'
+            ).encode("utf-8"))
+            sheet.write(_xlsx_row(header).encode("utf-8"))
+            for row in rows:
+                sheet.write(_xlsx_row(row).encode("utf-8"))
+                chunk = buffer.drain()
+                if chunk:
+                    yield chunk
+            sheet.write(b"</sheetData></worksheet>")
+
+    yield buffer.drain()
+
+
+def iter_export(
+    export_format: str,
+    header: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    sheet_name: str = "Sheet1"
+) -> Iterator[bytes]:
+    """形式に応じたエクスポートのバイト列ジェネレータを返す"""
+    if export_format == "csv":
+        return iter_csv(header, rows)
+    if export_format == "xlsx":
+        return iter_xlsx(header, rows, sheet_name)
+    raise ValueError(f"未対応の形式です: {export_format}")
@@ -0,0 +1,95 @@
+"""
+複数IFCファイル（意匠・機械・電気など）の統合
+ファイルごとに解析したモデルを1つのモデルにまとめる
+"""
+from typing import List, Dict, Any, Tuple
+import logging
+
+from app.models import Space, Equipment
+from app.services.spatial import link_equipment_to_spaces
+
+logger = logging.getLogger(__name__)
+
+
+def _scoped_id(source_index: int, entity_id: str) -> str:
+    """ファイル間で重複しないようファイル番号を付けたID"""
+    return f"{source_index}:{entity_id}"
+
+
+def merge_models(parsed_models: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    ファイルごとの解析結果を1つのモデルに統合
+
+    - スペース・機器・共有メッシュのIDは「ファイル番号:元のID」に置き換える
+    - GlobalIdが重複する要素は先に指定されたファイルのものを採用する
+    - 各ファイルの値は解析時に calculate_unit_scale でSI単位に換算済み
+    - スペースを持たないファイルの機器は統合後のスペースに対して改めて割り当てる
+
+    Args:
+        parsed_models: parse_ifc_file() の戻り値のリスト（ファイル順）
+
+    Returns:
+        (統合したモデルデータ, 警告メッセージ)
+    """
+    spaces: List[Space] = []
+    equipment: List[Equipment] = []
+    meshes: Dict[str, Any] = {}
+    stats: Dict[str, int] = {}
+    warnings: List[str] = []
+    seen_global_ids: Dict[str, int] = {}
+    duplicate_count = 0
+
+    for index, parsed in enumerate(parsed_models):
+        id_map: Dict[str, str] = {}
+
+        for space in parsed["spaces"]:
+            if space.globalId and space.globalId in seen_global_ids:
+                duplicate_count += 1
+                continue
+            if space.globalId:
+                seen_global_ids[space.globalId] = index
+            new_id = _scoped_id(index, space.id)
+            id_map[space.id] = new_id
+            update: Dict[str, Any] = {"id": new_id, "relatedEquipmentIds": []}
+            if space.geometry is not None and space.geometry.meshId is not None:
+                mesh_id = _scoped_id(index, space.geometry.meshId)
+                meshes[mesh_id] = parsed["meshes"][space.geometry.meshId]
+                update["geometry"] = space.geometry.model_copy(update={"meshId": mesh_id})
+            spaces.append(space.model_copy(update=update))
+
+        for item in parsed["equipment"]:
+            if item.globalId and item.globalId in seen_global_ids:
+                duplicate_count += 1
+                continue
+            if item.globalId:
+                seen_global_ids[item.globalId] = index
+            # 同じファイル内のスペースに割り当て済みならIDを付け替え、それ以外は再判定する
+            space_id = id_map.get(item.spaceId) if item.spaceId else None
+            equipment.append(item.model_copy(update={
+                "id": _scoped_id(index, item.id),
+                "spaceId": space_id,
+                "spaceAssignment": item.spaceAssignment if space_id else None,
+            }))
+
+        for key, value in parsed["stats"].items():
+            stats[key] = stats.get(key, 0) + value
+
+    if duplicate_count:
+        warnings.append(f"GlobalIdが重複する {duplicate_count} 件の要素を除外しました（先のファイルを優先）")
+
+    link_equipment_to_spaces(equipment, spaces)
+
+    schemas = sorted({parsed["ifc_schema"] for parsed in parsed_models})
+    if len(schemas) > 1:
+        warnings.append(f"IFCスキーマが混在しています: {', '.join(schemas)}")
+
+    merged = {
+        "ifc_schema": ", ".join(schemas),
+        "project_info": parsed_models[0]["project_info"] if parsed_models else {},
+        "spaces": spaces,
+        "equipment": equipment,
+        "stats": stats,
+        "meshes": meshes,
+    }
+    logger.info(f"{len(parsed_models)} ファイルを統合しました: {len(spaces)} スペース, {len(equipment)} 機器")
+    return merged, warnings
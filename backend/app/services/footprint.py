@@ -0,0 +1,288 @@
+"""
+平面図用フットプリント抽出
+スペースの3Dメッシュを水平面に投影し、簡略化した2D外形ポリゴンを求める
+"""
+from typing import Dict, Iterable, List, Optional, Sequence
+import logging
+
+import numpy as np
+
+from app.models import Space, SpaceFootprint, FloorPlan
+
+logger = logging.getLogger(__name__)
+
+# 頂点を同一視する許容差 (m)
+WELD_TOLERANCE = 1e-4
+# 床面とみなす面法線のZ成分の閾値（下向き）
+FLOOR_NORMAL_Z = -0.5
+# 床面とみなす高さの許容差 (m)
+FLOOR_HEIGHT_TOLERANCE = 0.05
+# 共線とみなす外積の閾値
+COLLINEAR_TOLERANCE = 1e-6
+
+
+def polygon_area(polygon: np.ndarray) -> float:
+    """ポリゴンの符号付き面積を求める（反時計回りで正）"""
+    if len(polygon) < 3:
+        return 0.0
+    x = polygon[:, 0]
+    y = polygon[:, 1]
+    return 0.5 * float(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+
+
+def simplify_polygon(polygon: np.ndarray, tolerance: float = COLLINEAR_TOLERANCE) -> np.ndarray:
+    """重複点と共線上の中間点を取り除く"""
+    if len(polygon) < 3:
+        return polygon
+
+    # 連続する重複点を除去
+    step = np.roll(polygon, -1, axis=0) - polygon
+    polygon = polygon[np.any(np.abs(step) > WELD_TOLERANCE, axis=1)]
+    if len(polygon) < 3:
+        return polygon
+
+    # 前後の辺の外積がほぼ0の点は直線上にあるため除去
+    prev_edge = polygon - np.roll(polygon, 1, axis=0)
+    next_edge = np.roll(polygon, -1, axis=0) - polygon
+    cross = prev_edge[:, 0] * next_edge[:, 1] - prev_edge[:, 1] * next_edge[:, 0]
+    scale = np.linalg.norm(prev_edge, axis=1) * np.linalg.norm(next_edge, axis=1)
+    keep = np.abs(cross) > tolerance * np.maximum(scale, tolerance)
+    return polygon[keep]
+
+
+def convex_hull(points: np.ndarray) -> np.ndarray:
+    """2D点群の凸包を求める（Andrew's monotone chain）"""
+    points = np.unique(points, axis=0)
+    if len(points) < 3:
+        return points
+
+    def _half(pts: np.ndarray) -> List[np.ndarray]:
+        hull: List[np.ndarray] = []
+        for p in pts:
+            while len(hull) >= 2:
+                a, b = hull[-2], hull[-1]
+                if (b[0] - a[0]) * (p[1] - a[1]) - (b[1] - a[1]) * (p[0] - a[0]) > 0:
+                    break
+                hull.pop()
+            hull.append(p)
+        return hull
+
+    lower = _half(points)
+    upper = _half(points[::-1])
+    return np.array(lower[:-1] + upper[:-1])
+
+
+def _chain_loops(edges: np.ndarray) -> List[np.ndarray]:
+    """境界エッジを連結して閉じたループ（頂点インデックス列）にする"""
+    adjacency: dict = {}
+    for a, b in edges.tolist():
+        adjacency.setdefault(a, []).append(b)
+        adjacency.setdefault(b, []).append(a)
+
+    loops: List[np.ndarray] = []
+    visited_edges = set()
+    for start in adjacency:
+        for first in adjacency[start]:
+            if (start, first) in visited_edges:
+                continue
+            loop = [start]
+            prev, current = start, first
+            visited_edges.add((start, first))
+            visited_edges.add((first, start))
+            while current != start:
+                loop.append(current)
+                candidates = [n for n in adjacency[current] if (current, n) not in visited_edges]
+                if not candidates:
+                    break
+                prev, current = current, candidates[0]
+                visited_edges.add((prev, current))
+                visited_edges.add((current, prev))
+            if current == start and len(loop) >= 3:
+                loops.append(np.array(loop))
+    return loops
+
+
+def _floor_outline(vertices: np.ndarray, indices: np.ndarray) -> Optional[np.ndarray]:
+    """下向きの床面三角形の境界エッジから外形ループを求める"""
+    triangles = indices.reshape(-1, 3)
+    corners = vertices[triangles]  # (M, 3, 3)
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    lengths = np.linalg.norm(normals, axis=1)
+    valid = lengths > 0
+    if not np.any(valid):
+        return None
+
+    normal_z = np.zeros(len(triangles))
+    normal_z[valid] = normals[valid, 2] / lengths[valid]
+    z_min = vertices[:, 2].min()
+    on_floor = np.all(corners[:, :, 2] <= z_min + FLOOR_HEIGHT_TOLERANCE, axis=1)
+    floor = triangles[valid & (normal_z < FLOOR_NORMAL_Z) & on_floor]
+    if len(floor) == 0:
+        return None
+
+    # 投影後の頂点を溶接して重複頂点を統合
+    keys = np.round(vertices[:, :2] / WELD_TOLERANCE).astype(np.int64)
+    unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    welded = inverse[floor]
+
+    # 三角形の各辺を正規化し、一度だけ現れる辺を境界とする
+    edges = np.concatenate([welded[:, [0, 1]], welded[:, [1, 2]], welded[:, [2, 0]]])
+    edges = np.sort(edges, axis=1)
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    unique_edges, counts = np.unique(edges, axis=0, return_counts=True)
+    boundary = unique_edges[counts == 1]
+    if len(boundary) < 3:
+        return None
+
+    loops = _chain_loops(boundary)
+    if not loops:
+        return None
+
+    points = unique_keys.astype(np.float64) * WELD_TOLERANCE
+    polygons = [points[loop] for loop in loops]
+    areas = np.array([abs(polygon_area(p)) for p in polygons])
+    return polygons[int(np.argmax(areas))]
+
+
+def extract_footprint(
+    vertices: Sequence[Sequence[float]],
+    indices: Optional[Sequence[int]] = None
+) -> Optional[np.ndarray]:
+    """
+    3Dメッシュから2Dフットプリントポリゴンを抽出
+
+    Args:
+        vertices: 頂点座標 [[x, y, z], ...]（SI単位）
+        indices: 三角形インデックス
+
+    Returns:
+        反時計回りの2Dポリゴン (N, 2)。抽出できない場合はNone
+    """
+    if vertices is None or len(vertices) < 3:
+        return None
+
+    verts = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+
+    outline = None
+    if indices is not None and len(indices) >= 3 and len(indices) % 3 == 0:
+        try:
+            outline = _floor_outline(verts, np.asarray(indices, dtype=np.int64))
+        except Exception as e:
+            logger.debug(f"床面外形の抽出に失敗したため凸包を使用: {e}")
+            outline = None
+
+    if outline is None:
+        # 床面が特定できない場合は投影点群の凸包で近似
+        outline = convex_hull(verts[:, :2])
+
+    outline = simplify_polygon(outline)
+    if len(outline) < 3:
+        return None
+
+    if polygon_area(outline) < 0:
+        outline = outline[::-1]
+    return outline
+
+
+def get_space_footprint(space: Space) -> Optional[SpaceFootprint]:
+    """スペースのジオメトリから平面外形を取得"""
+    geometry = space.geometry
+    if geometry is None:
+        return None
+
+    try:
+        polygon = extract_footprint(geometry.vertices, geometry.indices)
+        if polygon is None and geometry.boundingBox is not None:
+            # 頂点がない場合はバウンディングボックスの矩形を使用
+            bbox = geometry.boundingBox
+            polygon = np.array([
+                [bbox.min.x, bbox.min.y],
+                [bbox.max.x, bbox.min.y],
+                [bbox.max.x, bbox.max.y],
+                [bbox.min.x, bbox.max.y],
+            ])
+        if polygon is None:
+            return None
+
+        elevation = geometry.boundingBox.min.z if geometry.boundingBox else None
+        return SpaceFootprint(
+            spaceId=space.id,
+            name=space.name,
+            polygon=np.round(polygon, 3).tolist(),
+            area=abs(polygon_area(polygon)),
+            elevation=elevation,
+        )
+    except Exception as e:
+        logger.warning(f"スペース {space.id} のフットプリント取得エラー: {e}")
+        return None
+
+
+def _add_footprint(plans: Dict[Optional[str], FloorPlan], floor_level: Optional[str], footprint: SpaceFootprint) -> None:
+    """フットプリントを階の平面図に追加し、集計値を更新"""
+    plan = plans.get(floor_level)
+    if plan is None:
+        plan = FloorPlan(floorLevel=floor_level)
+        plans[floor_level] = plan
+
+    plan.footprints.append(footprint)
+    plan.spaceCount += 1
+    plan.totalArea += footprint.area
+    if footprint.elevation is not None:
+        if plan.elevation is None or footprint.elevation < plan.elevation:
+            plan.elevation = footprint.elevation
+
+
+def _sort_plans(plans: Iterable[FloorPlan]) -> List[FloorPlan]:
+    """床面高さ順に並べる（高さ不明の階は最後）"""
+    return sorted(
+        plans,
+        key=lambda p: (p.elevation is None, p.elevation or 0.0, p.floorLevel or "")
+    )
+
+
+def build_floor_plans(spaces: List[Space]) -> List[FloorPlan]:
+    """スペースのフットプリントを階ごとにまとめた平面図データを作成"""
+    plans: Dict[Optional[str], FloorPlan] = {}
+
+    for space in spaces:
+        footprint = get_space_footprint(space)
+        if footprint is not None:
+            _add_footprint(plans, space.floorLevel, footprint)
+
+    result = _sort_plans(plans.values())
+    logger.info(f"平面図データを作成しました: {len(result)} 階")
+    return result
+
+
+def rebuild_floor_plans(
+    plans: List[FloorPlan],
+    spaces: List[Space],
+    floor_levels: Iterable[Optional[str]]
+) -> List[FloorPlan]:
+    """
+    指定した階の平面図だけを作り直し、他の階の平面図はそのまま再利用
+
+    スペースの形状は変わらないため、作成済みのフットプリントは室名だけ合わせて再利用します
+    """
+    levels = set(floor_levels)
+    existing = {
+        footprint.spaceId: footprint
+        for plan in plans if plan.floorLevel in levels
+        for footprint in plan.footprints
+    }
+
+    rebuilt: Dict[Optional[str], FloorPlan] = {}
+    for space in spaces:
+        if space.floorLevel not in levels:
+            continue
+        footprint = existing.get(space.id)
+        if footprint is None:
+            footprint = get_space_footprint(space)
+        elif footprint.name != space.name:
+            footprint = footprint.model_copy(update={"name": space.name})
+        if footprint is not None:
+            _add_footprint(rebuilt, space.floorLevel, footprint)
+
+    kept = [plan for plan in plans if plan.floorLevel not in levels]
+    return _sort_plans(kept + list(rebuilt.values()))
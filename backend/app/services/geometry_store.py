@@ -0,0 +1,309 @@
+"""
+メモリマップ方式のジオメトリストア
+モデルごとに解析済みジオメトリを1つのバイナリファイルへ書き出し、
+各ワーカープロセスはmmapで参照することでページキャッシュを共有する
+
+同じ形状のスペースはメッシュを1つだけ格納し、スペースごとに変換行列を持つ（インスタンス化）。
+共有メッシュを持たないスペースはワールド座標のメッシュを単位行列で参照する
+
+ファイル形式（リトルエンディアン）:
+    ヘッダー     : magic(8s) version(I) spaceCount(I) meshCount(Q) vertexCount(Q) indexCount(Q)
+                   meshTableOffset(Q) vertexPoolOffset(Q) indexPoolOffset(Q) idsOffset(Q) idsLength(Q)
+    インスタンス表: spaceCount × (meshIndex(I) reserved(I) transform(16d))
+                   変換行列は4×4の行優先（メッシュの座標 → ワールド座標、SI単位）。形状がない場合 meshIndex = 0xFFFFFFFF
+    メッシュ表   : meshCount × (vertexStart(Q) vertexCount(Q) indexStart(Q) indexCount(Q))
+    頂点プール   : vertexCount × 3 × float32（SI単位）
+    インデックス : indexCount × uint32（メッシュごとの頂点を0始まりで参照）
+    ID          : UTF-8のJSON {"spaces": [...], "meshes": [...]}（インスタンス表・メッシュ表と同じ順）
+"""
+from typing import List, Dict, Optional, Tuple, Iterator
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+
+import numpy as np
+
+from app.models import Space
+
+logger = logging.getLogger(__name__)
+
+STORE_MAGIC = b"IFCGEOM\x00"
+STORE_VERSION = 2
+HEADER_FORMAT = "<8sIIQQQQQQQQ"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+INSTANCE_ENTRY_FORMAT = "<II16d"
+INSTANCE_ENTRY_SIZE = struct.calcsize(INSTANCE_ENTRY_FORMAT)
+TABLE_ENTRY_FORMAT = "<QQQQ"
+TABLE_ENTRY_SIZE = struct.calcsize(TABLE_ENTRY_FORMAT)
+VERTEX_STRIDE = 12  # float32 × 3
+INDEX_SIZE = 4  # uint32
+NO_MESH = 0xFFFFFFFF
+
+IDENTITY = np.eye(4)
+
+# メッシュの頂点・インデックス
+Mesh = Tuple[np.ndarray, np.ndarray]
+
+
+def _align(offset: int, alignment: int = 8) -> int:
+    return offset + (-offset % alignment)
+
+
+def get_store_path(store_dir: str, model_id: str) -> str:
+    """モデルIDに対応するジオメトリストアのパス"""
+    return os.path.join(store_dir, f"{model_id}.geom")
+
+
+def _space_mesh(space: Space) -> Optional[Mesh]:
+    """共有メッシュを持たないスペースのワールド座標のメッシュ"""
+    geometry = space.geometry
+    if geometry is None or len(geometry.vertices) == 0:
+        return None
+    vertices = np.asarray(geometry.vertices, dtype=np.float32).reshape(-1, 3)
+    indices = np.asarray(geometry.indices or [], dtype=np.uint32)
+    return vertices, indices
+
+
+def write_geometry_store(spaces: List[Space], path: str, meshes: Optional[Dict[str, Mesh]] = None) -> int:
+    """
+    スペースのジオメトリをバイナリファイルに書き出す
+
+    Args:
+        spaces: スペース一覧
+        path: 出力先パス
+        meshes: 共有メッシュ（メッシュID → (頂点, インデックス)）。geometry.meshId で参照される
+
+    Returns:
+        書き出したファイルサイズ (bytes)
+    """
+    meshes = meshes or {}
+    space_ids: List[str] = []
+    mesh_ids: List[str] = []
+    mesh_rows: Dict[str, int] = {}
+    vertex_chunks: List[np.ndarray] = []
+    index_chunks: List[np.ndarray] = []
+    mesh_table: List[Tuple[int, int, int, int]] = []
+    instances: List[Tuple[int, np.ndarray]] = []
+    vertex_total = 0
+    index_total = 0
+
+    def add_mesh(mesh_id: str, mesh: Mesh) -> int:
+        nonlocal vertex_total, index_total
+        vertices, indices = mesh
+        vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+        indices = np.asarray(indices, dtype=np.uint32)
+        mesh_rows[mesh_id] = len(mesh_ids)
+        mesh_ids.append(mesh_id)
+        mesh_table.append((vertex_total, len(vertices), index_total, len(indices)))
+        vertex_chunks.append(vertices)
+        index_chunks.append(indices)
+        vertex_total += len(vertices)
+        index_total += len(indices)
+        return mesh_rows[mesh_id]
+
+    for space in spaces:
+        geometry = space.geometry
+        space_ids.append(space.id)
+        if geometry is not None and geometry.meshId in meshes and geometry.transform:
+            row = mesh_rows.get(geometry.meshId)
+            if row is None:
+                row = add_mesh(geometry.meshId, meshes[geometry.meshId])
+            instances.append((row, np.asarray(geometry.transform, dtype=np.float64)))
+            continue
+        mesh = _space_mesh(space)
+        if mesh is None:
+            instances.append((NO_MESH, IDENTITY))
+        else:
+            instances.append((add_mesh(f"space:{space.id}", mesh), IDENTITY))
+
+    ids_bytes = json.dumps({"spaces": space_ids, "meshes": mesh_ids}, ensure_ascii=False).encode("utf-8")
+    instance_offset = HEADER_SIZE
+    mesh_table_offset = _align(instance_offset + INSTANCE_ENTRY_SIZE * len(instances))
+    vertex_pool_offset = _align(mesh_table_offset + TABLE_ENTRY_SIZE * len(mesh_table))
+    index_pool_offset = _align(vertex_pool_offset + vertex_total * VERTEX_STRIDE)
+    ids_offset = _align(index_pool_offset + index_total * INDEX_SIZE)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(struct.pack(
+            HEADER_FORMAT, STORE_MAGIC, STORE_VERSION, len(space_ids), len(mesh_ids), vertex_total, index_total,
+            mesh_table_offset, vertex_pool_offset, index_pool_offset, ids_offset, len(ids_bytes)
+        ))
+        for mesh_row, transform in instances:
+            f.write(struct.pack(INSTANCE_ENTRY_FORMAT, mesh_row, 0, *transform.ravel()))
+        f.write(b"\x00" * (mesh_table_offset - f.tell()))
+        for entry in mesh_table:
+            f.write(struct.pack(TABLE_ENTRY_FORMAT, *entry))
+        f.write(b"\x00" * (vertex_pool_offset - f.tell()))
+        for chunk in vertex_chunks:
+            f.write(chunk.tobytes())
+        f.write(b"\x00" * (index_pool_offset - f.tell()))
+        for chunk in index_chunks:
+            f.write(chunk.tobytes())
+        f.write(b"\x00" * (ids_offset - f.tell()))
+        f.write(ids_bytes)
+        size = f.tell()
+    os.replace(tmp_path, path)
+
+    logger.info(
+        f"ジオメトリストアを書き出しました: {path} ({size} bytes, {len(space_ids)} スペース, {len(mesh_ids)} メッシュ)"
+    )
+    return size
+
+
+class GeometryStore:
+    """メモリマップしたジオメトリストアの読み出し"""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: ジオメトリストアファイルのパス
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+        (magic, version, space_count, mesh_count, self.vertex_count, self.index_count,
+         self._mesh_table_offset, self._vertex_pool_offset, self._index_pool_offset,
+         ids_offset, ids_length) = struct.unpack_from(HEADER_FORMAT, self._mmap, 0)
+        if magic != STORE_MAGIC or version != STORE_VERSION:
+            self.close()
+            raise ValueError(f"ジオメトリストアの形式が不正です: {path}")
+
+        ids = json.loads(bytes(self._view[ids_offset:ids_offset + ids_length]).decode("utf-8"))
+        self._rows: Dict[str, int] = {space_id: row for row, space_id in enumerate(ids["spaces"])}
+        self.mesh_ids: List[str] = ids["meshes"]
+        self._mesh_rows: Dict[str, int] = {mesh_id: row for row, mesh_id in enumerate(self.mesh_ids)}
+        self.space_count = space_count
+        self.mesh_count = mesh_count
+
+    def __contains__(self, space_id: str) -> bool:
+        return space_id in self._rows
+
+    def get_instance(self, space_id: str) -> Optional[Tuple[Optional[str], np.ndarray]]:
+        """
+        スペースが参照するメッシュと変換行列
+
+        Returns:
+            (メッシュID（形状がない場合はNone）, 4×4変換行列)。スペースがない場合はNone
+        """
+        row = self._rows.get(space_id)
+        if row is None:
+            return None
+        return self._read_instance(row)
+
+    def _read_instance(self, row: int) -> Tuple[Optional[str], np.ndarray]:
+        entry = struct.unpack_from(INSTANCE_ENTRY_FORMAT, self._mmap, HEADER_SIZE + INSTANCE_ENTRY_SIZE * row)
+        mesh_row = entry[0]
+        transform = np.array(entry[2:], dtype=np.float64).reshape(4, 4)
+        return (self.mesh_ids[mesh_row] if mesh_row != NO_MESH else None), transform
+
+    def iter_instances(self) -> Iterator[Tuple[str, Optional[str], np.ndarray]]:
+        """すべてのスペースの (スペースID, メッシュID, 変換行列)"""
+        for space_id, row in self._rows.items():
+            mesh_id, transform = self._read_instance(row)
+            yield space_id, mesh_id, transform
+
+    def get_mesh_entry(self, mesh_id: str) -> Optional[Tuple[int, int, int, int]]:
+        """メッシュ表のエントリ (vertexStart, vertexCount, indexStart, indexCount)"""
+        row = self._mesh_rows.get(mesh_id)
+        if row is None:
+            return None
+        return struct.unpack_from(TABLE_ENTRY_FORMAT, self._mmap, self._mesh_table_offset + TABLE_ENTRY_SIZE * row)
+
+    def get_mesh_buffers(self, mesh_id: str) -> Optional[Tuple[memoryview, memoryview]]:
+        """
+        メッシュの頂点・インデックスのバイト列をコピーせずに取得
+
+        Returns:
+            (頂点バイト列, インデックスバイト列) のmemoryview。メッシュがない場合はNone
+        """
+        entry = self.get_mesh_entry(mesh_id)
+        if entry is None:
+            return None
+        vertex_start, vertex_count, index_start, index_count = entry
+        v_begin = self._vertex_pool_offset + vertex_start * VERTEX_STRIDE
+        i_begin = self._index_pool_offset + index_start * INDEX_SIZE
+        return (
+            self._view[v_begin:v_begin + vertex_count * VERTEX_STRIDE],
+            self._view[i_begin:i_begin + index_count * INDEX_SIZE],
+        )
+
+    def get_space_buffers(self, space_id: str) -> Optional[Tuple[memoryview, memoryview]]:
+        """
+        スペースのワールド座標の頂点・インデックスのバイト列を取得
+
+        単位行列で参照するメッシュはコピーせずに返し、共有メッシュは変換した頂点を返す
+
+        Returns:
+            (頂点バイト列, インデックスバイト列)。スペースがない場合はNone
+        """
+        instance = self.get_instance(space_id)
+        if instance is None:
+            return None
+        mesh_id, transform = instance
+        if mesh_id is None:
+            return memoryview(b""), memoryview(b"")
+        vertex_bytes, index_bytes = self.get_mesh_buffers(mesh_id)
+        if np.array_equal(transform, IDENTITY):
+            return vertex_bytes, index_bytes
+        vertices = np.frombuffer(vertex_bytes, dtype=np.float32).reshape(-1, 3).astype(np.float64)
+        world = (vertices @ transform[:3, :3].T + transform[:3, 3]).astype(np.float32)
+        return memoryview(world.tobytes()), index_bytes
+
+    def count_instances(self) -> Dict[str, int]:
+        """メッシュごとの参照しているスペース数"""
+        counts: Dict[str, int] = {}
+        for _, mesh_id, _ in self.iter_instances():
+            if mesh_id is not None:
+                counts[mesh_id] = counts.get(mesh_id, 0) + 1
+        return counts
+
+    def close(self) -> None:
+        """mmapを解放"""
+        try:
+            self._view.release()
+        except (AttributeError, BufferError):
+            pass
+        try:
+            self._mmap.close()
+        except BufferError:
+            # 配信中のスライスが残っている場合はGCに任せる
+            logger.debug(f"使用中のためmmapを閉じられません: {self.path}")
+
+
+# プロセス内で開いているストア（パスをキーとする）
+_open_stores: Dict[str, GeometryStore] = {}
+_open_stores_lock = threading.Lock()
+
+
+def open_geometry_store(path: str) -> Optional[GeometryStore]:
+    """ジオメトリストアを開く（プロセス内で再利用）。ファイルがない場合はNone"""
+    with _open_stores_lock:
+        store = _open_stores.get(path)
+        if not os.path.exists(path):
+            # 他のワーカーで削除された場合はマッピングも破棄する
+            if store is not None:
+                _open_stores.pop(path)
+                store.close()
+            return None
+        if store is not None:
+            return store
+        store = GeometryStore(path)
+        _open_stores[path] = store
+        return store
+
+
+def remove_geometry_store(path: str) -> None:
+    """ジオメトリストアを閉じてファイルを削除"""
+    with _open_stores_lock:
+        store = _open_stores.pop(path, None)
+    if store is not None:
+        store.close()
+    if os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,309 @@
+"""
+glTFバイナリ（GLB）エクスポート
+モデル内のスペースを1つのGLBファイルに書き出す
+
+共有メッシュを参照するスペースは、glTFのメッシュを1つだけ作成してノードの変換行列で配置する
+"""
+from typing import List, Dict, Any, Optional, Tuple
+import json
+import logging
+import os
+import struct
+import tempfile
+import threading
+
+import numpy as np
+
+from app.models import Space
+
+logger = logging.getLogger(__name__)
+
+# キャッシュの世代とモデル・LODごとの出力ロックを保護するロック
+_cache_lock = threading.Lock()
+# モデルごとのキャッシュ世代（削除のたびに進め、削除前の内容で作成中のGLBを破棄する）
+_cache_generations: Dict[str, int] = {}
+# モデル・LODごとの出力ロック（同じGLBを同時に作成しない）
+_export_locks: Dict[Tuple[str, int], threading.Lock] = {}
+
+# 詳細度（LOD）
+LOD_FULL = 0  # IFCから取得したメッシュ
+LOD_BOX = 1  # バウンディングボックス
+SUPPORTED_LODS = (LOD_FULL, LOD_BOX)
+
+GLB_MAGIC = 0x46546C67  # "glTF"
+GLB_VERSION = 2
+CHUNK_JSON = 0x4E4F534A  # "JSON"
+CHUNK_BIN = 0x004E4942  # "BIN\0"
+
+# glTF定数
+COMPONENT_FLOAT = 5126
+COMPONENT_UNSIGNED_INT = 5125
+TARGET_ARRAY_BUFFER = 34962
+TARGET_ELEMENT_ARRAY_BUFFER = 34963
+MODE_TRIANGLES = 4
+
+# IFCのZ-up座標からglTFのY-up座標への変換
+IFC_TO_GLTF = np.array([
+    [1.0, 0.0, 0.0, 0.0],
+    [0.0, 0.0, 1.0, 0.0],
+    [0.0, -1.0, 0.0, 0.0],
+    [0.0, 0.0, 0.0, 1.0],
+])
+
+# 直方体の三角形インデックス（Geometry3Dのフォールバック形状と同じ頂点順）
+BOX_INDICES = np.array([
+    0, 1, 2, 0, 2, 3,
+    4, 6, 5, 4, 7, 6,
+    0, 5, 1, 0, 4, 5,
+    2, 7, 3, 2, 6, 7,
+    0, 7, 4, 0, 3, 7,
+    1, 6, 2, 1, 5, 6,
+], dtype=np.uint32)
+
+
+def _to_gltf_axes(vertices: np.ndarray) -> np.ndarray:
+    """IFCのZ-up座標をglTFのY-up座標に変換"""
+    return np.column_stack((vertices[:, 0], vertices[:, 2], -vertices[:, 1])).astype(np.float32)
+
+
+def _to_gltf_matrix(transform: List[float]) -> List[float]:
+    """IFC座標系の変換行列（4×4、行優先）をglTFのノード行列（列優先）に変換"""
+    matrix = IFC_TO_GLTF @ np.asarray(transform, dtype=np.float64).reshape(4, 4) @ IFC_TO_GLTF.T
+    return matrix.ravel(order="F").tolist()
+
+
+def _box_mesh(space: Space) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """バウンディングボックスから直方体メッシュを作成"""
+    if space.geometry is None or space.geometry.boundingBox is None:
+        return None
+    lo = space.geometry.boundingBox.min
+    hi = space.geometry.boundingBox.max
+    vertices = np.array([
+        [lo.x, lo.y, lo.z], [hi.x, lo.y, lo.z], [hi.x, hi.y, lo.z], [lo.x, hi.y, lo.z],
+        [lo.x, lo.y, hi.z], [hi.x, lo.y, hi.z], [hi.x, hi.y, hi.z], [lo.x, hi.y, hi.z],
+    ], dtype=np.float64)
+    return vertices, BOX_INDICES
+
+
+def _full_mesh(space: Space) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """スペースのメッシュを配列として取得"""
+    geometry = space.geometry
+    if geometry is None or len(geometry.vertices) < 3:
+        return _box_mesh(space)
+
+    vertices = np.asarray(geometry.vertices, dtype=np.float64).reshape(-1, 3)
+    if geometry.indices:
+        indices = np.asarray(geometry.indices, dtype=np.uint32)
+    elif len(vertices) % 3 == 0:
+        # インデックスがない場合は頂点列を三角形リストとして扱う
+        indices = np.arange(len(vertices), dtype=np.uint32)
+    else:
+        return _box_mesh(space)
+    return vertices, indices
+
+
+def build_glb(
+    spaces: List[Space],
+    lod: int = LOD_FULL,
+    meshes: Optional[Dict[str, Tuple[np.ndarray, np.ndarray]]] = None
+) -> bytes:
+    """
+    スペース一覧からGLBバイナリを作成
+
+    すべての頂点とインデックスは共有の1バッファに格納し、
+    スペースごとに1ノード（extrasにスペースID）を作成する
+
+    Args:
+        spaces: スペース一覧
+        lod: 詳細度（0: メッシュ, 1: バウンディングボックス）
+        meshes: 共有メッシュ（メッシュID → (頂点, インデックス)）。LOD0で geometry.meshId のあるスペースに使う
+
+    Returns:
+        GLBバイナリ
+    """
+    if lod not in SUPPORTED_LODS:
+        raise ValueError(f"未対応のLODです: {lod}")
+
+    mesh_source = _full_mesh if lod == LOD_FULL else _box_mesh
+    shared_meshes = meshes if lod == LOD_FULL and meshes else {}
+
+    position_chunks: List[np.ndarray] = []
+    index_chunks: List[np.ndarray] = []
+    accessors: List[Dict[str, Any]] = []
+    gltf_meshes: List[Dict[str, Any]] = []
+    nodes: List[Dict[str, Any]] = []
+    # 共有メッシュID → glTFのメッシュ番号
+    shared_indices: Dict[str, int] = {}
+    position_offset = 0
+    index_offset = 0
+
+    def add_mesh(name: str, vertices: np.ndarray, indices: np.ndarray) -> int:
+        nonlocal position_offset, index_offset
+        positions = _to_gltf_axes(np.asarray(vertices, dtype=np.float64).reshape(-1, 3))
+        indices = np.asarray(indices, dtype=np.uint32)
+
+        position_accessor = len(accessors)
+        accessors.append({
+            "bufferView": 0,
+            "byteOffset": position_offset,
+            "componentType": COMPONENT_FLOAT,
+            "count": len(positions),
+            "type": "VEC3",
+            "min": positions.min(axis=0).tolist(),
+            "max": positions.max(axis=0).tolist(),
+        })
+        accessors.append({
+            "bufferView": 1,
+            "byteOffset": index_offset,
+            "componentType": COMPONENT_UNSIGNED_INT,
+            "count": len(indices),
+            "type": "SCALAR",
+        })
+        gltf_meshes.append({
+            "name": name,
+            "primitives": [{
+                "attributes": {"POSITION": position_accessor},
+                "indices": position_accessor + 1,
+                "mode": MODE_TRIANGLES,
+            }],
+        })
+
+        position_chunks.append(positions)
+        index_chunks.append(indices)
+        position_offset += positions.nbytes
+        index_offset += indices.nbytes
+        return len(gltf_meshes) - 1
+
+    for space in spaces:
+        node: Dict[str, Any] = {"name": space.name}
+        geometry = space.geometry
+        if geometry is not None and geometry.meshId in shared_meshes and geometry.transform:
+            mesh_index = shared_indices.get(geometry.meshId)
+            if mesh_index is None:
+                mesh_index = add_mesh(geometry.meshId, *shared_meshes[geometry.meshId])
+                shared_indices[geometry.meshId] = mesh_index
+            node["mesh"] = mesh_index
+            node["matrix"] = _to_gltf_matrix(geometry.transform)
+        else:
+            mesh = mesh_source(space)
+            if mesh is None:
+                continue
+            node["mesh"] = add_mesh(space.name, *mesh)
+        node["extras"] = {
+            "spaceId": space.id,
+            "globalId": space.globalId,
+            "floorLevel": space.floorLevel,
+        }
+        nodes.append(node)
+
+    position_bytes = b"".join(chunk.tobytes() for chunk in position_chunks)
+    index_bytes = b"".join(chunk.tobytes() for chunk in index_chunks)
+    binary = position_bytes + index_bytes
+    binary += b"\x00" * (-len(binary) % 4)
+
+    document: Dict[str, Any] = {
+        "asset": {"version": "2.0", "generator": "IFC MEP Design Tool"},
+        "scene": 0,
+        "scenes": [{"nodes": list(range(len(nodes)))}],
+        "nodes": nodes,
+        "meshes": gltf_meshes,
+        "accessors": accessors,
+        "bufferViews": [
+            {
+                "buffer": 0,
+                "byteOffset": 0,
+                "byteLength": len(position_bytes),
+                "byteStride": 12,
+                "target": TARGET_ARRAY_BUFFER,
+            },
+            {
+                "buffer": 0,
+                "byteOffset": len(position_bytes),
+                "byteLength": len(index_bytes),
+                "target": TARGET_ELEMENT_ARRAY_BUFFER,
+            },
+        ],
+        "buffers": [{"byteLength": len(binary)}],
+    }
+    if not nodes:
+        # 空のモデルでも有効なglTFとなるようにする
+        for key in ("nodes", "meshes", "accessors", "bufferViews", "buffers"):
+            document.pop(key)
+        document["scenes"] = [{"nodes": []}]
+        binary = b""
+
+    json_bytes = json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    json_bytes += b" " * (-len(json_bytes) % 4)
+
+    chunks = struct.pack("<II", len(json_bytes), CHUNK_JSON) + json_bytes
+    if binary:
+        chunks += struct.pack("<II", len(binary), CHUNK_BIN) + binary
+    header = struct.pack("<III", GLB_MAGIC, GLB_VERSION, 12 + len(chunks))
+    return header + chunks
+
+
+def get_glb_cache_path(cache_dir: str, model_id: str, lod: int) -> str:
+    """モデルIDとLODに対応するGLBキャッシュのパス"""
+    return os.path.join(cache_dir, f"{model_id}_lod{lod}.glb")
+
+
+def export_glb(
+    spaces: List[Space],
+    cache_dir: str,
+    model_id: str,
+    lod: int = LOD_FULL,
+    meshes: Optional[Dict[str, Tuple[np.ndarray, np.ndarray]]] = None
+) -> str:
+    """
+    GLBファイルを作成してキャッシュに保存（作成済みの場合はそのまま返す）
+
+    Returns:
+        GLBファイルのパス
+    """
+    path = get_glb_cache_path(cache_dir, model_id, lod)
+    with _cache_lock:
+        export_lock = _export_locks.setdefault((model_id, lod), threading.Lock())
+
+    with export_lock:
+        # 待っている間に別のリクエストが作成していればそれを返す
+        while not os.path.exists(path):
+            with _cache_lock:
+                generation = _cache_generations.get(model_id, 0)
+
+            os.makedirs(cache_dir, exist_ok=True)
+            data = build_glb(list(spaces), lod, meshes)
+
+            # 書き込み途中のファイルが配信されないよう一時ファイルから置き換える
+            with tempfile.NamedTemporaryFile(dir=cache_dir, suffix=".tmp", delete=False) as f:
+                f.write(data)
+
+            # 作成中にキャッシュが削除された（スペースが変更された）場合は作り直す
+            with _cache_lock:
+                if _cache_generations.get(model_id, 0) == generation:
+                    os.replace(f.name, path)
+                    logger.info(f"GLBファイルを作成しました: {path} ({len(data)} bytes, LOD{lod})")
+                    break
+            os.remove(f.name)
+            logger.info(f"作成中にスペースが変更されたためGLBファイルを作り直します: {path}")
+
+    return path
+
+
+def remove_glb_cache(cache_dir: str, model_id: str, forget: bool = False) -> None:
+    """
+    モデルのGLBキャッシュを削除（作成中のGLBはキャッシュに保存されない）
+
+    Args:
+        forget: モデル自体を削除する場合にTrue（世代・ロックの管理情報も破棄）
+    """
+    with _cache_lock:
+        if forget:
+            _cache_generations.pop(model_id, None)
+            for lod in SUPPORTED_LODS:
+                _export_locks.pop((model_id, lod), None)
+        else:
+            _cache_generations[model_id] = _cache_generations.get(model_id, 0) + 1
+        for lod in SUPPORTED_LODS:
+            path = get_glb_cache_path(cache_dir, model_id, lod)
+            if os.path.exists(path):
+                os.remove(path)
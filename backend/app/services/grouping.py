@@ -0,0 +1,344 @@
+"""
+スペースのグループ（階・用途・ゾーン・空調系統）と集計値の管理
+グループごとに床面積・容積・在室人数・必要換気量の合計を保持し、
+スペースの入力値・計算結果・所属が変わったときは差分だけを反映する（一覧の取得時に再集計しない）
+
+- 階・用途のグループはスペースの階レベル・用途から自動で作成する
+- ゾーン・空調系統はユーザーが作成し、親グループ（例: ゾーン → 空調系統）を持てる
+- スペースは種類ごとに1つのグループに直接所属し、その祖先のグループにも集計される
+  （同じグループに複数の経路で含まれる場合も1回だけ数える）
+"""
+from typing import Dict, List, Optional, Tuple, Iterable, Set, FrozenSet
+import threading
+import uuid
+
+from app.models import Space, VentilationCalculationResult
+from app.models.group import GroupKind, GroupTotals, SpaceGroup
+
+# 階・用途が未設定のスペースをまとめるグループのキー
+UNASSIGNED_KEY = "_unassigned"
+UNASSIGNED_NAME = "未設定"
+
+AUTO_KINDS = (GroupKind.STOREY, GroupKind.USAGE)
+USER_KINDS = (GroupKind.ZONE, GroupKind.SYSTEM)
+
+# 集計値の並び（GroupTotalsのフィールド順）
+TOTAL_FIELDS = ("spaceCount", "area", "volume", "occupancy", "requiredVentilation", "calculatedSpaceCount")
+_INTEGER_FIELDS = {"spaceCount", "occupancy", "calculatedSpaceCount"}
+
+Values = Tuple[float, float, float, float, float, float]
+
+
+def _space_values(space: Space, result: Optional[VentilationCalculationResult]) -> Values:
+    """スペース1件分の集計値"""
+    return (
+        1.0,
+        space.area or 0.0,
+        space.volume or 0.0,
+        float(space.occupancy or 0),
+        result.requiredVentilation if result is not None else 0.0,
+        1.0 if result is not None else 0.0,
+    )
+
+
+class _Group:
+    """グループの内部表現"""
+    __slots__ = ("id", "kind", "name", "parent_id", "child_ids", "space_ids", "totals")
+
+    def __init__(self, group_id: str, kind: GroupKind, name: str, parent_id: Optional[str] = None):
+        self.id = group_id
+        self.kind = kind
+        self.name = name
+        self.parent_id = parent_id
+        # 所属の順（追加順）を保つため dict のキーで保持する（参照時に並べ替えない）
+        self.child_ids: Dict[str, None] = {}
+        self.space_ids: Dict[str, None] = {}
+        self.totals = [0.0] * len(TOTAL_FIELDS)
+
+
+def _to_totals(values: List[float]) -> GroupTotals:
+    return GroupTotals(**{
+        name: int(round(value)) if name in _INTEGER_FIELDS else value
+        for name, value in zip(TOTAL_FIELDS, values)
+    })
+
+
+class GroupIndex:
+    """モデルごとのグループと集計値（スレッドセーフ）"""
+
+    def __init__(self, spaces: Iterable[Space], results: Optional[Dict[str, VentilationCalculationResult]] = None):
+        """
+        Args:
+            spaces: モデルのスペース
+            results: 保存済みの計算結果（スペースID → 結果）
+        """
+        self._groups: Dict[str, _Group] = {}
+        # スペースID → 種類 → 直接所属するグループID
+        self._membership: Dict[str, Dict[GroupKind, str]] = {}
+        # スペースID → 集計値 / 集計先のグループID（直接所属するグループとその祖先）
+        self._values: Dict[str, Values] = {}
+        self._covered: Dict[str, FrozenSet[str]] = {}
+        self._model_totals = [0.0] * len(TOTAL_FIELDS)
+        self._lock = threading.RLock()
+
+        results = results or {}
+        for space in spaces:
+            self._add_space(space, results.get(space.id))
+
+    # ---- 内部処理 ----
+
+    def _apply(self, group_ids: Iterable[str], values: Values, sign: float) -> None:
+        for group_id in group_ids:
+            totals = self._groups[group_id].totals
+            for i, value in enumerate(values):
+                totals[i] += sign * value
+
+    def _ancestors(self, group_id: str) -> List[str]:
+        """グループ自身と祖先のID"""
+        chain = []
+        while group_id is not None:
+            chain.append(group_id)
+            group_id = self._groups[group_id].parent_id
+        return chain
+
+    def _compute_covered(self, space_id: str) -> FrozenSet[str]:
+        covered: Set[str] = set()
+        for group_id in self._membership[space_id].values():
+            covered.update(self._ancestors(group_id))
+        return frozenset(covered)
+
+    def _refresh_covered(self, space_id: str) -> None:
+        """所属の変更後に集計先を求め直し、外れたグループから引いて加わったグループに足す"""
+        old = self._covered.get(space_id, frozenset())
+        new = self._compute_covered(space_id)
+        values = self._values[space_id]
+        self._apply(old - new, values, -1.0)
+        self._apply(new - old, values, 1.0)
+        self._covered[space_id] = new
+
+    def _auto_group_id(self, kind: GroupKind, key: Optional[str]) -> str:
+        """階・用途のグループID（なければ作成）"""
+        group_id = f"{kind.value}:{key or UNASSIGNED_KEY}"
+        if group_id not in self._groups:
+            self._groups[group_id] = _Group(group_id, kind, key or UNASSIGNED_NAME)
+        return group_id
+
+    def _set_direct_group(self, space_id: str, kind: GroupKind, group_id: Optional[str]) -> None:
+        """スペースが直接所属するグループを置き換える（集計先の更新は呼び出し元で行う）"""
+        membership = self._membership[space_id]
+        previous = membership.pop(kind, None)
+        if previous is not None:
+            self._groups[previous].space_ids.pop(space_id, None)
+        if group_id is not None:
+            membership[kind] = group_id
+            self._groups[group_id].space_ids[space_id] = None
+
+    def _remove_if_empty(self, group_id: Optional[str]) -> None:
+        """スペースがなくなった自動作成のグループを削除"""
+        group = self._groups.get(group_id) if group_id else None
+        if group is not None and group.kind in AUTO_KINDS and not group.space_ids:
+            del self._groups[group_id]
+
+    def _add_space(self, space: Space, result: Optional[VentilationCalculationResult]) -> None:
+        self._membership[space.id] = {}
+        self._values[space.id] = _space_values(space, result)
+        self._set_direct_group(space.id, GroupKind.STOREY, self._auto_group_id(GroupKind.STOREY, space.floorLevel))
+        self._set_direct_group(space.id, GroupKind.USAGE, self._auto_group_id(GroupKind.USAGE, space.usage))
+        self._refresh_covered(space.id)
+        for i, value in enumerate(self._values[space.id]):
+            self._model_totals[i] += value
+
+    def _set_values(self, space_id: str, values: Values) -> None:
+        """スペースの集計値を置き換え、差分を集計先とモデル全体に反映"""
+        old = self._values[space_id]
+        if old == values:
+            return
+        delta = tuple(new - prev for new, prev in zip(values, old))
+        self._apply(self._covered[space_id], delta, 1.0)
+        for i, value in enumerate(delta):
+            self._model_totals[i] += value
+        self._values[space_id] = values
+
+    def _get_user_group(self, group_id: str) -> _Group:
+        group = self._groups.get(group_id)
+        if group is None:
+            raise KeyError(f"グループが見つかりません: {group_id}")
+        if group.kind not in USER_KINDS:
+            raise ValueError(f"階・用途のグループは変更できません: {group_id}")
+        return group
+
+    def _check_spaces(self, space_ids: Iterable[str]) -> None:
+        unknown = [space_id for space_id in space_ids if space_id not in self._membership]
+        if unknown:
+            raise ValueError(f"スペースが見つかりません: {', '.join(unknown[:10])}")
+
+    def _subtree_spaces(self, group_id: str) -> Set[str]:
+        """グループとその子孫に直接所属するスペース"""
+        spaces: Set[str] = set()
+        stack = [group_id]
+        while stack:
+            group = self._groups[stack.pop()]
+            spaces.update(group.space_ids)
+            stack.extend(group.child_ids)
+        return spaces
+
+    def _set_parent(self, group: _Group, parent_id: Optional[str]) -> None:
+        if parent_id == group.parent_id:
+            return
+        if parent_id is not None:
+            parent = self._get_user_group(parent_id)
+            if group.id in self._ancestors(parent.id):
+                raise ValueError("グループの親子関係が循環します")
+        if group.parent_id is not None:
+            self._groups[group.parent_id].child_ids.pop(group.id, None)
+        group.parent_id = parent_id
+        if parent_id is not None:
+            self._groups[parent_id].child_ids[group.id] = None
+        # 配下のスペースだけ集計先を求め直す
+        for space_id in self._subtree_spaces(group.id):
+            self._refresh_covered(space_id)
+
+    def _to_model(self, group: _Group, include_spaces: bool = True) -> SpaceGroup:
+        """
+        レスポンス用のグループ（所属スペースは追加順。include_spaces=False の場合は含めない）
+
+        集計値だけを返す場合はグループの大きさによらず一定の処理量になる
+        """
+        return SpaceGroup(
+            id=group.id,
+            kind=group.kind,
+            name=group.name,
+            parentId=group.parent_id,
+            childIds=list(group.child_ids),
+            spaceIds=list(group.space_ids) if include_spaces else None,
+            totals=_to_totals(group.totals)
+        )
+
+    # ---- スペース・計算結果の変更 ----
+
+    def update_space(self, space: Space, result: Optional[VentilationCalculationResult]) -> None:
+        """スペースの入力値（面積・階・用途など）と計算結果の変更を反映"""
+        with self._lock:
+            membership = self._membership[space.id]
+            for kind, key in ((GroupKind.STOREY, space.floorLevel), (GroupKind.USAGE, space.usage)):
+                group_id = self._auto_group_id(kind, key)
+                previous = membership.get(kind)
+                if previous != group_id:
+                    self._set_direct_group(space.id, kind, group_id)
+                    self._refresh_covered(space.id)
+                    self._remove_if_empty(previous)
+            self._set_values(space.id, _space_values(space, result))
+
+    def set_results(self, results: Iterable[VentilationCalculationResult]) -> None:
+        """計算結果の保存を反映（モデルにないスペースの結果は無視する）"""
+        with self._lock:
+            for result in results:
+                old = self._values.get(result.spaceId)
+                if old is not None:
+                    self._set_values(result.spaceId, old[:4] + (result.requiredVentilation, 1.0))
+
+    # ---- ユーザー定義グループ ----
+
+    def create_group(
+        self,
+        kind: GroupKind,
+        name: str,
+        parent_id: Optional[str] = None,
+        space_ids: Iterable[str] = ()
+    ) -> SpaceGroup:
+        """
+        ゾーン・空調系統を作成
+
+        Raises:
+            ValueError: 種類・親グループ・スペースの指定が正しくない場合
+        """
+        with self._lock:
+            if kind not in USER_KINDS:
+                raise ValueError(f"作成できるのはゾーン・空調系統のみです: {kind.value}")
+            space_ids = list(space_ids)
+            self._check_spaces(space_ids)
+            if parent_id is not None:
+                self._get_user_group(parent_id)
+            group = _Group(f"{kind.value}-{uuid.uuid4().hex[:8]}", kind, name)
+            self._groups[group.id] = group
+            self._set_parent(group, parent_id)
+            self._assign(group, space_ids)
+            return self._to_model(group)
+
+    def update_group(self, group_id: str, name: Optional[str] = None, parent_id: Optional[str] = None,
+                     set_parent: bool = False) -> SpaceGroup:
+        """
+        グループ名・親グループを変更
+
+        Args:
+            set_parent: parent_idを反映する（Noneで親なしにする場合に区別するため）
+        """
+        with self._lock:
+            group = self._get_user_group(group_id)
+            if name is not None:
+                group.name = name
+            if set_parent:
+                self._set_parent(group, parent_id)
+            return self._to_model(group)
+
+    def delete_group(self, group_id: str) -> None:
+        """グループを削除（子グループは削除したグループの親に付け替える）"""
+        with self._lock:
+            group = self._get_user_group(group_id)
+            for child_id in list(group.child_ids):
+                self._set_parent(self._groups[child_id], group.parent_id)
+            self._unassign(group, list(group.space_ids))
+            self._set_parent(group, None)
+            del self._groups[group_id]
+
+    def _assign(self, group: _Group, space_ids: Iterable[str]) -> None:
+        for space_id in space_ids:
+            if self._membership[space_id].get(group.kind) == group.id:
+                continue
+            self._set_direct_group(space_id, group.kind, group.id)
+            self._refresh_covered(space_id)
+
+    def _unassign(self, group: _Group, space_ids: Iterable[str]) -> None:
+        for space_id in space_ids:
+            if self._membership.get(space_id, {}).get(group.kind) != group.id:
+                continue
+            self._set_direct_group(space_id, group.kind, None)
+            self._refresh_covered(space_id)
+
+    def update_members(self, group_id: str, add: Iterable[str] = (), remove: Iterable[str] = ()) -> SpaceGroup:
+        """
+        グループにスペースを追加・削除
+
+        追加したスペースが同じ種類の別のグループに所属していた場合はそちらから外れる
+        """
+        with self._lock:
+            group = self._get_user_group(group_id)
+            add = list(add)
+            self._check_spaces(add)
+            self._unassign(group, remove)
+            self._assign(group, add)
+            return self._to_model(group)
+
+    # ---- 参照（集計値は保持している値をそのまま返す） ----
+
+    def get_group(self, group_id: str, include_spaces: bool = True) -> Optional[SpaceGroup]:
+        with self._lock:
+            group = self._groups.get(group_id)
+            return self._to_model(group, include_spaces) if group is not None else None
+
+    def list_groups(self, kind: Optional[GroupKind] = None, include_spaces: bool = False) -> List[SpaceGroup]:
+        """グループ一覧（種類・名前順。所属スペースは include_spaces=True の場合のみ含める）"""
+        with self._lock:
+            kind_order = {k: i for i, k in enumerate(GroupKind)}
+            groups = [g for g in self._groups.values() if kind is None or g.kind == kind]
+            groups.sort(key=lambda g: (kind_order[g.kind], g.name, g.id))
+            return [self._to_model(g, include_spaces) for g in groups]
+
+    def get_covering_group_ids(self, space_id: str) -> FrozenSet[str]:
+        """スペースが集計されるグループ（直接所属するグループとその祖先）のID"""
+        with self._lock:
+            return self._covered.get(space_id, frozenset())
+
+    def get_model_totals(self) -> GroupTotals:
+        with self._lock:
+            return _to_totals(self._model_totals)
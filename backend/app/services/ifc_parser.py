@@ -1,24 +1,77 @@
 import ifcopenshell
 import ifcopenshell.geom
 import ifcopenshell.util.element
+import ifcopenshell.util.placement
+import ifcopenshell.util.shape
 import ifcopenshell.util.unit
-from typing import List, Dict, Any, Optional, Tuple
-from app.models import Space, Point3D, Geometry3D, BoundingBox
+import hashlib
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple, Iterator, FrozenSet
+from app.models import Space, Point3D, Geometry3D, BoundingBox, FloorPlan, Equipment
+from app.services.footprint import build_floor_plans
+from app.services.spatial import link_equipment_to_spaces
+from app.services.metrics import span, increment
+from app.services.property_profile import PropertyProfile
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 解析結果の形式のバージョン（出力内容が変わる変更を行った場合に更新する）
+PARSE_VERSION = "3"
+
+# 同じ種類の警告をファイルごとにログ出力する上限（以降は件数のみ集計する）
+WARNING_LOG_LIMIT = 5
+
+# 同じメッシュと判定するときの座標の丸め桁数（m単位で小数点以下5桁 = 0.01mm）
+MESH_HASH_DECIMALS = 5
+
+# スペース形状の取得結果（shape / instance / fallback）の件数
+GEOMETRY_METRIC = "ifc_mep_space_geometry_total"
+# 解析中の警告の件数
+WARNING_METRIC = "ifc_mep_parse_warnings_total"
+
 
 class IFCParserService:
     """IFCファイルを解析し、必要な情報を抽出するサービス"""
     
-    def __init__(self, ifc_file_path: str):
+    # 抽出対象の設備機器・器具クラス（サブタイプを含む）
+    EQUIPMENT_CLASSES = (
+        "IfcFlowTerminal",
+        "IfcEnergyConversionDevice",
+        "IfcFlowMovingDevice",
+        "IfcFlowController",
+        "IfcFlowTreatmentDevice",
+        "IfcFlowStorageDevice",
+    )
+    
+    # 数量情報として読み取るプロパティ名（先にあるものを優先）
+    AREA_KEYS = ("NetFloorArea", "GrossFloorArea", "Area")
+    VOLUME_KEYS = ("NetVolume", "GrossVolume", "Volume")
+    HEIGHT_KEYS = ("Height", "FinishCeilingHeight")
+    OCCUPANCY_KEY = "Occupancy"
+    # プロファイルによらずスペースから読み込むプロパティ
+    SPACE_REQUIRED_KEYS = frozenset(AREA_KEYS + VOLUME_KEYS + HEIGHT_KEYS + (OCCUPANCY_KEY,))
+    
+    def __init__(self, ifc_file_path: str, property_profile: Optional[PropertyProfile] = None):
         """
         Args:
             ifc_file_path: IFCファイルのパス
+            property_profile: 保持するプロパティの指定（省略時はすべて）
         """
-        self.ifc_file = ifcopenshell.open(ifc_file_path)
+        with span("ifc.open"):
+            self.ifc_file = ifcopenshell.open(ifc_file_path)
         self.length_unit = self._get_length_unit()
+        self.property_profile = property_profile or PropertyProfile(include_all=True)
+        # 種類ごとの警告件数・形状の取得結果の件数
+        self._warning_counts: Dict[str, int] = {}
+        self._geometry_counts: Dict[str, int] = {}
+        # 形状はローカル座標で作成し、同じメッシュはスペース間で共有する
+        self._geom_settings = ifcopenshell.geom.settings()
+        # メッシュID → (頂点（バウンディングボックスの最小点が原点）, インデックス)
+        self.meshes: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._mesh_ids: Dict[bytes, str] = {}
+        # IfcMappedItemのキー → (メッシュID, 移動量)
+        self._mapped_meshes: Dict[Tuple, Tuple[str, np.ndarray]] = {}
         
     def _get_length_unit(self) -> float:
         """長さ単位を取得（メートルへの変換係数を返す）"""
@@ -50,20 +103,43 @@ class IFCParserService:
     
     def get_all_spaces(self) -> List[Space]:
         """すべてのスペース（IfcSpace）を取得"""
-        ifc_spaces = self.ifc_file.by_type("IfcSpace")
-        spaces = []
-        
-        for ifc_space in ifc_spaces:
+        spaces = list(self.iter_spaces())
+        logger.info(f"合計 {len(spaces)} 個のスペースを抽出しました")
+        return spaces
+    
+    def iter_spaces(self) -> Iterator[Space]:
+        """スペース（IfcSpace）を解析できたものから順に返す"""
+        for ifc_space in self.ifc_file.by_type("IfcSpace"):
             try:
                 space = self._parse_space(ifc_space)
                 if space:
-                    spaces.append(space)
+                    yield space
             except Exception as e:
                 logger.error(f"スペース {ifc_space.id()} の解析エラー: {e}")
                 continue
-        
-        logger.info(f"合計 {len(spaces)} 個のスペースを抽出しました")
-        return spaces
+        self._log_parse_summary()
+    
+    def _warn_sampled(self, kind: str, message: str) -> None:
+        """警告を種類ごとに件数を集計し、最初の数件のみログに出力"""
+        count = self._warning_counts.get(kind, 0) + 1
+        self._warning_counts[kind] = count
+        increment(WARNING_METRIC, {"kind": kind}, description="IFC解析中の警告の件数")
+        if count <= WARNING_LOG_LIMIT:
+            logger.warning(message)
+            if count == WARNING_LOG_LIMIT:
+                logger.warning(f"警告「{kind}」が{WARNING_LOG_LIMIT}件に達したため、以降は件数のみ集計します")
+    
+    def _count_geometry(self, source: str) -> None:
+        self._geometry_counts[source] = self._geometry_counts.get(source, 0) + 1
+        increment(GEOMETRY_METRIC, {"source": source}, description="スペース形状の取得結果の件数")
+    
+    def _log_parse_summary(self) -> None:
+        """スペース解析の集計結果をログに出力"""
+        geometry = ", ".join(f"{k}={v}" for k, v in sorted(self._geometry_counts.items())) or "なし"
+        logger.info(f"スペース形状の取得結果: {geometry}（メッシュ {len(self.meshes)} 種類）")
+        for kind, count in sorted(self._warning_counts.items()):
+            if count > WARNING_LOG_LIMIT:
+                logger.warning(f"警告「{kind}」: 合計 {count} 件（{count - WARNING_LOG_LIMIT} 件はログ出力を省略）")
     
     def get_space_by_id(self, space_id: str) -> Optional[Space]:
         """IDでスペースを取得"""
@@ -75,6 +151,7 @@ class IFCParserService:
             logger.error(f"スペース ID {space_id} の取得エラー: {e}")
         return None
     
+    @span("ifc.space")
     def _parse_space(self, ifc_space) -> Optional[Space]:
         """IfcSpaceエンティティをSpaceモデルに変換"""
         try:
@@ -85,8 +162,11 @@ class IFCParserService:
             long_name = getattr(ifc_space, "LongName", None)
             description = getattr(ifc_space, "Description", None)
             
+            # プロパティセット・数量セットの読み込み（数量・在室人数の取得にも使う）
+            psets = self._read_psets(ifc_space, self.SPACE_REQUIRED_KEYS)
+            
             # 数量情報の取得
-            area, volume, height = self._get_quantities(ifc_space)
+            area, volume, height = self._get_quantities(ifc_space, psets)
             
             # 位置情報
             location = self._get_location(ifc_space)
@@ -95,11 +175,13 @@ class IFCParserService:
             # 用途情報
             usage = self._get_object_type(ifc_space)
             
-            # プロパティセットから追加情報を取得
-            properties = self._get_property_sets(ifc_space)
+            # プロパティセットから追加情報を取得（プロファイルで指定したもののみ）
+            properties = self.property_profile.merge(psets)
             
             # 在室人数（プロパティから取得可能な場合）
-            occupancy = properties.get("Occupancy", None)
+            occupancy = next(
+                (props[self.OCCUPANCY_KEY] for props in psets.values() if self.OCCUPANCY_KEY in props), None
+            )
             if occupancy and isinstance(occupancy, (int, float)):
                 occupancy = int(occupancy)
             else:
@@ -128,23 +210,32 @@ class IFCParserService:
             logger.error(f"スペース解析エラー: {e}")
             return None
     
-    def _get_quantities(self, ifc_space) -> Tuple[Optional[float], Optional[float], Optional[float]]:
-        """数量情報（面積、容積、高さ）を取得"""
+    def _get_quantities(
+        self, ifc_space, psets: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> Tuple[Optional[float], Optional[float], Optional[float]]:
+        """
+        数量情報（面積、容積、高さ）を取得
+        
+        Args:
+            psets: 読み込み済みのプロパティセット（省略時は読み込む）
+        """
         area = None
         volume = None
         height = None
         
         try:
             # IfcElementQuantityから取得
-            for definition in ifcopenshell.util.element.get_psets(ifc_space).values():
+            if psets is None:
+                psets = self._read_psets(ifc_space, self.SPACE_REQUIRED_KEYS)
+            for definition in psets.values():
                 for key, value in definition.items():
-                    if key in ["NetFloorArea", "GrossFloorArea", "Area"]:
+                    if key in self.AREA_KEYS:
                         if area is None and isinstance(value, (int, float)):
                             area = float(value) * self.length_unit * self.length_unit
-                    elif key in ["NetVolume", "GrossVolume", "Volume"]:
+                    elif key in self.VOLUME_KEYS:
                         if volume is None and isinstance(value, (int, float)):
                             volume = float(value) * self.length_unit ** 3
-                    elif key in ["Height", "FinishCeilingHeight"]:
+                    elif key in self.HEIGHT_KEYS:
                         if height is None and isinstance(value, (int, float)):
                             height = float(value) * self.length_unit
             
@@ -205,77 +296,193 @@ class IFCParserService:
         return None
     
     def _get_property_sets(self, ifc_element) -> Dict[str, Any]:
-        """プロパティセットを取得"""
+        """プロパティセットを取得（プロファイルで指定したもののみ）"""
+        return self.property_profile.merge(self._read_psets(ifc_element))
+    
+    def _read_psets(self, ifc_element, required: FrozenSet[str] = frozenset()) -> Dict[str, Dict[str, Any]]:
+        """
+        プロパティセット・数量セットの値を読み込む
+        
+        ifcopenshell.util.element.get_psets と同じく型のプロパティセットを先に読み、インスタンスの値で上書きする。
+        プロファイルで保持しないプロパティは値を解決しない（requiredに含まれるものは保持しなくても読み込む）
+        
+        Returns:
+            プロパティセット名 → {プロパティ名: 値}
+        """
+        psets: Dict[str, Dict[str, Any]] = {}
         try:
-            psets = ifcopenshell.util.element.get_psets(ifc_element)
-            # すべてのプロパティセットを統合
-            all_props = {}
-            for pset_name, props in psets.items():
-                for key, value in props.items():
-                    if key not in all_props:
-                        all_props[key] = value
-            return all_props
+            with span("ifc.psets"):
+                definitions = []
+                element_type = ifcopenshell.util.element.get_type(ifc_element)
+                if element_type is not None:
+                    definitions.extend(getattr(element_type, "HasPropertySets", None) or [])
+                for rel in getattr(ifc_element, "IsDefinedBy", None) or []:
+                    if rel.is_a("IfcRelDefinesByProperties"):
+                        definitions.append(rel.RelatingPropertyDefinition)
+                
+                for definition in definitions:
+                    selected = self.property_profile.select(definition.Name)
+                    if selected is None:
+                        values = ifcopenshell.util.element.get_property_definition(definition)
+                    else:
+                        values = self._read_selected_properties(definition, selected | required)
+                    if values:
+                        psets.setdefault(definition.Name, {}).update(values)
         except Exception as e:
             logger.warning(f"プロパティセットの取得エラー: {e}")
+        return psets
+    
+    def _read_selected_properties(self, definition, names: FrozenSet[str]) -> Dict[str, Any]:
+        """プロパティセット・数量セットから指定した名前のプロパティだけ値を読み込む"""
+        if not names:
             return {}
+        if definition.is_a("IfcElementQuantity"):
+            return ifcopenshell.util.element.get_quantities(
+                [q for q in definition.Quantities or [] if q.Name in names]
+            )
+        if definition.is_a("IfcPropertySet"):
+            return ifcopenshell.util.element.get_properties(
+                [p for p in definition.HasProperties or [] if p.Name in names]
+            )
+        # 定義済みプロパティセットなど（プロパティが属性として定義されている）
+        values = ifcopenshell.util.element.get_property_definition(definition) or {}
+        return {key: value for key, value in values.items() if key in names}
     
     def _get_simple_geometry(self, ifc_space) -> Optional[Geometry3D]:
-        """簡易的なジオメトリ情報を取得（バウンディングボックス）"""
+        """
+        スペースの形状を取得
+        
+        形状はローカル座標で作成し、同じ形状のスペースはメッシュを共有する（meshId・transformを設定）。
+        Body形状が同じ IfcRepresentationMap を同じ変換で参照するスペースは、2件目以降は形状を作成せず配置だけ求める
+        """
         try:
-            settings = ifcopenshell.geom.settings()
-            settings.set(settings.USE_WORLD_COORDS, True)
+            map_key = self._get_mapped_key(ifc_space)
+            mapped = self._mapped_meshes.get(map_key) if map_key is not None else None
+            if mapped is not None:
+                mesh_id, offset = mapped
+                matrix = self._get_placement_matrix(ifc_space)
+                self._count_geometry("instance")
+            else:
+                # 一部の環境でifcopenshell.geomが使えない場合があるため、try-except
+                try:
+                    with span("ifc.create_shape"):
+                        shape = ifcopenshell.geom.create_shape(self._geom_settings, ifc_space)
+                except Exception as geom_error:
+                    self._warn_sampled(
+                        "create_shape",
+                        f"スペース {ifc_space.id()} のジオメトリ作成失敗 (ifcopenshell.geom): {geom_error}"
+                    )
+                    return self._create_fallback_geometry(ifc_space)
 
-            # 一部の環境でifcopenshell.geomが使えない場合があるため、try-except
-            try:
-                shape = ifcopenshell.geom.create_shape(settings, ifc_space)
-            except Exception as geom_error:
-                logger.warning(f"スペース {ifc_space.id()} のジオメトリ作成失敗 (ifcopenshell.geom): {geom_error}")
-                return self._create_fallback_geometry(ifc_space)
-
-            raw_vertices = getattr(shape.geometry, "verts", None)
-            if not raw_vertices or len(raw_vertices) < 9:  # 最低3頂点（9座標）必要
-                logger.warning(f"スペース {ifc_space.id()} の頂点情報が不足しています (頂点数: {len(raw_vertices) if raw_vertices else 0})")
-                return self._create_fallback_geometry(ifc_space)
-
-            vertices: List[List[float]] = []
-            min_x = min_y = min_z = float("inf")
-            max_x = max_y = max_z = float("-inf")
-            # Note: ifcopenshell.geom.create_shape() already returns coordinates in SI units (meters)
-            # so we do NOT apply self.length_unit here (that would double-convert mm files)
-
-            for i in range(0, len(raw_vertices), 3):
-                x = float(raw_vertices[i])
-                y = float(raw_vertices[i + 1])
-                z = float(raw_vertices[i + 2])
-                vertices.append([x, y, z])
-                min_x = min(min_x, x)
-                min_y = min(min_y, y)
-                min_z = min(min_z, z)
-                max_x = max(max_x, x)
-                max_y = max(max_y, y)
-                max_z = max(max_z, z)
-
-            raw_indices = getattr(shape.geometry, "faces", None)
-            indices = [int(i) for i in raw_indices] if raw_indices and len(raw_indices) >= 3 else None
-
-            # インデックスの検証
-            if indices:
-                max_index = max(indices)
-                if max_index >= len(vertices):
-                    logger.warning(f"スペース {ifc_space.id()} のインデックスが頂点数を超えています (max_index: {max_index}, vertices: {len(vertices)})")
-                    indices = None
+                raw_vertices = getattr(shape.geometry, "verts", None)
+                if not raw_vertices or len(raw_vertices) < 9:  # 最低3頂点（9座標）必要
+                    self._warn_sampled(
+                        "vertices",
+                        f"スペース {ifc_space.id()} の頂点情報が不足しています (頂点数: {len(raw_vertices) if raw_vertices else 0})"
+                    )
+                    return self._create_fallback_geometry(ifc_space)
 
-            bounding_box = BoundingBox(
-                min=Point3D(x=min_x, y=min_y, z=min_z),
-                max=Point3D(x=max_x, y=max_y, z=max_z),
-            )
+                # Note: ifcopenshell.geom.create_shape() already returns coordinates in SI units (meters)
+                # so we do NOT apply self.length_unit here (that would double-convert mm files)
+                local = np.asarray(raw_vertices, dtype=np.float64).reshape(-1, 3)
+                matrix = ifcopenshell.util.shape.get_shape_matrix(shape)
 
-            logger.info(f"スペース {ifc_space.id()} のジオメトリ取得成功 (SI単位): {len(vertices)} 頂点, {len(indices) if indices else 0} インデックス, bbox: ({min_x:.2f},{min_y:.2f},{min_z:.2f})-({max_x:.2f},{max_y:.2f},{max_z:.2f}) [m]")
-            return Geometry3D(vertices=vertices, indices=indices, boundingBox=bounding_box)
+                raw_indices = getattr(shape.geometry, "faces", None)
+                indices = np.asarray(raw_indices, dtype=np.int64) if raw_indices and len(raw_indices) >= 3 else None
+
+                # インデックスの検証
+                if indices is not None:
+                    max_index = int(indices.max())
+                    if max_index >= len(local):
+                        self._warn_sampled(
+                            "indices",
+                            f"スペース {ifc_space.id()} のインデックスが頂点数を超えています (max_index: {max_index}, vertices: {len(local)})"
+                        )
+                        indices = None
+
+                self._count_geometry("shape")
+                if indices is None:
+                    # インデックスのない形状は共有しない
+                    return self._to_world_geometry(local, None, matrix)
+
+                mesh_id, offset = self._register_mesh(local, indices)
+                if map_key is not None:
+                    self._mapped_meshes[map_key] = (mesh_id, offset)
+
+            # メッシュはバウンディングボックスの最小点を原点としているため、その分を変換に含める
+            transform = matrix.copy()
+            transform[:3, 3] += matrix[:3, :3] @ offset
+            vertices, indices = self.meshes[mesh_id]
+            geometry = self._to_world_geometry(vertices, indices, transform)
+            geometry.meshId = mesh_id
+            geometry.transform = transform.ravel().tolist()
+            return geometry
         except Exception as e:
-            logger.warning(f"スペース {ifc_space.id()} のジオメトリ取得エラー: {e}")
+            self._warn_sampled("geometry", f"スペース {ifc_space.id()} のジオメトリ取得エラー: {e}")
             return self._create_fallback_geometry(ifc_space)
 
+    def _get_mapped_key(self, ifc_space) -> Optional[Tuple[Tuple[int, bytes], ...]]:
+        """Body形状が IfcMappedItem だけで構成される場合、参照する IfcRepresentationMap と変換から作るキー"""
+        representation = getattr(ifc_space, "Representation", None)
+        if representation is None:
+            return None
+        bodies = [r for r in representation.Representations or [] if r.RepresentationIdentifier == "Body"]
+        if len(bodies) != 1 or not bodies[0].Items:
+            return None
+        key = []
+        for item in bodies[0].Items:
+            if not item.is_a("IfcMappedItem"):
+                return None
+            target = ifcopenshell.util.placement.get_mappeditem_transformation(item)
+            key.append((item.MappingSource.id(), np.round(target, 9).tobytes()))
+        return tuple(key)
+
+    def _get_placement_matrix(self, ifc_space) -> np.ndarray:
+        """スペースの配置行列（移動量はSI単位）"""
+        placement = getattr(ifc_space, "ObjectPlacement", None)
+        if placement is None:
+            return np.eye(4)
+        matrix = np.array(ifcopenshell.util.placement.get_local_placement(placement), dtype=np.float64)
+        matrix[:3, 3] *= self.length_unit
+        return matrix
+
+    def _register_mesh(self, local: np.ndarray, indices: np.ndarray) -> Tuple[str, np.ndarray]:
+        """
+        ローカル座標のメッシュを登録（同じ形状が登録済みの場合はそのIDを返す）
+        
+        頂点はバウンディングボックスの最小点が原点となるよう移動してから比較する
+        
+        Returns:
+            (メッシュID, 移動量)
+        """
+        offset = local.min(axis=0)
+        normalized = local - offset
+        # -0.0 と 0.0 を同じ値として扱うため 0.0 を加える
+        rounded = np.round(normalized, MESH_HASH_DECIMALS) + 0.0
+        key = hashlib.sha1(rounded.tobytes() + indices.astype(np.uint32).tobytes()).digest()
+        mesh_id = self._mesh_ids.get(key)
+        if mesh_id is None:
+            mesh_id = f"m{len(self.meshes)}"
+            self._mesh_ids[key] = mesh_id
+            self.meshes[mesh_id] = (normalized.astype(np.float32), indices.astype(np.uint32))
+        return mesh_id, offset
+
+    def _to_world_geometry(self, local: np.ndarray, indices: Optional[np.ndarray], matrix: np.ndarray) -> Geometry3D:
+        """ローカル座標の頂点を変換行列でワールド座標にしたGeometry3Dを作成"""
+        world = local.astype(np.float64) @ matrix[:3, :3].T + matrix[:3, 3]
+        lo = world.min(axis=0)
+        hi = world.max(axis=0)
+        bounding_box = BoundingBox(
+            min=Point3D(x=float(lo[0]), y=float(lo[1]), z=float(lo[2])),
+            max=Point3D(x=float(hi[0]), y=float(hi[1]), z=float(hi[2])),
+        )
+        return Geometry3D(
+            vertices=world.tolist(),
+            indices=indices.tolist() if indices is not None else None,
+            boundingBox=bounding_box
+        )
+
+    @span("ifc.fallback_geometry")
     def _create_fallback_geometry(self, ifc_space) -> Optional[Geometry3D]:
         """フォールバック用のジオメトリを作成（面積と位置から推定）"""
         try:
@@ -338,7 +545,7 @@ class IFCParserService:
                 max=Point3D(x=max_x, y=max_y, z=max_z),
             )
 
-            logger.info(f"スペース {ifc_space.id()} のフォールバックジオメトリを作成: area={area:.2f}, half_size={half_size:.2f}, height={h:.2f}, center=({cx:.2f},{cy:.2f},{cz:.2f})")
+            self._count_geometry("fallback")
             return Geometry3D(vertices=vertices, indices=indices, boundingBox=bounding_box)
 
         except Exception as e:
@@ -353,6 +560,111 @@ class IFCParserService:
             except:
                 return None
     
+    @span("ifc.equipment")
+    def get_all_equipment(self, spaces: List[Space]) -> List[Equipment]:
+        """
+        設備機器・器具を一括で抽出し、所属スペースを割り当てる
+        
+        IfcRelContainedInSpatialStructureでスペースに包含されている機器はそのスペースに、
+        それ以外は設置位置を含むスペースのバウンディングボックスで判定して割り当てる。
+        割り当て結果は各スペースの relatedEquipmentIds にも反映する
+        """
+        # 対象機器を一括取得（複数クラスに該当する場合の重複を除く）
+        elements = {}
+        for ifc_class in self.EQUIPMENT_CLASSES:
+            try:
+                for element in self.ifc_file.by_type(ifc_class):
+                    elements[element.id()] = element
+            except RuntimeError:
+                # スキーマに存在しないクラス
+                continue
+        
+        # 空間構造への包含関係を一度の走査で索引化
+        container_of: Dict[int, Any] = {}
+        for rel in self.ifc_file.by_type("IfcRelContainedInSpatialStructure"):
+            structure = rel.RelatingStructure
+            for element in rel.RelatedElements or []:
+                if element.id() in elements:
+                    container_of[element.id()] = structure
+        
+        space_by_id = {space.id: space for space in spaces}
+        equipment_list: List[Equipment] = []
+        for element_id, element in elements.items():
+            try:
+                equipment_list.append(self._parse_equipment(element, container_of.get(element_id), space_by_id))
+            except Exception as e:
+                logger.error(f"機器 {element_id} の解析エラー: {e}")
+        
+        link_equipment_to_spaces(equipment_list, spaces)
+        
+        assigned = sum(1 for e in equipment_list if e.spaceId is not None)
+        logger.info(f"合計 {len(equipment_list)} 個の機器を抽出しました（スペース割り当て: {assigned} 個）")
+        return equipment_list
+    
+    def _parse_equipment(self, element, container, space_by_id: Dict[str, Space]) -> Equipment:
+        """機器エンティティをEquipmentモデルに変換"""
+        space_id = None
+        assignment = None
+        floor_level = None
+        
+        if container is not None:
+            if container.is_a("IfcSpace") and str(container.id()) in space_by_id:
+                space_id = str(container.id())
+                assignment = "containment"
+                floor_level = space_by_id[space_id].floorLevel
+            elif container.is_a("IfcBuildingStorey"):
+                floor_level = getattr(container, "Name", None)
+        
+        return Equipment(
+            id=str(element.id()),
+            globalId=getattr(element, "GlobalId", None),
+            name=getattr(element, "Name", None),
+            ifcClass=element.is_a(),
+            objectType=getattr(element, "ObjectType", None),
+            floorLevel=floor_level,
+            location=self._get_world_location(element),
+            spaceId=space_id,
+            spaceAssignment=assignment,
+            properties=self._get_property_sets(element)
+        )
+    
+    def _get_world_location(self, element) -> Optional[Point3D]:
+        """要素の配置をたどったワールド座標を取得"""
+        try:
+            placement = getattr(element, "ObjectPlacement", None)
+            if placement is None:
+                return None
+            matrix = ifcopenshell.util.placement.get_local_placement(placement)
+            return Point3D(
+                x=float(matrix[0][3]) * self.length_unit,
+                y=float(matrix[1][3]) * self.length_unit,
+                z=float(matrix[2][3]) * self.length_unit
+            )
+        except Exception as e:
+            logger.warning(f"要素 {element.id()} の位置取得エラー: {e}")
+            return None
+    
+    def get_floor_plans(self, spaces: List[Space]) -> List[FloorPlan]:
+        """スペースのフットプリントを階ごとにまとめた平面図データを作成"""
+        return build_floor_plans(spaces)
+    
+    def build_model(self, spaces: List[Space]) -> Dict[str, Any]:
+        """
+        解析済みスペースからモデル全体のデータを作成
+        
+        Returns:
+            スキーマ・プロジェクト情報・スペース・機器・統計情報・単位スケール・共有メッシュを含む辞書
+        """
+        return {
+            "ifc_schema": self.ifc_file.wrapped_data.schema,
+            "project_info": self.get_project_info(),
+            "spaces": spaces,
+            "equipment": self.get_all_equipment(spaces),
+            "stats": self.get_statistics(),
+            "unit_scale": self.length_unit,
+            "meshes": self.meshes,
+        }
+    
     def get_statistics(self) -> Dict[str, int]:
         """統計情報を取得"""
         return {
@@ -361,3 +673,17 @@ class IFCParserService:
             "storeys": len(self.ifc_file.by_type("IfcBuildingStorey")),
             "elements": len(self.ifc_file.by_type("IfcBuildingElement")),
         }
+
+
+
+def parse_ifc_file(file_path: str, property_profile: Optional[PropertyProfile] = None) -> Dict[str, Any]:
+    """
+    IFCファイルを解析してモデルデータを返す
+
+    ワーカープロセスから呼び出せるようモジュールレベルの関数として定義する
+
+    Args:
+        property_profile: 保持するプロパティの指定（省略時はすべて）
+    """
+    parser = IFCParserService(file_path, property_profile)
+    return parser.build_model(parser.get_all_spaces())
@@ -0,0 +1,146 @@
+"""
+メモリ使用量の推定
+ストレージ上のモデルデータの大きさをオブジェクト構造から推定し、内訳ごとに集計する
+
+大きなリスト・辞書は一定数の要素だけを計測して全体を推定するため、
+数万スペースのモデルでも短時間で計測できる（値は概算）
+"""
+from typing import Any, Dict, Optional, Set, Callable, Sequence
+import os
+import sys
+import tracemalloc
+import types
+
+from pydantic import BaseModel
+
+from app.models import ModelMemoryUsage
+
+# リスト・辞書で実際に計測する要素数の上限
+SAMPLE_LIMIT = 200
+
+# 計測対象外とする型（クラス・モジュール・関数は共有されているため）
+_SKIP_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+_ATOMIC_TYPES = (str, bytes, bytearray, int, float, bool, complex, type(None), memoryview)
+
+
+def _sample(items: Sequence[Any]) -> Sequence[Any]:
+    """等間隔に要素を抜き出す（要素数が上限以下の場合はそのまま）"""
+    if len(items) <= SAMPLE_LIMIT:
+        return items
+    step = -(-len(items) // SAMPLE_LIMIT)
+    return items[::step]
+
+
+def _extrapolate(sampled_size: int, total_count: int, sample_count: int) -> int:
+    if sample_count == 0:
+        return 0
+    return int(sampled_size * total_count / sample_count)
+
+
+def deep_sizeof(obj: Any, seen: Optional[Set[int]] = None) -> int:
+    """
+    オブジェクトが参照するものを含めた大きさ (bytes) を推定
+
+    Args:
+        obj: 対象オブジェクト
+        seen: 計測済みオブジェクトのid（共有されているオブジェクトを重複して数えないため）
+    """
+    if seen is None:
+        seen = set()
+    if isinstance(obj, _SKIP_TYPES) or id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+
+    if isinstance(obj, _ATOMIC_TYPES):
+        return size
+    if isinstance(obj, dict):
+        items = list(obj.items())
+        sample = _sample(items)
+        sampled = sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in sample)
+        return size + _extrapolate(sampled, len(items), len(sample))
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        items = obj if isinstance(obj, (list, tuple)) else list(obj)
+        sample = _sample(items)
+        sampled = sum(deep_sizeof(item, seen) for item in sample)
+        return size + _extrapolate(sampled, len(items), len(sample))
+    if isinstance(obj, BaseModel):
+        return size + deep_sizeof(obj.__dict__, seen)
+    if hasattr(obj, "__dict__"):
+        return size + deep_sizeof(vars(obj), seen)
+    return size
+
+
+def _estimate_parts(items: Sequence[Any], part: Callable[[Any], Any], seen: Set[int]) -> int:
+    """要素の一部分（形状・プロパティなど）の大きさを、サンプリングした要素から推定"""
+    sample = _sample(items)
+    sampled = sum(deep_sizeof(part(item), seen) for item in sample)
+    return _extrapolate(sampled, len(items), len(sample))
+
+
+def estimate_model_memory(model_id: str, model_data: Dict[str, Any], geometry_store_path: Optional[str] = None) -> ModelMemoryUsage:
+    """
+    モデルのメモリ使用量を内訳ごとに推定
+
+    形状 → プロパティ → 計算結果 → レスポンスキャッシュ → 残り の順に計測し、
+    先に数えたオブジェクトは後の内訳に含めない
+    """
+    seen: Set[int] = set()
+    spaces = model_data.get("spaces", [])
+    equipment = model_data.get("equipment", [])
+
+    geometry = _estimate_parts(spaces, lambda s: s.geometry, seen)
+    geometry += deep_sizeof(model_data.get("floor_plans"), seen)
+    geometry += deep_sizeof(model_data.get("meshes"), seen)
+    properties = _estimate_parts(spaces, lambda s: s.properties, seen)
+    properties += _estimate_parts(equipment, lambda e: e.properties, seen)
+    results = deep_sizeof(model_data.get("results"), seen)
+    response_cache = deep_sizeof(model_data.get("response_cache"), seen)
+    # スペース一覧は上と同じ要素が抜き出されるため、形状・プロパティを除いた残りが数えられる
+    other = deep_sizeof(model_data, seen)
+
+    store_size = 0
+    if geometry_store_path and os.path.exists(geometry_store_path):
+        store_size = os.path.getsize(geometry_store_path)
+
+    return ModelMemoryUsage(
+        modelId=model_id,
+        filename=model_data.get("filename", ""),
+        spaceCount=len(spaces),
+        geometryBytes=geometry,
+        propertyBytes=properties,
+        resultBytes=results,
+        responseCacheBytes=response_cache,
+        otherBytes=other,
+        totalBytes=geometry + properties + results + response_cache + other,
+        geometryStoreFileBytes=store_size,
+    )
+
+
+def get_process_rss() -> Optional[int]:
+    """プロセスの現在の常駐メモリ (bytes)。取得できない環境ではNone"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def get_process_peak_rss() -> Optional[int]:
+    """プロセスの最大常駐メモリ (bytes)。取得できない環境ではNone"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOSはバイト、Linuxはキロバイト単位
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def get_tracemalloc_usage() -> Optional[int]:
+    """tracemallocで追跡中のメモリ (bytes)。追跡していない場合はNone"""
+    if not tracemalloc.is_tracing():
+        return None
+    current, _ = tracemalloc.get_traced_memory()
+    return current
@@ -0,0 +1,299 @@
+"""
+処理時間の計測とメトリクス集計
+解析・計算の各段階の処理時間をヒストグラムに集計し、Prometheus形式で出力する。
+リクエスト中に計測した時間は Server-Timing ヘッダーとしても返す
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Tuple, Optional, Iterator, Any, Callable
+import bisect
+import threading
+import time
+
+# 処理時間ヒストグラムの上限値 (秒)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 段階ごとの処理時間
+STAGE_METRIC = "ifc_mep_stage_duration_seconds"
+# HTTPリクエストの処理時間
+HTTP_METRIC = "ifc_mep_http_request_duration_seconds"
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Optional[Dict[str, str]]) -> LabelKey:
+    return tuple(sorted((labels or {}).items()))
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(str(value))}"' for name, value in items) + "}"
+
+
+class Histogram:
+    """ラベルごとの累積ヒストグラム"""
+
+    def __init__(self, name: str, description: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        # ラベル → [バケットごとの件数..., 件数, 合計]
+        self._series: Dict[LabelKey, List[float]] = {}
+
+    def observe(self, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+        self.observe_key(_label_key(labels), value)
+
+    def observe_key(self, key: LabelKey, value: float) -> None:
+        series = self._series.get(key)
+        if series is None:
+            series = self._series.setdefault(key, [0] * (len(self.buckets) + 2))
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[index] += 1
+        series[-2] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', repr(bound)))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {series[-2]}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {series[-2]}")
+        return lines
+
+
+class Counter:
+    """ラベルごとのカウンター"""
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._values: Dict[LabelKey, float] = {}
+
+    def increment_key(self, key: LabelKey, amount: float = 1) -> None:
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class MetricsRegistry:
+    """メトリクスの登録・集計（スレッドセーフ）"""
+
+    def __init__(self):
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[str, Counter] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None, description: str = "") -> None:
+        """ヒストグラムに値を記録"""
+        key = _label_key(labels)
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(name, description or name)
+            histogram.observe_key(key, value)
+
+    def increment(self, name: str, labels: Optional[Dict[str, str]] = None, amount: float = 1, description: str = "") -> None:
+        """カウンターを加算"""
+        key = _label_key(labels)
+        with self._lock:
+            counter = self._counters.get(name)
+            if counter is None:
+                counter = self._counters[name] = Counter(name, description or name)
+            counter.increment_key(key, amount)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """別プロセスへ渡せる形式で現在の値を取り出す"""
+        with self._lock:
+            return {
+                "histograms": {
+                    name: (h.description, h.buckets, {key: list(series) for key, series in h._series.items()})
+                    for name, h in self._histograms.items()
+                },
+                "counters": {
+                    name: (c.description, dict(c._values))
+                    for name, c in self._counters.items()
+                },
+            }
+
+    def merge(self, snapshot: Dict[str, Any]) -> None:
+        """snapshot() で取り出した値を加算"""
+        with self._lock:
+            for name, (description, buckets, series_by_key) in snapshot.get("histograms", {}).items():
+                histogram = self._histograms.get(name)
+                if histogram is None:
+                    histogram = self._histograms[name] = Histogram(name, description, tuple(buckets))
+                for key, series in series_by_key.items():
+                    current = histogram._series.setdefault(key, [0] * (len(histogram.buckets) + 2))
+                    for i, value in enumerate(series):
+                        current[i] += value
+            for name, (description, values) in snapshot.get("counters", {}).items():
+                counter = self._counters.get(name)
+                if counter is None:
+                    counter = self._counters[name] = Counter(name, description)
+                for key, value in values.items():
+                    counter.increment_key(key, value)
+
+    def render_prometheus(self) -> str:
+        """Prometheusのテキスト形式で出力"""
+        with self._lock:
+            lines: List[str] = []
+            for name in sorted(self._histograms):
+                lines.extend(self._histograms[name].render())
+            for name in sorted(self._counters):
+                lines.extend(self._counters[name].render())
+        return "\n".join(lines) + "\n"
+
+
+class RequestTimings:
+    """1リクエスト中の段階ごとの合計時間（Server-Timingヘッダー用）"""
+
+    def __init__(self):
+        self._totals: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float, count: int = 1) -> None:
+        with self._lock:
+            entry = self._totals.setdefault(stage, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += count
+
+    def to_header(self, total_seconds: Optional[float] = None) -> str:
+        """Server-Timingヘッダーの値を作成（時間はミリ秒）"""
+        with self._lock:
+            parts = [
+                f'{stage};dur={seconds * 1000:.1f};desc="n={count}"'
+                for stage, (seconds, count) in self._totals.items()
+            ]
+        if total_seconds is not None:
+            parts.append(f"total;dur={total_seconds * 1000:.1f}")
+        return ", ".join(parts)
+
+
+# プロセス全体のメトリクス
+registry = MetricsRegistry()
+
+# 記録先のレジストリ（ワーカープロセスでの一時的な集計に切り替える）
+_active_registry: ContextVar[MetricsRegistry] = ContextVar("active_metrics_registry", default=registry)
+# 処理中のリクエストの計測結果
+_request_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """段階の処理時間を記録"""
+    _active_registry.get().observe(STAGE_METRIC, seconds, {"stage": stage}, "解析・計算の段階ごとの処理時間")
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """
+    ブロックの処理時間を計測して記録
+
+    使用例:
+        with span("ifc.open"):
+            ifc_file = ifcopenshell.open(path)
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+def increment(name: str, labels: Optional[Dict[str, str]] = None, amount: float = 1, description: str = "") -> None:
+    """カウンターを加算"""
+    _active_registry.get().increment(name, labels, amount, description)
+
+
+def run_with_metrics(func: Callable[..., Any], *args: Any) -> Tuple[Any, Dict[str, Any]]:
+    """
+    関数を実行し、その間に記録したメトリクスと一緒に結果を返す（ワーカープロセスで実行）
+
+    呼び出し元では merge_metrics() で自プロセスのメトリクスに加算する
+    """
+    local = MetricsRegistry()
+    token = _active_registry.set(local)
+    try:
+        result = func(*args)
+    finally:
+        _active_registry.reset(token)
+    return result, local.snapshot()
+
+
+def merge_metrics(snapshot: Dict[str, Any]) -> None:
+    """ワーカープロセスで記録したメトリクスを加算し、処理中のリクエストの計測にも反映"""
+    registry.merge(snapshot)
+    timings = _request_timings.get()
+    if timings is None:
+        return
+    histogram = snapshot.get("histograms", {}).get(STAGE_METRIC)
+    if histogram is None:
+        return
+    _, _, series_by_key = histogram
+    for key, series in series_by_key.items():
+        stage = dict(key).get("stage", "")
+        timings.add(stage, series[-1], int(series[-2]))
+
+
+class MetricsMiddleware:
+    """
+    リクエストごとの処理時間を記録し、Server-Timingヘッダーを付与するASGIミドルウェア
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _request_timings.set(timings)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                header = timings.to_header(time.perf_counter() - started)
+                message = {
+                    **message,
+                    "headers": list(message.get("headers", [])) + [(b"server-timing", header.encode("latin-1"))],
+                }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            # ルートのパステンプレートで集計する（マッチしない場合はまとめる）
+            route = scope.get("route")
+            registry.observe(
+                HTTP_METRIC,
+                time.perf_counter() - started,
+                {
+                    "method": scope.get("method", ""),
+                    "route": getattr(route, "path", "unmatched"),
+                    "status": str(status_code),
+                },
+                "HTTPリクエストの処理時間"
+            )
@@ -0,0 +1,132 @@
+"""
+バックグラウンド解析ジョブ
+IFCファイルを別スレッドで解析し、解析できたスペースを順次クライアントへ配信できるようにする
+"""
+from typing import List, Dict, Optional, Callable, Any
+import asyncio
+import logging
+import threading
+
+from app.models import Space
+
+logger = logging.getLogger(__name__)
+
+# 失敗したジョブを状況確認用に残しておく時間（秒）
+FAILED_JOB_TTL_SECONDS = 600.0
+
+
+class ParseJob:
+    """
+    1つのIFCファイルの解析ジョブ
+
+    解析スレッドがスペースを追加するたびにイベントループへ通知し、
+    配信側は wait_for_update() で新しいスペースを待つ
+    """
+
+    STATUS_QUEUED = "queued"
+    STATUS_PARSING = "parsing"
+    STATUS_SUCCESS = "success"
+    STATUS_ERROR = "error"
+
+    def __init__(self, model_id: str, filename: str, loop: asyncio.AbstractEventLoop):
+        """
+        Args:
+            model_id: モデルID
+            filename: 元のファイル名
+            loop: 通知先のイベントループ
+        """
+        self.model_id = model_id
+        self.filename = filename
+        self.status = self.STATUS_QUEUED
+        self.error: Optional[str] = None
+        self.spaces: List[Space] = []
+        self.result: Dict[str, Any] = {}
+        self._loop = loop
+        self._updated = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in (self.STATUS_SUCCESS, self.STATUS_ERROR)
+
+    def _notify(self) -> None:
+        # 待機中の配信側をすべて起こし、次の更新用に新しいイベントを用意する
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    def _notify_threadsafe(self) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._notify)
+        except RuntimeError:
+            # イベントループが終了している場合
+            pass
+
+    def _expire(self) -> None:
+        # 同じモデルIDで登録し直されたジョブは削除しない
+        if parse_jobs.get(self.model_id) is self:
+            del parse_jobs[self.model_id]
+
+    def _expire_threadsafe(self, delay: float) -> None:
+        """一定時間後にジョブを一覧から削除"""
+        try:
+            self._loop.call_soon_threadsafe(self._loop.call_later, delay, self._expire)
+        except RuntimeError:
+            pass
+
+    async def wait_for_update(self, known_count: int, timeout: float) -> bool:
+        """
+        スペースの追加または完了を待つ
+
+        Returns:
+            更新があった場合はTrue、タイムアウトした場合はFalse
+        """
+        updated = self._updated
+        if len(self.spaces) > known_count or self.done:
+            return True
+        try:
+            await asyncio.wait_for(updated.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def run(self, parse: Callable[["ParseJob"], Dict[str, Any]]) -> None:
+        """
+        解析を実行（解析スレッドから呼ばれる）
+
+        Args:
+            parse: ジョブを受け取り、add_space() でスペースを追加しながら解析する関数。
+                戻り値は完了時の結果として保持する
+        """
+        self.status = self.STATUS_PARSING
+        self._notify_threadsafe()
+        try:
+            self.result = parse(self)
+            self.status = self.STATUS_SUCCESS
+        except Exception as e:
+            logger.error(f"解析ジョブ {self.model_id} のエラー: {e}")
+            self.error = str(e)
+            self.status = self.STATUS_ERROR
+            # モデルは登録されないため、解析途中のスペース（ジオメトリ）は保持しない
+            self.spaces = []
+        finally:
+            self._notify_threadsafe()
+        if self.status == self.STATUS_ERROR:
+            self._expire_threadsafe(FAILED_JOB_TTL_SECONDS)
+
+    def add_space(self, space: Space) -> None:
+        """解析済みスペースを追加して配信側に通知"""
+        self.spaces.append(space)
+        self._notify_threadsafe()
+
+    def start(self, parse: Callable[["ParseJob"], Dict[str, Any]]) -> None:
+        """解析スレッドを開始"""
+        thread = threading.Thread(
+            target=self.run,
+            args=(parse,),
+            name=f"parse-{self.model_id}",
+            daemon=True
+        )
+        thread.start()
+
+
+# 実行中・完了済みの解析ジョブ（モデルIDをキーとする）
+parse_jobs: Dict[str, ParseJob] = {}
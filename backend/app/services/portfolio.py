@@ -0,0 +1,95 @@
+"""
+複数モデルの換気計算（ポートフォリオ）
+モデルごとの計算をワーカープロセスで並列に実行し、モデルごとの概要とモデル間の統計を返す
+"""
+from typing import Any, Dict, List, Optional, Sequence
+import statistics
+import time
+
+from app.models import (
+    Space,
+    VentilationCalculationInput,
+    VentilationMethod,
+    PortfolioModelSummary,
+    PortfolioStatistic,
+    PortfolioResult
+)
+from app.calculators.ventilation import VentilationCalculator
+from app.services.metrics import span
+
+# ワーカープロセスに送るスペースの項目（計算に使うもののみ。形状・プロパティは送らない）
+CALCULATION_FIELDS = ("id", "name", "longName", "area", "volume", "height", "floorLevel", "usage", "occupancy")
+
+
+def strip_spaces(spaces: Sequence[Space]) -> List[Space]:
+    """ワーカープロセスに送るため、計算に使う項目だけのスペースにする"""
+    return [
+        Space.model_construct(**{name: getattr(space, name) for name in CALCULATION_FIELDS})
+        for space in spaces
+    ]
+
+
+@span("ventilation.portfolio_model")
+def summarize_model_ventilation(spaces: Sequence[Space], method: str) -> Dict[str, Any]:
+    """
+    モデル1件の全スペースを計算して概要を返す（ワーカープロセスで実行）
+
+    Returns:
+        PortfolioModelSummary の項目（modelId・status・filename を除く）
+    """
+    started = time.perf_counter()
+    calculator = VentilationCalculator()
+    calc_method = VentilationMethod(method)
+
+    total = 0.0
+    maximum = 0.0
+    area = 0.0
+    counts = {"OK": 0, "NG": 0, "WARNING": 0}
+    for space in spaces:
+        result = calculator.calculate(VentilationCalculationInput(spaceId=space.id, method=calc_method), space)
+        total += result.requiredVentilation
+        maximum = max(maximum, result.requiredVentilation)
+        area += space.area or 0.0
+        counts[result.complianceStatus] += 1
+
+    return {
+        "spaceCount": len(spaces),
+        "totalArea": area,
+        "totalRequiredVentilation": total,
+        "maxRequiredVentilation": maximum,
+        "ventilationPerArea": total / area if area > 0 else None,
+        "okCount": counts["OK"],
+        "ngCount": counts["NG"],
+        "warningCount": counts["WARNING"],
+        "complianceRate": counts["OK"] / len(spaces) if spaces else 0,
+        "elapsedSeconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def _statistic(values: List[float]) -> Optional[PortfolioStatistic]:
+    if not values:
+        return None
+    return PortfolioStatistic(
+        mean=statistics.fmean(values),
+        median=statistics.median(values),
+        min=min(values),
+        max=max(values)
+    )
+
+
+def build_portfolio_result(method: VentilationMethod, summaries: List[PortfolioModelSummary]) -> PortfolioResult:
+    """モデルごとの概要からモデル間の統計を求める（計算できたモデルのみ集計）"""
+    succeeded = [s for s in summaries if s.status == "success"]
+    total_spaces = sum(s.spaceCount for s in succeeded)
+    return PortfolioResult(
+        method=method,
+        modelCount=len(summaries),
+        succeededCount=len(succeeded),
+        failedCount=len(summaries) - len(succeeded),
+        totalSpaces=total_spaces,
+        totalRequiredVentilation=sum(s.totalRequiredVentilation for s in succeeded),
+        complianceRate=sum(s.okCount for s in succeeded) / total_spaces if total_spaces else 0,
+        requiredVentilationStats=_statistic([s.totalRequiredVentilation for s in succeeded]),
+        ventilationPerAreaStats=_statistic([s.ventilationPerArea for s in succeeded if s.ventilationPerArea is not None]),
+        models=summaries
+    )
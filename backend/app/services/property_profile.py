@@ -0,0 +1,128 @@
+"""
+プロパティ抽出プロファイル
+スペース・機器のプロパティのうち、保持するプロパティセット・プロパティを指定する
+
+指定はカンマ区切りの文字列で、次の形式を組み合わせる:
+    *                          すべて（既定）
+    none                       プロパティを保持しない
+    Pset_SpaceCommon           プロパティセット全体
+    Pset_SpaceCommon.IsExternal  プロパティセット内の特定のプロパティ
+    *.Occupancy                どのプロパティセットにあってもよいプロパティ
+"""
+from typing import Any, Dict, FrozenSet, Iterable, Optional
+import hashlib
+
+from app.config import get_settings
+
+ALL = "*"
+NONE = "none"
+
+
+class PropertyProfile:
+    """保持するプロパティの指定"""
+
+    def __init__(
+        self,
+        include_all: bool = False,
+        psets: Iterable[str] = (),
+        properties: Iterable[str] = (),
+        pset_properties: Optional[Dict[str, Iterable[str]]] = None
+    ):
+        """
+        Args:
+            include_all: すべてのプロパティを保持する
+            psets: 全体を保持するプロパティセット名
+            properties: どのプロパティセットでも保持するプロパティ名
+            pset_properties: プロパティセット名 → そのセットで保持するプロパティ名
+        """
+        self.include_all = include_all
+        self.psets: FrozenSet[str] = frozenset(psets)
+        self.properties: FrozenSet[str] = frozenset(properties)
+        self.pset_properties: Dict[str, FrozenSet[str]] = {
+            name: frozenset(props) for name, props in (pset_properties or {}).items()
+        }
+
+    @classmethod
+    def parse(cls, spec: Optional[str]) -> "PropertyProfile":
+        """
+        指定文字列からプロファイルを作成
+
+        Raises:
+            ValueError: 指定の形式が正しくない場合
+        """
+        entries = [entry.strip() for entry in (spec or ALL).split(",") if entry.strip()]
+        if not entries or ALL in entries:
+            return cls(include_all=True)
+
+        psets = set()
+        properties = set()
+        pset_properties: Dict[str, set] = {}
+        for entry in entries:
+            if entry.lower() == NONE:
+                continue
+            pset_name, dot, prop_name = entry.partition(".")
+            if not pset_name or (dot and not prop_name):
+                raise ValueError(f"プロパティの指定が正しくありません: {entry}")
+            if not dot or prop_name == ALL:
+                psets.add(pset_name)
+            elif pset_name == ALL:
+                properties.add(prop_name)
+            else:
+                pset_properties.setdefault(pset_name, set()).add(prop_name)
+        return cls(psets=psets, properties=properties, pset_properties=pset_properties)
+
+    @property
+    def key(self) -> str:
+        """正規化した指定文字列（同じ指定なら同じ値になる）"""
+        if self.include_all:
+            return ALL
+        entries = sorted(self.psets)
+        entries += sorted(f"{ALL}.{name}" for name in self.properties)
+        entries += sorted(f"{pset}.{name}" for pset, names in self.pset_properties.items() for name in names)
+        return ",".join(entries) or NONE
+
+    @property
+    def digest(self) -> str:
+        """ETagなどに使う短い識別子"""
+        return hashlib.sha1(self.key.encode("utf-8")).hexdigest()[:8]
+
+    def select(self, pset_name: str) -> Optional[FrozenSet[str]]:
+        """
+        プロパティセットで保持するプロパティ名
+
+        Returns:
+            保持するプロパティ名の集合。セット全体を保持する場合はNone
+        """
+        if self.include_all or pset_name in self.psets:
+            return None
+        return self.pset_properties.get(pset_name, frozenset()) | self.properties
+
+    def includes(self, pset_name: str, prop_name: str) -> bool:
+        """プロパティを保持するか"""
+        selected = self.select(pset_name)
+        return selected is None or prop_name in selected
+
+    def merge(self, psets: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """プロパティセットごとの値から、保持するプロパティを1つの辞書にまとめる（同名は先のセットを優先）"""
+        merged: Dict[str, Any] = {}
+        for pset_name, props in psets.items():
+            selected = self.select(pset_name)
+            for key, value in props.items():
+                if key not in merged and (selected is None or key in selected):
+                    merged[key] = value
+        return merged
+
+    def __repr__(self) -> str:
+        return f"PropertyProfile({self.key!r})"
+
+
+def resolve_property_profile(spec: Optional[str] = None) -> PropertyProfile:
+    """
+    アップロード時の指定からプロファイルを作成（省略時はサーバーの既定値）
+
+    Raises:
+        ValueError: 指定の形式が正しくない場合
+    """
+    if spec is None:
+        spec = get_settings().property_profile
+    return PropertyProfile.parse(spec)
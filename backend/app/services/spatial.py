@@ -0,0 +1,190 @@
+"""
+空間検索ユーティリティ
+点群とバウンディングボックス群の包含判定をNumPyで一括処理する
+"""
+from typing import List
+
+import numpy as np
+
+from app.models import Space, Equipment
+
+# 一度に判定する点の数
+POINT_CHUNK_SIZE = 4096
+# 境界上の点を含めるための許容差 (m)
+CONTAINMENT_TOLERANCE = 1e-3
+# 格子の1セルの大きさ（ボックスの大きさの中央値に対する倍率）
+GRID_CELL_SCALE = 2.0
+# これより多くのセルにまたがるボックス（廊下・吹抜け・敷地全体など）は格子に登録せず、全点と個別に判定する
+LARGE_BOX_CELLS = 512
+# 1軸あたりのセル数の上限（セルのキーを64bit整数に収める）
+MAX_AXIS_CELLS = 1 << 20
+
+
+class _BoxGrid:
+    """
+    ボックスを一様な3次元格子に登録した索引
+
+    各ボックスは重なるセルに登録し、点は自身のセルに登録されたボックスのみを候補とする。
+    多数のセルにまたがる大きなボックスは登録せず、別に保持する
+    """
+
+    def __init__(self, lo: np.ndarray, hi: np.ndarray):
+        self.origin = lo.min(axis=0)
+        extents = hi - lo
+        self.cell_size = np.maximum.reduce([
+            np.median(extents, axis=0) * GRID_CELL_SCALE,
+            (hi.max(axis=0) - self.origin) / MAX_AXIS_CELLS,
+            np.full(3, CONTAINMENT_TOLERANCE),
+        ])
+
+        cell_lo = self._cell_coords(lo)
+        cell_hi = self._cell_coords(hi)
+        self.shape = cell_hi.max(axis=0) + 1
+        spans = cell_hi - cell_lo + 1
+        covers = np.prod(spans, axis=1)
+
+        large = covers > LARGE_BOX_CELLS
+        self.large_boxes = np.flatnonzero(large)
+
+        # 小さいボックス × 重なるセル の組をセルのキー順に並べる
+        boxes = np.flatnonzero(~large)
+        counts = covers[boxes]
+        box_of_pair = np.repeat(boxes, counts)
+        local = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+        span = spans[box_of_pair]
+        offset = np.stack([
+            local // (span[:, 1] * span[:, 2]),
+            (local // span[:, 2]) % span[:, 1],
+            local % span[:, 2],
+        ], axis=1)
+        keys = self._cell_keys(cell_lo[box_of_pair] + offset)
+        order = np.argsort(keys, kind="stable")
+        self.pair_keys = keys[order]
+        self.pair_boxes = box_of_pair[order]
+
+    def _cell_coords(self, coords: np.ndarray) -> np.ndarray:
+        return np.floor((coords - self.origin) / self.cell_size).astype(np.int64)
+
+    def _cell_keys(self, cells: np.ndarray) -> np.ndarray:
+        return (cells[:, 0] * self.shape[1] + cells[:, 1]) * self.shape[2] + cells[:, 2]
+
+    def candidates(self, points: np.ndarray):
+        """
+        点ごとの候補ボックス（格子に登録したもののみ）
+
+        Returns:
+            (点のインデックス, ボックスのインデックス) の組
+        """
+        cells = self._cell_coords(points)
+        within = np.all((cells >= 0) & (cells < self.shape), axis=1)
+        keys = np.where(within, self._cell_keys(np.clip(cells, 0, self.shape - 1)), -1)
+        first = np.searchsorted(self.pair_keys, keys, side="left")
+        last = np.searchsorted(self.pair_keys, keys, side="right")
+        counts = last - first
+        point_of_pair = np.repeat(np.arange(len(points)), counts)
+        positions = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(first, counts)
+        return point_of_pair, self.pair_boxes[positions]
+
+
+def assign_points_to_boxes(
+    points: np.ndarray,
+    box_mins: np.ndarray,
+    box_maxs: np.ndarray,
+    tolerance: float = CONTAINMENT_TOLERANCE,
+    chunk_size: int = POINT_CHUNK_SIZE
+) -> np.ndarray:
+    """
+    各点を含むバウンディングボックスを求める
+
+    複数のボックスに含まれる場合は体積が最小のもの（最も内側の室）を選ぶ（同じ体積の場合はインデックスの小さいもの）。
+    ボックスを格子で索引し、点と候補ボックスの組だけを判定するため、
+    建物全体にまたがるボックスがあっても判定する組の数は増えない
+
+    Args:
+        points: 点座標 (N, 3)
+        box_mins: ボックスの最小座標 (M, 3)
+        box_maxs: ボックスの最大座標 (M, 3)
+        tolerance: 境界の許容差
+        chunk_size: 一度に判定する点の数
+
+    Returns:
+        各点が属するボックスのインデックス (N,)。該当なしは -1
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    result = np.full(len(points), -1, dtype=np.int64)
+    if len(points) == 0 or len(box_mins) == 0:
+        return result
+
+    lo = np.asarray(box_mins, dtype=np.float64).reshape(-1, 3) - tolerance
+    hi = np.asarray(box_maxs, dtype=np.float64).reshape(-1, 3) + tolerance
+    volumes = np.prod(np.maximum(hi - lo, 0.0), axis=1)
+    # 体積の小さい順の順位（点ごとの最小値を整数で求める）
+    by_volume = np.lexsort((np.arange(len(lo)), volumes))
+    rank = np.empty(len(lo), dtype=np.int64)
+    rank[by_volume] = np.arange(len(lo))
+    no_match = len(lo)
+
+    grid = _BoxGrid(lo, hi)
+    large = grid.large_boxes
+
+    for start in range(0, len(points), chunk_size):
+        chunk = points[start:start + chunk_size]
+
+        point_of_pair, box_of_pair = grid.candidates(chunk)
+        inside = np.all((chunk[point_of_pair] >= lo[box_of_pair]) & (chunk[point_of_pair] <= hi[box_of_pair]), axis=1)
+        point_of_pair, box_of_pair = point_of_pair[inside], box_of_pair[inside]
+
+        if len(large):
+            large_inside = np.all(
+                (chunk[:, None, :] >= lo[None, large, :]) & (chunk[:, None, :] <= hi[None, large, :]),
+                axis=2
+            )
+            large_points, large_columns = np.nonzero(large_inside)
+            point_of_pair = np.concatenate([point_of_pair, large_points])
+            box_of_pair = np.concatenate([box_of_pair, large[large_columns]])
+
+        best = np.full(len(chunk), no_match, dtype=np.int64)
+        np.minimum.at(best, point_of_pair, rank[box_of_pair])
+        found = best < no_match
+        result[start + np.flatnonzero(found)] = by_volume[best[found]]
+
+    return result
+
+
+def link_equipment_to_spaces(equipment_list: List[Equipment], spaces: List[Space]) -> None:
+    """
+    機器とスペースを関連付ける
+
+    所属スペースが未定の機器は設置位置を含むスペースのバウンディングボックスで一括判定し、
+    結果を各スペースの relatedEquipmentIds に反映する
+    """
+    targets = [e for e in equipment_list if e.spaceId is None and e.location is not None]
+    boxed_spaces = [s for s in spaces if s.geometry is not None and s.geometry.boundingBox is not None]
+
+    if targets and boxed_spaces:
+        points = np.array([[e.location.x, e.location.y, e.location.z] for e in targets])
+        box_mins = np.array([
+            [s.geometry.boundingBox.min.x, s.geometry.boundingBox.min.y, s.geometry.boundingBox.min.z]
+            for s in boxed_spaces
+        ])
+        box_maxs = np.array([
+            [s.geometry.boundingBox.max.x, s.geometry.boundingBox.max.y, s.geometry.boundingBox.max.z]
+            for s in boxed_spaces
+        ])
+
+        matches = assign_points_to_boxes(points, box_mins, box_maxs)
+        for equipment, match in zip(targets, matches.tolist()):
+            if match < 0:
+                continue
+            space = boxed_spaces[match]
+            equipment.spaceId = space.id
+            equipment.spaceAssignment = "bounding_box"
+            if equipment.floorLevel is None:
+                equipment.floorLevel = space.floorLevel
+
+    space_by_id = {space.id: space for space in spaces}
+    for space in spaces:
+        space.relatedEquipmentIds = []
+    for equipment in equipment_list:
+        if equipment.spaceId in space_by_id:
+            space_by_id[equipment.spaceId].relatedEquipmentIds.append(equipment.id)
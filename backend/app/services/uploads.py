@@ -0,0 +1,170 @@
+"""
+アップロードファイルの保存
+チャンク単位でディスクに書き込みながら内容ハッシュを計算する
+
+圧縮されたIFC（.ifczip / .ifc.gz / .ifc.zst）はチャンク単位で展開しながら書き込む。
+サイズの上限（MAX_UPLOAD_SIZE_MB）と内容ハッシュは展開後のIFCに対して適用する
+（同じIFCなら圧縮の有無によらず同じハッシュになる）
+
+zstd形式には zstandard が必要
+"""
+from typing import BinaryIO, Optional, Tuple
+import contextlib
+import gzip
+import hashlib
+import os
+import zipfile
+import zlib
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import get_settings
+
+# 1回の読み込みサイズ
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# ファイル名の末尾 → 圧縮形式（長いものから照合する）
+COMPRESSED_SUFFIXES = {
+    ".ifczip": "zip",
+    ".ifc.gz": "gzip",
+    ".ifc.zst": "zstd",
+    ".ifc.zstd": "zstd",
+}
+SUPPORTED_UPLOAD_SUFFIXES = (".ifc",) + tuple(COMPRESSED_SUFFIXES)
+
+
+class UploadTooLarge(Exception):
+    """展開後のファイルがサイズの上限を超えた"""
+
+    def __init__(self, limit_bytes: int):
+        super().__init__(f"ファイルサイズが上限（{limit_bytes // (1024 * 1024)} MB）を超えています")
+        self.limit_bytes = limit_bytes
+
+
+class InvalidUpload(ValueError):
+    """圧縮ファイルを展開できない"""
+
+
+def get_upload_compression(filename: str) -> Optional[str]:
+    """ファイル名から圧縮形式を判定（zip, gzip, zstd。非圧縮のIFCはNone）"""
+    name = filename.lower()
+    for suffix in sorted(COMPRESSED_SUFFIXES, key=len, reverse=True):
+        if name.endswith(suffix):
+            return COMPRESSED_SUFFIXES[suffix]
+    return None
+
+
+def is_supported_upload(filename: Optional[str]) -> bool:
+    """アップロード可能なファイル名か（IFC、または圧縮されたIFC）"""
+    return bool(filename) and filename.lower().endswith(SUPPORTED_UPLOAD_SUFFIXES)
+
+
+def get_ifc_filename(filename: str) -> str:
+    """圧縮形式の拡張子を除いたIFCファイル名（a.ifc.gz → a.ifc、a.ifczip → a.ifc）"""
+    name = filename.lower()
+    for suffix in sorted(COMPRESSED_SUFFIXES, key=len, reverse=True):
+        if name.endswith(suffix):
+            return filename[:-len(suffix)] + ".ifc"
+    return filename
+
+
+def get_max_upload_size() -> Optional[int]:
+    """アップロードサイズの上限 (bytes)。0以下の設定は上限なし"""
+    limit_mb = get_settings().max_upload_size_mb
+    return limit_mb * 1024 * 1024 if limit_mb and limit_mb > 0 else None
+
+
+@contextlib.contextmanager
+def _open_decompressed(compression: str, fileobj: BinaryIO):
+    """圧縮ファイルを展開しながら読むファイルオブジェクトを開く"""
+    fileobj.seek(0)
+    if compression == "gzip":
+        with gzip.GzipFile(fileobj=fileobj, mode="rb") as reader:
+            yield reader
+    elif compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise InvalidUpload("zstd形式のアップロードには zstandard が必要です（pip install zstandard）")
+        with zstandard.ZstdDecompressor().stream_reader(fileobj) as reader:
+            yield reader
+    else:
+        with zipfile.ZipFile(fileobj) as archive:
+            members = [m for m in archive.infolist() if not m.is_dir() and m.filename.lower().endswith(".ifc")]
+            if not members:
+                raise InvalidUpload("ZIPアーカイブにIFCファイルが含まれていません")
+            with archive.open(members[0]) as reader:
+                yield reader
+
+
+def _save_decompressed(compression: str, fileobj: BinaryIO, dest_path: str, limit: Optional[int]) -> Tuple[int, str]:
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with _open_decompressed(compression, fileobj) as reader, open(dest_path, "wb") as f:
+            while True:
+                # 読み込みごとの展開後のサイズを制限するため、圧縮率の高いファイルでもメモリを使い過ぎない
+                chunk = reader.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if limit is not None and size > limit:
+                    raise UploadTooLarge(limit)
+                digest.update(chunk)
+                f.write(chunk)
+    except (gzip.BadGzipFile, EOFError, zlib.error, zipfile.BadZipFile, NotImplementedError) as e:
+        _remove(dest_path)
+        raise InvalidUpload(f"圧縮ファイルを展開できません: {e}")
+    except Exception as e:
+        _remove(dest_path)
+        # zstandard.ZstdError は zstandard を読み込んだ場合のみ判定できる
+        if type(e).__name__ == "ZstdError":
+            raise InvalidUpload(f"圧縮ファイルを展開できません: {e}")
+        raise
+    return size, digest.hexdigest()
+
+
+def _remove(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
+
+
+async def save_upload_file(file: UploadFile, dest_path: str) -> Tuple[int, str]:
+    """
+    アップロードファイルを保存（圧縮されている場合は展開して保存）
+
+    Args:
+        file: アップロードファイル
+        dest_path: 保存先パス
+
+    Returns:
+        (展開後のファイルサイズ, 展開後の内容のSHA-256ハッシュ16進文字列)
+
+    Raises:
+        UploadTooLarge: 展開後のサイズが上限を超える場合
+        InvalidUpload: 圧縮ファイルを展開できない場合
+    """
+    limit = get_max_upload_size()
+    compression = get_upload_compression(file.filename or "")
+    if compression is not None:
+        # 受信済みのアップロード（一時ファイル）から同期的に読みながら展開する
+        return await run_in_threadpool(_save_decompressed, compression, file.file, dest_path, limit)
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(dest_path, "wb") as f:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if limit is not None and size > limit:
+                    raise UploadTooLarge(limit)
+                digest.update(chunk)
+                f.write(chunk)
+    except UploadTooLarge:
+        _remove(dest_path)
+        raise
+    return size, digest.hexdigest()
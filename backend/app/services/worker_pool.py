@@ -0,0 +1,181 @@
+"""
+解析用ワーカープロセスプール
+CPU負荷の高いIFC解析・計算を別プロセスで並列実行する
+
+ワーカープロセスは初期化時に ifcopenshell とIFCスキーマを読み込み、最初の解析で読み込みを待たないようにする。
+プールは最初に使うとき（複数ファイルの解析など）に作成する。PARSER_PREWARM が有効な場合は、
+単一ファイルの解析を行うアプリケーションのプロセスで起動時に読み込みを済ませ、
+PARSER_PREWARM_WORKERS も有効な場合は続けてワーカープロセスも起動しておく
+"""
+from concurrent.futures import ProcessPoolExecutor
+from types import ModuleType
+from typing import Optional
+import logging
+import os
+import threading
+import time
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import get_settings
+from app.services.metrics import record_stage
+
+logger = logging.getLogger(__name__)
+
+# 起動時に読み込むIFCスキーマ
+PRELOAD_SCHEMAS = ("IFC2X3", "IFC4", "IFC4X3_ADD2")
+# ワーカープロセスの事前起動で各プロセスに渡す処理の時間（秒）
+WARM_UP_TASK_SECONDS = 0.05
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+# 起動時の解析モジュールの読み込みが完了したか
+_parser_ready = threading.Event()
+# 解析モジュールの読み込みとワーカープロセスの起動（fork）を排他する
+# （読み込み中のスレッドがあるときにforkすると、子プロセスで同じモジュールの読み込みが止まるため）
+_import_lock = threading.Lock()
+# 読み込み済みの解析モジュール（読み込み後はロックを取らずに返す）
+_parser_module: Optional[ModuleType] = None
+
+
+def get_worker_count() -> int:
+    """ワーカープロセス数（PARSER_WORKERS、未設定の場合はCPU数）"""
+    workers = get_settings().parser_workers
+    if workers and workers > 0:
+        return workers
+    return os.cpu_count() or 1
+
+
+def preload_parser() -> float:
+    """
+    IFC解析モジュール（ifcopenshell・形状処理・ユーティリティ）とIFCスキーマを読み込む
+
+    Returns:
+        読み込みにかかった時間 (秒)
+    """
+    started = time.perf_counter()
+    with _import_lock:
+        _load_parser_modules()
+    return time.perf_counter() - started
+
+
+def _load_parser_modules() -> None:
+    import ifcopenshell
+    import ifcopenshell.geom
+    import app.services.ifc_parser  # noqa: F401
+
+    for schema in PRELOAD_SCHEMAS:
+        ifcopenshell.ifcopenshell_wrapper.schema_by_name(schema)
+    ifcopenshell.geom.settings()
+
+
+def load_parser() -> ModuleType:
+    """
+    IFC解析モジュール（app.services.ifc_parser）を取得（未読み込みの場合は読み込む）
+
+    読み込みが済んでいない場合は起動時の読み込みの終了を待つため、イベントループからは呼ばない
+    """
+    global _parser_module
+    if _parser_module is None:
+        with _import_lock:
+            from app.services import ifc_parser
+            _parser_module = ifc_parser
+    return _parser_module
+
+
+def _init_worker() -> None:
+    """
+    ワーカープロセスの初期化
+
+    fork方式では親プロセスが保持中の _import_lock を引き継ぐため、ロックを使わずに読み込む
+    （ワーカープロセスは初期化時に単一スレッドで動作する）
+    """
+    _load_parser_modules()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    プロセスプールを取得（初回呼び出し時に作成）
+
+    作成時はワーカープロセスを起動し、起動時の読み込み中はその終了を待つため、イベントループからは呼ばない
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = get_worker_count()
+            # 解析モジュールの読み込み中はforkしないよう、読み込みの終了を待ってからワーカープロセスを起動する
+            with _import_lock:
+                _pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+                _pool.submit(os.getpid)
+            logger.info(f"ワーカープロセスプールを作成しました: {workers} プロセス")
+        return _pool
+
+
+def _warm_up_worker() -> int:
+    # 各ワーカープロセスに1件ずつ行き渡るよう、少し処理を占有してから返す
+    time.sleep(WARM_UP_TASK_SECONDS)
+    return os.getpid()
+
+
+def start_process_pool() -> float:
+    """
+    プロセスプールを作成し、全ワーカープロセスの初期化（解析モジュールの読み込み）の完了を待つ
+
+    Returns:
+        起動にかかった時間 (秒)
+    """
+    started = time.perf_counter()
+    pool = get_process_pool()
+    futures = [pool.submit(_warm_up_worker) for _ in range(get_worker_count())]
+    for future in futures:
+        future.result()
+    return time.perf_counter() - started
+
+
+async def prewarm_parsers(workers: bool = False) -> None:
+    """
+    解析モジュールを読み込む（起動時にバックグラウンドで実行）
+
+    単一ファイル・ストリーミングのアップロードはこのプロセスで解析するため、まずここで読み込む。
+    ワーカープロセスはメモリを使うため、workers が指定された場合のみ続けて起動する
+    （指定しない場合は最初の使用時に作成し、各プロセスの初期化時に読み込む）
+
+    Args:
+        workers: ワーカープロセスも起動しておく（PARSER_PREWARM_WORKERS）
+    """
+    try:
+        seconds = await run_in_threadpool(preload_parser)
+    except Exception as e:
+        logger.warning(f"解析モジュールの事前読み込みに失敗しました: {e}")
+        return
+
+    record_stage("startup.parser_preload", seconds)
+    _parser_ready.set()
+    logger.info(f"解析モジュールの準備が完了しました: {seconds:.2f} 秒")
+
+    if not workers:
+        return
+    try:
+        seconds = await run_in_threadpool(start_process_pool)
+    except Exception as e:
+        logger.warning(f"ワーカープロセスの事前起動に失敗しました: {e}")
+        return
+
+    record_stage("startup.worker_pool", seconds)
+    logger.info(f"ワーカープロセスの準備が完了しました: {seconds:.2f} 秒")
+
+
+def is_parser_ready() -> bool:
+    """起動時の解析モジュールの準備が完了したか"""
+    return _parser_ready.is_set()
+
+
+def shutdown_process_pool() -> None:
+    """プロセスプールを終了"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+    _parser_ready.clear()
@@ -0,0 +1,218 @@
+"""
+ベンチマーク用の合成IFC4ファイル生成
+ifcopenshellのオーサリングAPIで、指定した数のスペースを持つモデルを作成する
+
+使用例:
+    python -m benchmarks.generate_ifc 1000 /tmp/bench_1000.ifc
+    python -m benchmarks.generate_ifc 50000 /tmp/bench_50k.ifc --no-geometry --no-quantities
+    python -m benchmarks.generate_ifc 1000 /tmp/bench_hotel.ifc --mapped
+"""
+from typing import Optional
+import argparse
+import time
+
+import numpy as np
+import ifcopenshell
+import ifcopenshell.api.aggregate
+import ifcopenshell.api.context
+import ifcopenshell.api.geometry
+import ifcopenshell.api.project
+import ifcopenshell.api.pset
+import ifcopenshell.api.root
+import ifcopenshell.api.spatial
+import ifcopenshell.api.unit
+
+# 用途（ObjectType）と一人当たり床面積 (m²/人)
+USAGES = [
+    ("事務室", 10.0),
+    ("会議室", 3.0),
+    ("廊下", None),
+    ("トイレ", None),
+    ("倉庫", None),
+    ("Office", 8.0),
+    ("Kitchen", 5.0),
+]
+
+# スペースの平面寸法 (m) のバリエーション
+ROOM_SIZES = [(4.0, 5.0), (6.0, 8.0), (3.0, 3.0), (2.0, 12.0), (8.0, 10.0)]
+
+# 1階あたりの階高 (m)
+STOREY_HEIGHT = 3.5
+# 室の配置グリッド間隔 (m)
+GRID_PITCH = 14.0
+
+
+def generate_ifc(
+    space_count: int,
+    output_path: str,
+    storeys: Optional[int] = None,
+    with_quantities: bool = True,
+    with_geometry: bool = True,
+    with_equipment: bool = True,
+    mapped_rooms: bool = False,
+    seed: int = 0
+) -> str:
+    """
+    合成IFC4ファイルを作成
+
+    Args:
+        space_count: スペース数
+        output_path: 出力先パス
+        storeys: 階数（Noneの場合は1階あたり約200室になるよう決める）
+        with_quantities: Qto_SpaceBaseQuantities を付与する
+        with_geometry: スペースに押出形状を付与する
+        with_equipment: スペースごとに制気口（IfcAirTerminal）を1台配置する
+        mapped_rooms: 形状を寸法ごとの IfcRepresentationMap として共有する（ホテルの客室のような繰り返し）
+        seed: 寸法・用途の割り当てに使う乱数シード
+
+    Returns:
+        出力先パス
+    """
+    rng = np.random.default_rng(seed)
+    storey_count = storeys or max(1, (space_count + 199) // 200)
+
+    f = ifcopenshell.api.project.create_file(version="IFC4")
+    project = ifcopenshell.api.root.create_entity(f, ifc_class="IfcProject", name="Benchmark")
+    length_unit = ifcopenshell.api.unit.add_si_unit(f, unit_type="LENGTHUNIT")
+    area_unit = ifcopenshell.api.unit.add_si_unit(f, unit_type="AREAUNIT")
+    volume_unit = ifcopenshell.api.unit.add_si_unit(f, unit_type="VOLUMEUNIT")
+    ifcopenshell.api.unit.assign_unit(f, units=[length_unit, area_unit, volume_unit])
+
+    model_context = ifcopenshell.api.context.add_context(f, context_type="Model")
+    body_context = ifcopenshell.api.context.add_context(
+        f, context_type="Model", context_identifier="Body", target_view="MODEL_VIEW", parent=model_context
+    )
+
+    site = ifcopenshell.api.root.create_entity(f, ifc_class="IfcSite", name="Site")
+    building = ifcopenshell.api.root.create_entity(f, ifc_class="IfcBuilding", name="Building")
+    ifcopenshell.api.aggregate.assign_object(f, products=[site], relating_object=project)
+    ifcopenshell.api.aggregate.assign_object(f, products=[building], relating_object=site)
+
+    storey_entities = []
+    for level in range(storey_count):
+        storey = ifcopenshell.api.root.create_entity(f, ifc_class="IfcBuildingStorey", name=f"{level + 1}F")
+        storey.Elevation = level * STOREY_HEIGHT
+        storey_entities.append(storey)
+    ifcopenshell.api.aggregate.assign_object(f, products=storey_entities, relating_object=building)
+
+    # 寸法ごとに共有する形状（IfcMappedItemから参照する）
+    room_maps = []
+    if with_geometry and mapped_rooms:
+        origin = f.createIfcCartesianPoint((0.0, 0.0, 0.0))
+        for width, depth in ROOM_SIZES:
+            mapped_representation = ifcopenshell.api.geometry.add_wall_representation(
+                f, context=body_context, length=width, height=STOREY_HEIGHT - 0.8, thickness=depth
+            )
+            room_maps.append(f.createIfcRepresentationMap(
+                f.createIfcAxis2Placement3D(origin), mapped_representation
+            ))
+        mapping_target = f.createIfcCartesianTransformationOperator3D(LocalOrigin=origin)
+
+    per_storey = (space_count + storey_count - 1) // storey_count
+    columns = max(1, int(np.ceil(np.sqrt(per_storey))))
+    size_choices = rng.integers(0, len(ROOM_SIZES), space_count)
+    usage_choices = rng.integers(0, len(USAGES), space_count)
+
+    for level, storey in enumerate(storey_entities):
+        start = level * per_storey
+        end = min(start + per_storey, space_count)
+        if start >= end:
+            break
+
+        # 配置を設定する前に階へ割り当てる（割り当て時の配置の再計算を避ける）
+        spaces = [
+            ifcopenshell.api.root.create_entity(f, ifc_class="IfcSpace", name=f"{level + 1:02d}-{i - start + 1:04d}")
+            for i in range(start, end)
+        ]
+        ifcopenshell.api.aggregate.assign_object(f, products=spaces, relating_object=storey)
+        terminals = []
+        if with_equipment:
+            terminals = [
+                ifcopenshell.api.root.create_entity(f, ifc_class="IfcAirTerminal", name=f"SA-{i + 1}")
+                for i in range(start, end)
+            ]
+            # 機器は階に所属させ、スペースへの割り当ては位置から判定させる
+            ifcopenshell.api.spatial.assign_container(f, products=terminals, relating_structure=storey)
+
+        for i, space in enumerate(spaces, start):
+            local = i - start
+            width, depth = ROOM_SIZES[size_choices[i]]
+            height = STOREY_HEIGHT - 0.8
+            usage, area_per_person = USAGES[usage_choices[i]]
+            space.LongName = usage
+            space.ObjectType = usage
+
+            matrix = np.eye(4)
+            matrix[0, 3] = (local % columns) * GRID_PITCH
+            matrix[1, 3] = (local // columns) * GRID_PITCH
+            matrix[2, 3] = level * STOREY_HEIGHT
+            ifcopenshell.api.geometry.edit_object_placement(f, product=space, matrix=matrix, is_si=True)
+
+            if room_maps:
+                representation = f.createIfcShapeRepresentation(
+                    body_context, "Body", "MappedRepresentation",
+                    [f.createIfcMappedItem(room_maps[size_choices[i]], mapping_target)]
+                )
+                ifcopenshell.api.geometry.assign_representation(f, product=space, representation=representation)
+            elif with_geometry:
+                representation = ifcopenshell.api.geometry.add_wall_representation(
+                    f, context=body_context, length=width, height=height, thickness=depth
+                )
+                ifcopenshell.api.geometry.assign_representation(f, product=space, representation=representation)
+
+            area = width * depth
+            pset = ifcopenshell.api.pset.add_pset(f, product=space, name="Pset_SpaceCommon")
+            properties = {"Reference": f"R{i + 1}", "IsExternal": False}
+            if area_per_person:
+                properties["Occupancy"] = max(1, int(area / area_per_person))
+            ifcopenshell.api.pset.edit_pset(f, pset=pset, properties=properties)
+
+            if with_quantities:
+                qto = ifcopenshell.api.pset.add_qto(f, product=space, name="Qto_SpaceBaseQuantities")
+                ifcopenshell.api.pset.edit_qto(f, qto=qto, properties={
+                    "NetFloorArea": area,
+                    "NetVolume": area * height,
+                    "Height": height,
+                })
+
+            if with_equipment:
+                terminal_matrix = matrix.copy()
+                terminal_matrix[0, 3] += width / 2
+                terminal_matrix[1, 3] += depth / 2
+                terminal_matrix[2, 3] += height - 0.1
+                ifcopenshell.api.geometry.edit_object_placement(
+                    f, product=terminals[local], matrix=terminal_matrix, is_si=True
+                )
+
+    f.write(output_path)
+    return output_path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ベンチマーク用の合成IFC4ファイルを作成します")
+    parser.add_argument("spaces", type=int, help="スペース数")
+    parser.add_argument("output", help="出力先パス")
+    parser.add_argument("--storeys", type=int, default=None, help="階数（既定: 1階あたり約200室）")
+    parser.add_argument("--no-quantities", action="store_true", help="数量セットを付与しない")
+    parser.add_argument("--no-geometry", action="store_true", help="形状を付与しない")
+    parser.add_argument("--no-equipment", action="store_true", help="機器を配置しない")
+    parser.add_argument("--mapped", action="store_true", help="寸法ごとの形状をIfcRepresentationMapで共有する")
+    parser.add_argument("--seed", type=int, default=0, help="乱数シード")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    generate_ifc(
+        args.spaces,
+        args.output,
+        storeys=args.storeys,
+        with_quantities=not args.no_quantities,
+        with_geometry=not args.no_geometry,
+        with_equipment=not args.no_equipment,
+        mapped_rooms=args.mapped,
+        seed=args.seed
+    )
+    print(f"{args.output}: {args.spaces} スペース ({time.perf_counter() - started:.1f}秒)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""
+負荷試験ツール
+アップロード → モデル情報 → スペース一覧・詳細の閲覧 → 一括換気計算 → 削除 という
+利用者のセッションを並行して再生し、エンドポイントごとのレイテンシ・スループット・エラー率を集計する
+
+既定ではアプリをプロセス内で起動し、ASGIトランスポート経由でリクエストする（ネットワーク不要）。
+--base-url を指定すると起動済みのサーバーに対して実行する
+
+使用例:
+    # 1000スペースの合成モデルで、同時10セッション・合計50セッション
+    python -m benchmarks.loadtest --spaces 1000 --sessions 50 --concurrency 10
+
+    # 既存のIFCファイルを使い、毎秒2セッションの到着率で実行
+    python -m benchmarks.loadtest --ifc model_a.ifc model_b.ifc --sessions 100 --rate 2
+
+    # 起動済みのサーバーに対して実行し、結果をJSONで保存
+    python -m benchmarks.loadtest --base-url http://localhost:8000 --output loadtest.json
+"""
+from typing import List, Dict, Any, Optional
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+import httpx
+import numpy as np
+
+from benchmarks.run_benchmarks import DEFAULT_CACHE_DIR, prepare_ifc
+
+# 1リクエストのタイムアウト (秒)
+REQUEST_TIMEOUT = 600.0
+
+# 集計表に出すエンドポイントの順序
+ENDPOINT_ORDER = ["upload", "info", "spaces", "space_detail", "ventilation_batch", "delete"]
+
+
+class EndpointStats:
+    """エンドポイントごとのレイテンシとエラー件数"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.status_counts: Dict[str, int] = {}
+
+    def record(self, seconds: float, status: str, ok: bool) -> None:
+        self.latencies.append(seconds)
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
+        if not ok:
+            self.errors += 1
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        count = len(self.latencies)
+        if count == 0:
+            return {"count": 0}
+        latencies_ms = np.asarray(self.latencies) * 1000
+        p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+        return {
+            "count": count,
+            "errors": self.errors,
+            "errorRate": round(self.errors / count, 4),
+            "p50Ms": round(float(p50), 1),
+            "p95Ms": round(float(p95), 1),
+            "p99Ms": round(float(p99), 1),
+            "meanMs": round(float(latencies_ms.mean()), 1),
+            "maxMs": round(float(latencies_ms.max()), 1),
+            "throughputPerSecond": round(count / elapsed, 2) if elapsed > 0 else 0.0,
+            "statusCounts": self.status_counts,
+        }
+
+
+class LoadTest:
+    """セッションを並行実行して結果を集計する"""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        ifc_paths: List[str],
+        page_size: int = 20,
+        pages: int = 2,
+        method: str = "building_code"
+    ):
+        """
+        Args:
+            client: リクエストに使うクライアント
+            ifc_paths: アップロードするIFCファイル（セッションごとに順に使う）
+            page_size: 1ページで詳細を取得するスペース数
+            pages: 閲覧するページ数
+            method: 一括換気計算の計算方法
+        """
+        self.client = client
+        self.ifc_paths = ifc_paths
+        self.page_size = page_size
+        self.pages = pages
+        self.method = method
+        self.stats: Dict[str, EndpointStats] = {name: EndpointStats() for name in ENDPOINT_ORDER}
+        self.failed_sessions = 0
+
+    async def _request(self, endpoint: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except Exception as e:
+            self.stats[endpoint].record(time.perf_counter() - started, type(e).__name__, False)
+            return None
+        self.stats[endpoint].record(
+            time.perf_counter() - started, str(response.status_code), response.status_code < 400
+        )
+        return response
+
+    async def run_session(self, index: int) -> None:
+        """1セッションを実行"""
+        path = self.ifc_paths[index % len(self.ifc_paths)]
+        with open(path, "rb") as f:
+            content = f.read()
+
+        response = await self._request(
+            "upload", "POST", "/api/ifc/upload",
+            files={"file": (os.path.basename(path), content, "application/octet-stream")}
+        )
+        if response is None or response.status_code >= 400:
+            self.failed_sessions += 1
+            return
+        model_id = response.json()["modelId"]
+
+        try:
+            await self._request("info", "GET", f"/api/ifc/{model_id}/info")
+
+            response = await self._request("spaces", "GET", f"/api/ifc/{model_id}/spaces")
+            space_ids: List[str] = []
+            if response is not None and response.status_code < 400:
+                space_ids = [space["id"] for space in response.json()["spaces"]]
+
+            # 一覧からページ単位でスペースの詳細を開く
+            for page in range(self.pages):
+                for space_id in space_ids[page * self.page_size:(page + 1) * self.page_size]:
+                    await self._request("space_detail", "GET", f"/api/ifc/{model_id}/spaces/{space_id}")
+
+            if space_ids:
+                await self._request(
+                    "ventilation_batch", "POST", "/api/calculations/ventilation/batch",
+                    params={"model_id": model_id},
+                    json=[{"spaceId": space_id, "method": self.method} for space_id in space_ids]
+                )
+        finally:
+            response = await self._request("delete", "DELETE", f"/api/ifc/{model_id}")
+            if response is None or response.status_code >= 400:
+                self.failed_sessions += 1
+
+    async def run(self, sessions: int, concurrency: int, rate: float = 0.0, seed: int = 0) -> Dict[str, Any]:
+        """
+        セッションを実行
+
+        Args:
+            sessions: 合計セッション数
+            concurrency: 同時に実行するセッション数の上限
+            rate: 1秒あたりのセッション到着数（ポアソン到着）。0の場合は間隔を空けずに開始する
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        rng = random.Random(seed)
+
+        async def limited(index: int) -> None:
+            async with semaphore:
+                await self.run_session(index)
+
+        started = time.perf_counter()
+        tasks = []
+        for index in range(sessions):
+            tasks.append(asyncio.create_task(limited(index)))
+            if rate > 0 and index < sessions - 1:
+                await asyncio.sleep(rng.expovariate(rate))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+        total_requests = sum(len(s.latencies) for s in self.stats.values())
+        total_errors = sum(s.errors for s in self.stats.values())
+        return {
+            "sessions": sessions,
+            "failedSessions": self.failed_sessions,
+            "concurrency": concurrency,
+            "arrivalRate": rate,
+            "elapsedSeconds": round(elapsed, 3),
+            "sessionsPerSecond": round(sessions / elapsed, 3) if elapsed > 0 else 0.0,
+            "requests": total_requests,
+            "requestsPerSecond": round(total_requests / elapsed, 2) if elapsed > 0 else 0.0,
+            "errorRate": round(total_errors / total_requests, 4) if total_requests else 0.0,
+            "endpoints": {name: stats.summary(elapsed) for name, stats in self.stats.items()},
+        }
+
+
+def create_client(base_url: Optional[str]) -> httpx.AsyncClient:
+    """リクエスト用のクライアントを作成（base_urlがない場合はプロセス内のアプリに接続）"""
+    if base_url:
+        return httpx.AsyncClient(base_url=base_url, timeout=REQUEST_TIMEOUT)
+
+    from app.main import app
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app),
+        base_url="http://loadtest",
+        timeout=REQUEST_TIMEOUT
+    )
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(
+        f"セッション: {report['sessions']} (失敗 {report['failedSessions']}), "
+        f"同時実行: {report['concurrency']}, 経過: {report['elapsedSeconds']}秒, "
+        f"{report['requestsPerSecond']} req/s, エラー率: {report['errorRate']:.2%}"
+    )
+    header = ["endpoint", "count", "err%", "p50(ms)", "p95(ms)", "p99(ms)", "max(ms)", "req/s"]
+    print(f"{header[0]:<20}" + "".join(f"{h:>10}" for h in header[1:]))
+    for name, summary in report["endpoints"].items():
+        if not summary.get("count"):
+            continue
+        values = [
+            summary["count"],
+            f"{summary['errorRate']:.1%}",
+            summary["p50Ms"],
+            summary["p95Ms"],
+            summary["p99Ms"],
+            summary["maxMs"],
+            summary["throughputPerSecond"],
+        ]
+        print(f"{name:<20}" + "".join(f"{v:>10}" for v in values))
+
+
+async def run_load_test(args: argparse.Namespace, ifc_paths: List[str]) -> Dict[str, Any]:
+    async with create_client(args.base_url) as client:
+        load_test = LoadTest(client, ifc_paths, page_size=args.page_size, pages=args.pages, method=args.method)
+        return await load_test.run(args.sessions, args.concurrency, rate=args.rate, seed=args.seed)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="アップロード・計算のセッションを再生する負荷試験を実行します")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--ifc", nargs="+", help="アップロードするIFCファイル")
+    source.add_argument("--spaces", type=int, default=500, help="合成IFCファイルのスペース数（既定: 500）")
+    parser.add_argument("--sessions", type=int, default=20, help="合計セッション数（既定: 20）")
+    parser.add_argument("--concurrency", type=int, default=4, help="同時セッション数の上限（既定: 4）")
+    parser.add_argument("--rate", type=float, default=0.0, help="1秒あたりのセッション到着数（既定: 0 = 間隔なし）")
+    parser.add_argument("--page-size", type=int, default=20, help="1ページで詳細を開くスペース数")
+    parser.add_argument("--pages", type=int, default=2, help="閲覧するページ数")
+    parser.add_argument("--method", default="building_code", help="一括換気計算の計算方法")
+    parser.add_argument("--base-url", default=None, help="起動済みサーバーのURL（省略時はプロセス内で実行）")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="合成IFCファイルの保存先")
+    parser.add_argument("--output", default=None, help="結果をJSONで保存するパス")
+    parser.add_argument("--seed", type=int, default=0, help="到着間隔の乱数シード")
+    args = parser.parse_args(argv)
+
+    ifc_paths = args.ifc or [prepare_ifc(args.spaces, "full", args.cache_dir)]
+
+    if not args.base_url:
+        # プロセス内実行ではアプリのログが結果表示に混ざらないようにする
+        import logging
+        from app import main as _app_main  # noqa: F401  ロギング設定を先に済ませる
+        logging.getLogger().setLevel(logging.WARNING)
+
+    report = asyncio.run(run_load_test(args, ifc_paths))
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 1 if report["failedSessions"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
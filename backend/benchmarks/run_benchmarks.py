@@ -0,0 +1,349 @@
+"""
+エンドツーエンドのベンチマーク
+合成IFCファイルで解析時間・ピークメモリ・シリアライズ時間・一括換気計算のスループットを計測し、
+保存済みのベースラインと比較して性能の劣化を検出する
+
+使用例:
+    # 既定の規模で計測し、ベースラインとして保存
+    python -m benchmarks.run_benchmarks --save-baseline
+
+    # ベースラインと比較（劣化が閾値を超えると終了コード1）
+    python -m benchmarks.run_benchmarks --threshold 0.2
+
+    # 規模・バリエーションを指定
+    python -m benchmarks.run_benchmarks --spaces 100 10000 50000 --variants full no-geometry
+
+計測は1ケースごとに新しいプロセスで行い、ピークメモリは解析前後の最大常駐メモリの差とする
+
+起動時間のケース（startup）では、新しいプロセスでのアプリケーションの読み込み時間・/health が応答するまでの時間・
+解析モジュールの準備が完了するまでの時間・準備完了後の最初のアップロード（解析）の時間を計測する
+"""
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_DIR = os.path.join(BENCHMARK_DIR, ".cache")
+DEFAULT_BASELINE_PATH = os.path.join(BENCHMARK_DIR, "results", "baseline.json")
+
+DEFAULT_SPACE_COUNTS = [100, 1000, 10000]
+# 起動時間のケースでアップロードするモデルの規模
+STARTUP_CASE_KEY = "startup"
+STARTUP_SPACE_COUNT = 100
+# 解析モジュールの準備完了を待つ上限 (秒)
+STARTUP_READY_TIMEOUT = 60.0
+
+# バリエーション名 → 生成オプション
+VARIANTS: Dict[str, Dict[str, bool]] = {
+    "full": {"with_quantities": True, "with_geometry": True},
+    "no-quantities": {"with_quantities": False, "with_geometry": True},
+    "no-geometry": {"with_quantities": True, "with_geometry": False},
+    "bare": {"with_quantities": False, "with_geometry": False},
+    "mapped": {"with_quantities": True, "with_geometry": True, "mapped_rooms": True},
+}
+
+# 比較する指標（いずれも小さいほど良い）と、比較対象外とする小さな値（計測誤差の範囲）
+METRIC_NOISE_FLOORS: Dict[str, float] = {
+    "parseSeconds": 0.05,
+    "peakMemoryMb": 10.0,
+    "serializeSeconds": 0.02,
+    "ventilationSeconds": 0.05,
+    "importSeconds": 0.05,
+    "healthSeconds": 0.05,
+    "warmupSeconds": 0.1,
+    "firstUploadSeconds": 0.05,
+}
+
+
+def _max_rss_mb() -> float:
+    """プロセスの最大常駐メモリ (MB)"""
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOSはバイト、Linuxはキロバイト単位
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _measure_case(ifc_path: str, repeat: int) -> Dict[str, Any]:
+    """
+    1ケースを計測（新しいプロセスで実行）
+
+    解析 → モデル登録 → /spaces のシリアライズ → /ventilation/all の順に実行する
+    """
+    import hashlib
+    import logging
+    import uuid
+
+    # 起動時の事前読み込みは計測対象外とする（解析と同時に実行されないように）
+    os.environ["PARSER_PREWARM"] = "false"
+
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from app.api.ifc import GEOMETRY_STORE_DIR, _register_model, ifc_storage
+    from app.services.geometry_store import get_store_path, remove_geometry_store
+    from app.services.ifc_parser import parse_ifc_file
+
+    # ログ出力は計測対象外とする（メッセージの組み立ては含まれる）
+    logging.getLogger().setLevel(logging.ERROR)
+
+    rss_before = _max_rss_mb()
+    started = time.perf_counter()
+    parsed = parse_ifc_file(ifc_path)
+    parse_seconds = time.perf_counter() - started
+    peak_memory = _max_rss_mb() - rss_before
+
+    model_id = str(uuid.uuid4())
+    with open(ifc_path, "rb") as f:
+        content_hash = hashlib.sha256(f.read()).hexdigest()
+    _register_model(
+        model_id, parsed, [ifc_path], os.path.basename(ifc_path), os.path.getsize(ifc_path), content_hash
+    )
+    space_count = len(parsed["spaces"])
+
+    try:
+        with TestClient(app) as client:
+            started = time.perf_counter()
+            response = client.get(f"/api/ifc/{model_id}/spaces")
+            serialize_seconds = time.perf_counter() - started
+            response.raise_for_status()
+            response_bytes = len(response.content)
+
+            ventilation_seconds = float("inf")
+            for _ in range(repeat):
+                started = time.perf_counter()
+                response = client.post(f"/api/calculations/{model_id}/ventilation/all")
+                ventilation_seconds = min(ventilation_seconds, time.perf_counter() - started)
+                response.raise_for_status()
+    finally:
+        ifc_storage.pop(model_id, None)
+        remove_geometry_store(get_store_path(GEOMETRY_STORE_DIR, model_id))
+
+    return {
+        "spaces": space_count,
+        "parseSeconds": round(parse_seconds, 4),
+        "peakMemoryMb": round(peak_memory, 1),
+        "serializeSeconds": round(serialize_seconds, 4),
+        "spacesResponseBytes": response_bytes,
+        "ventilationSeconds": round(ventilation_seconds, 4),
+        "ventilationSpacesPerSecond": round(space_count / ventilation_seconds, 1) if ventilation_seconds > 0 else 0.0,
+    }
+
+
+def _measure_startup(ifc_path: str) -> Dict[str, Any]:
+    """
+    起動時間を計測（新しいプロセスで実行）
+
+    アプリケーションの読み込み → /health の応答 → 解析モジュールの準備完了 → 最初のアップロードの順に計測する
+    """
+    import logging
+
+    started = time.perf_counter()
+    from app.main import app
+    import_seconds = time.perf_counter() - started
+    # 起動時に ifcopenshell を読み込んでいないか
+    parser_imported = "ifcopenshell" in sys.modules
+
+    from fastapi.testclient import TestClient
+    from app.api.ifc import GEOMETRY_STORE_DIR, ifc_storage
+    from app.services.geometry_store import get_store_path, remove_geometry_store
+
+    logging.getLogger().setLevel(logging.ERROR)
+
+    started = time.perf_counter()
+    with TestClient(app) as client:
+        client.get("/health").raise_for_status()
+        health_seconds = time.perf_counter() - started
+
+        warmup_seconds = None
+        while time.perf_counter() - started < STARTUP_READY_TIMEOUT:
+            if client.get("/health").json().get("parserReady"):
+                warmup_seconds = time.perf_counter() - started
+                break
+            time.sleep(0.01)
+
+        started = time.perf_counter()
+        with open(ifc_path, "rb") as f:
+            response = client.post("/api/ifc/upload", files={"file": (os.path.basename(ifc_path), f)})
+        first_upload_seconds = time.perf_counter() - started
+        response.raise_for_status()
+        model_id = response.json()["modelId"]
+        ifc_storage.pop(model_id, None)
+        remove_geometry_store(get_store_path(GEOMETRY_STORE_DIR, model_id))
+
+    return {
+        "importSeconds": round(import_seconds, 4),
+        "parserImportedAtStartup": parser_imported,
+        "healthSeconds": round(health_seconds, 4),
+        "warmupSeconds": round(warmup_seconds, 4) if warmup_seconds is not None else None,
+        "firstUploadSeconds": round(first_upload_seconds, 4),
+    }
+
+
+def get_case_key(space_count: int, variant: str) -> str:
+    return f"{space_count}-{variant}"
+
+
+def prepare_ifc(space_count: int, variant: str, cache_dir: str) -> str:
+    """ケースの合成IFCファイルを用意（生成済みの場合は再利用）"""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"bench_{get_case_key(space_count, variant)}.ifc")
+    if not os.path.exists(path):
+        from benchmarks.generate_ifc import generate_ifc
+
+        started = time.perf_counter()
+        tmp_path = f"{path}.tmp"
+        generate_ifc(space_count, tmp_path, **VARIANTS[variant])
+        os.replace(tmp_path, path)
+        print(f"  生成: {path} ({time.perf_counter() - started:.1f}秒)", file=sys.stderr)
+    return path
+
+
+def run_cases(
+    space_counts: List[int],
+    variants: List[str],
+    cache_dir: str,
+    repeat: int,
+    startup: bool = True
+) -> Dict[str, Dict[str, Any]]:
+    """全ケースを計測"""
+    context = multiprocessing.get_context("spawn")
+    results: Dict[str, Dict[str, Any]] = {}
+    if startup:
+        print(f"[{STARTUP_CASE_KEY}]", file=sys.stderr)
+        path = prepare_ifc(STARTUP_SPACE_COUNT, "full", cache_dir)
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            results[STARTUP_CASE_KEY] = pool.submit(_measure_startup, path).result()
+    for space_count in space_counts:
+        for variant in variants:
+            key = get_case_key(space_count, variant)
+            print(f"[{key}]", file=sys.stderr)
+            path = prepare_ifc(space_count, variant, cache_dir)
+            # ケースごとに新しいプロセスで計測し、メモリ計測を前のケースの影響から切り離す
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                results[key] = pool.submit(_measure_case, path, repeat).result()
+    return results
+
+
+def compare_with_baseline(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    threshold: float
+) -> List[str]:
+    """
+    ベースラインと比較して劣化した指標を返す
+
+    Args:
+        threshold: 許容する劣化の割合（0.2 = 20%）
+    """
+    regressions = []
+    for key, metrics in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        for name, noise_floor in METRIC_NOISE_FLOORS.items():
+            current, previous = metrics.get(name), base.get(name)
+            if current is None or not previous or max(current, previous) < noise_floor:
+                continue
+            change = (current - previous) / previous
+            if change > threshold:
+                regressions.append(f"{key} {name}: {previous} → {current} ({change:+.0%} 劣化)")
+    return regressions
+
+
+def _print_rows(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    columns: List[str]
+) -> None:
+    print(f"{'case':<20}" + "".join(f"{c:>28}" for c in columns))
+    for key, metrics in results.items():
+        cells = []
+        for column in columns:
+            value = metrics.get(column)
+            previous = baseline.get(key, {}).get(column)
+            cell = f"{value}"
+            if previous and value is not None:
+                cell += f" ({(value - previous) / previous:+.0%})"
+            cells.append(f"{cell:>28}")
+        print(f"{key:<20}" + "".join(cells))
+
+
+def _print_table(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]]) -> None:
+    cases = {key: metrics for key, metrics in results.items() if key != STARTUP_CASE_KEY}
+    if cases:
+        _print_rows(cases, baseline, ["parseSeconds", "peakMemoryMb", "serializeSeconds", "ventilationSpacesPerSecond"])
+    if STARTUP_CASE_KEY in results:
+        _print_rows(
+            {STARTUP_CASE_KEY: results[STARTUP_CASE_KEY]}, baseline,
+            ["importSeconds", "healthSeconds", "warmupSeconds", "firstUploadSeconds"]
+        )
+
+
+def _load_baseline(path: str) -> Dict[str, Dict[str, Any]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("cases", {})
+
+
+def _save_results(path: str, results: Dict[str, Dict[str, Any]]) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "createdAt": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpuCount": os.cpu_count(),
+            "cases": results,
+        }, f, ensure_ascii=False, indent=2)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="IFC解析・換気計算のベンチマークを実行します")
+    parser.add_argument(
+        "--spaces", type=int, nargs="+", default=DEFAULT_SPACE_COUNTS,
+        help=f"スペース数（既定: {' '.join(map(str, DEFAULT_SPACE_COUNTS))}）"
+    )
+    parser.add_argument(
+        "--variants", nargs="+", default=["full"], choices=list(VARIANTS),
+        help="生成するモデルのバリエーション（既定: full）"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="換気計算の繰り返し回数（最短時間を採用）")
+    parser.add_argument("--no-startup", action="store_true", help="起動時間のケースを計測しない")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="合成IFCファイルの保存先")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="ベースラインファイルのパス")
+    parser.add_argument("--save-baseline", action="store_true", help="今回の結果をベースラインとして保存")
+    parser.add_argument("--output", default=None, help="今回の結果を保存するパス")
+    parser.add_argument("--threshold", type=float, default=0.25, help="劣化と判定する割合（既定: 0.25）")
+    args = parser.parse_args(argv)
+
+    results = run_cases(args.spaces, args.variants, args.cache_dir, max(1, args.repeat), startup=not args.no_startup)
+    baseline = _load_baseline(args.baseline)
+    _print_table(results, baseline)
+
+    if args.output:
+        _save_results(args.output, results)
+    if args.save_baseline:
+        # 既存のベースラインに今回のケースを上書きで追加する
+        _save_results(args.baseline, {**baseline, **results})
+        print(f"ベースラインを保存しました: {args.baseline}", file=sys.stderr)
+        return 0
+
+    if not baseline:
+        print("ベースラインがないため比較を省略しました（--save-baseline で作成）", file=sys.stderr)
+        return 0
+
+    regressions = compare_with_baseline(results, baseline, args.threshold)
+    for line in regressions:
+        print(f"劣化: {line}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
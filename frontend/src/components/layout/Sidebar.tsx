@@ -178,7 +178,7 @@ export const Sidebar: React.FC<SidebarProps> = ({ width }) => {
               <input
                 id="ifc-file-input"
                 type="file"
-                accept=".ifc"
+                accept=".ifc,.ifczip,.gz,.zst,.zstd"
                 onChange={handleFileUpload}
                 style={{ display: 'none' }}
                 disabled={isUploading}